@@ -7,14 +7,21 @@ __version__ = '2.1.0'
 __program_name__ = 'plugnpy'
 
 from .check import Check
-from .exception import ParamError, ParamErrorWithHelp, ResultError, AssumedOK, InvalidMetricThreshold, InvalidMetricName
-from .metric import Metric
+from .exception import (
+    ParamError, ParamErrorWithHelp, ResultError, AssumedOK, InvalidMetricThreshold, InvalidMetricName, CollectorTimeout,
+    DeadlineExceeded, CircuitOpenError,
+)
+from .metric import Metric, Threshold
+from .metricbatch import MetricBatch
 from .parser import Parser, ExecutionStyle
 
 __all__ = [
     'Check',
     'ParamError', 'ParamErrorWithHelp', 'ResultError', 'AssumedOK', 'InvalidMetricThreshold', 'InvalidMetricName',
+    'CollectorTimeout', 'DeadlineExceeded', 'CircuitOpenError',
     'Metric',
+    'MetricBatch',
+    'Threshold',
     'Parser',
     'ExecutionStyle',
 ]
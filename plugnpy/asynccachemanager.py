@@ -0,0 +1,340 @@
+"""
+Asyncio Cache Manager Client class.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import time
+
+from socket import error as SocketError
+
+from .asynctransport import AsyncTransport
+from .cachemanager import _MISSING, CacheManagerPolicy, CacheManagerUtils
+from .circuitbreaker import circuit_guard
+from .deadline import deadline_scope, wait_for_deadline
+from .exception import CircuitOpenError, ResultError
+from .lease import LockLease
+from .protocol import _UNSUPPORTED, CacheManagerProtocol
+from .utils import hash_string
+
+
+class AsyncCacheManagerUtils(CacheManagerPolicy):  # pylint: disable=too-few-public-methods
+    """Utility functions for cache manager, for checks running on an asyncio event loop.
+
+    The in-process cache, codec, error policy, retry policy, circuit breaker, stats and lock lease
+    are those of CacheManagerUtils.
+    """
+
+    client = None
+    # AsyncTransport of the cache manager client, e.g. shared with AsyncStateManagerUtils.transport
+    transport = None
+    host = os.environ.get('OPSVIEW_CACHE_MANAGER_HOST')
+    port = os.environ.get('OPSVIEW_CACHE_MANAGER_PORT')
+    namespace = os.environ.get('OPSVIEW_CACHE_MANAGER_NAMESPACE')
+
+    @staticmethod
+    def _initialise_client():
+        """ Initialise the client """
+        if not AsyncCacheManagerUtils.client:
+            AsyncCacheManagerUtils.client = AsyncCacheManagerClient(
+                AsyncCacheManagerUtils.host,
+                AsyncCacheManagerUtils.port,
+                AsyncCacheManagerUtils.namespace,
+                codec=CacheManagerUtils.codec,
+                transport=AsyncCacheManagerUtils.transport,
+                retry=CacheManagerUtils.retry,
+                circuit_breaker=CacheManagerUtils.circuit_breaker,
+                stats=CacheManagerUtils.stats,
+            )
+        return AsyncCacheManagerUtils.client
+
+    @staticmethod
+    async def set_data(key, data, ttl=900, deadline=None):
+        """Set data in the cache manager
+
+        :param key: The key to store the data under.
+        :param data: The data to store.
+        :param ttl: The number of seconds data is valid for, or a SoftTTL.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        """
+        value = data
+        data, local_ttl = AsyncCacheManagerUtils._encode(value, ttl)
+        key = hash_string(key)
+        client = AsyncCacheManagerUtils._initialise_client()
+        with deadline_scope(deadline):
+            response = await AsyncCacheManagerUtils._call(
+                client.set_data(key, data, AsyncCacheManagerUtils._hard_ttl(ttl)))
+        AsyncCacheManagerUtils._set_local(key, value, local_ttl, len(data))
+        return response
+
+    @staticmethod
+    async def get_via_cachemanager(no_cachemanager, key, ttl, func, *args, **kwargs):
+        """Gets data via the cache manager, the asyncio form of CacheManagerUtils.get_via_cachemanager
+
+        The data retrieval function may be a coroutine function or a regular function.
+        The backend and fallback of CacheManagerUtils are not used, the cache manager host is required.
+
+        :param no_cachemanager: True if cache manager is not required, False otherwise.
+        :param key: The key to store the data under.
+        :param ttl: The number of seconds data is valid for, or a SoftTTL.
+        :param func: The function to retrieve the data, if the data is not in the cache manager.
+        :param args: The arguments to pass to the user's data retrieval function.
+        :param kwargs: The keyword arguments to pass to the user's data retrieval function.
+        """
+        if not AsyncCacheManagerUtils._is_required(no_cachemanager, AsyncCacheManagerUtils.host):
+            return await AsyncCacheManagerUtils._await(func(*args, **kwargs))
+
+        key = hash_string(key)
+        data = AsyncCacheManagerUtils._get_local(key)
+        if data is not _MISSING:
+            return data
+        return await AsyncCacheManagerUtils._lookup(key, ttl, functools.partial(func, *args, **kwargs))
+
+    @staticmethod
+    async def _lookup(key, ttl, call):
+        """Gets the data of the hashed key from the cache manager, see CacheManagerUtils._lookup()"""
+        client = AsyncCacheManagerUtils._initialise_client()
+        start = time.monotonic()
+        try:
+            response = await AsyncCacheManagerUtils._call(
+                client.get_data(key, AsyncCacheManagerUtils._lease_wait(start)))
+            while AsyncCacheManagerUtils._lease_alive(response):
+                response = await AsyncCacheManagerUtils._call(
+                    client.get_data(key, AsyncCacheManagerUtils._lease_wait(start)))
+        except CircuitOpenError as ex:
+            AsyncCacheManagerUtils._bypass(ex)
+            return await AsyncCacheManagerUtils._await(call())
+        AsyncCacheManagerUtils._record('record_lookup', response, time.monotonic() - start)
+        if response['lock']:
+            if CacheManagerUtils.lock_lease is None:
+                data = await AsyncCacheManagerUtils._fetch(client, key, ttl, call)
+            else:
+                async with LockLease(client, [key], CacheManagerUtils.lock_lease):
+                    data = await AsyncCacheManagerUtils._fetch(client, key, ttl, call)
+            return AsyncCacheManagerUtils._keep(key, ttl, data, AsyncCacheManagerUtils._decode(data))
+        decoded = AsyncCacheManagerUtils._decode(response['data'])
+        refresh, failures = AsyncCacheManagerUtils._needs_refresh(ttl, *decoded)
+        if refresh:
+            data = await AsyncCacheManagerUtils._refresh(client, key, ttl, call, failures)
+            if data is not None:
+                return AsyncCacheManagerUtils._keep(key, ttl, data, AsyncCacheManagerUtils._decode(data))
+        return AsyncCacheManagerUtils._keep(key, ttl, response['data'], decoded, response)
+
+    @staticmethod
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    async def _fetch(client, key, ttl, call, failures=0, store_error=True):
+        """Calls the data retrieval function and stores its data, or its error unless store_error is False.
+        Returns the data, also when the cache manager fails to store it, or None if there is nothing to store.
+        """
+        start = time.monotonic()
+        # Any exceptions in the function call will be stored in the cache manager under the 'error' key
+        try:
+            value, error = await AsyncCacheManagerUtils._await(call()), None
+        except Exception as ex:  # pylint: disable=broad-except
+            value, error = None, ex
+        data = AsyncCacheManagerUtils._fetched_data(ttl, start, value, error, failures, store_error)
+        if data is not None:
+            try:
+                await AsyncCacheManagerUtils._call(client.set_data(key, data, AsyncCacheManagerUtils._hard_ttl(ttl)))
+            except (ResultError, CircuitOpenError):
+                # the data is returned to the caller, the next callers retrieve it again
+                pass
+        return data
+
+    @staticmethod
+    async def _refresh(client, key, ttl, call, failures=None):
+        """Refreshes the data if no other caller is refreshing it, returns the stored data or None.
+        See CacheManagerUtils._refresh()
+        """
+        refresh_key = AsyncCacheManagerUtils._refresh_key(key)
+        try:
+            if not (await AsyncCacheManagerUtils._call(client.get_data(refresh_key, 0)))['lock']:
+                return None
+        except (ResultError, CircuitOpenError):
+            return None
+        data = await AsyncCacheManagerUtils._fetch(
+            client, key, ttl, call, failures or 0, store_error=failures is not None)
+        try:
+            await AsyncCacheManagerUtils._call(
+                client.set_data(refresh_key, *AsyncCacheManagerUtils._refresh_marker(ttl, data)))
+        except (ResultError, CircuitOpenError):
+            pass
+        return data
+
+    @staticmethod
+    async def _call(request):
+        """Awaits the request to the cache manager, converting the connection errors to ResultError"""
+        try:
+            return await request
+        except SocketError as ex:
+            raise ResultError(f"Failed to connect to cache manager: {ex}") from None
+
+    @staticmethod
+    async def _await(value):
+        """Returns the result of the data retrieval function, awaited if it is a coroutine function"""
+        if inspect.isawaitable(value):
+            return await value
+        return value
+
+
+class AsyncCacheManagerClient(CacheManagerProtocol):  # pylint: disable=too-many-instance-attributes
+    """A simple asyncio client to contact the cachemanager and set or get cached data.
+
+    It uses the same requests as CacheManagerClient, and can have many requests in flight at the same time,
+    each on one of the pooled connections of its AsyncTransport.
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(
+            self, host, port, namespace,
+            concurrency=10, connection_timeout=30, network_timeout=30, codec=None, transport=None,
+            retry=None, circuit_breaker=None, stats=None,
+    ):
+        """Constructor for the asyncio Cache Manager Client
+
+        :param host: Host IP or name of the cache manager, or the path of its Unix domain socket.
+        :param port: Port of the cache manager.
+        :param namespace: Namespace for the plugin.
+        :param concurrency: Number of concurrent http connections allowed (default is 10).
+        :param connection_timeout: Number of seconds before HTTP connection times out.
+        :param network_timeout: Number of seconds before the data read times out.
+        :param codec: The PayloadCodec used to encode the requests (default is a PayloadCodec with no compression).
+        :param transport: An AsyncTransport to share with other clients, which is not closed by close()
+            (default is a new AsyncTransport).
+        :param retry: The RetryPolicy of the requests which fail to connect (default is None, no retries).
+        :param circuit_breaker: The CircuitBreaker of the cache manager (default is None, no circuit breaker).
+        :param stats: The CacheStats recording the requests (default is None, requests not recorded).
+        """
+        super().__init__(host, namespace, codec, retry, circuit_breaker, stats)
+        self._owns_transport = transport is None
+        self._http_client = transport or AsyncTransport(host, port, concurrency, connection_timeout, network_timeout)
+
+    async def get_data(self, key, max_wait_time=30, deadline=None):
+        """Gets data from the cache. Optionally, may get a lock if there is no data present.
+
+        :param key: The key of the data element to fetch, within the namespace.
+        :param max_wait_time: Max time to wait for a lock (seconds), capped to the time left until the deadline.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: A dictionary with the 'data' and 'lock' keys, and the 'lease' key if the cache manager
+            supports leases, see CacheManagerClient.get_data().
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        with deadline_scope(deadline):
+            return await self._send('POST', 'get_data', self._get_data_params(key, self._cap_wait_time(max_wait_time)))
+
+    async def get_many(self, keys, max_wait_time=30, deadline=None):
+        """Gets the data of many keys from the cache. Optionally, may get a lock for the keys with no data present.
+
+        The keys are fetched in a single request if the cache manager supports it,
+        otherwise with concurrent get_data requests.
+
+        :param keys: The keys of the data elements to fetch, within the namespace.
+        :param max_wait_time: Max time to wait for a lock (seconds), capped to the time left until the deadline.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: A dictionary of key: response, each response has the same 'data' and 'lock' keys as get_data.
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        keys = list(dict.fromkeys(keys))
+        with deadline_scope(deadline):
+            max_wait_time = self._cap_wait_time(max_wait_time)
+            responses = await self._post_batch('get_many', self._get_many_params(keys, max_wait_time))
+            if responses is _UNSUPPORTED:
+                responses = dict(zip(keys, await asyncio.gather(*(
+                    self._send('POST', 'get_data', self._get_data_params(key, max_wait_time)) for key in keys
+                ))))
+        return self._responses(keys, responses)
+
+    async def set_data(self, key, data, ttl=900, deadline=None):
+        """Sets data into the cache.
+
+        :param key: The key of the data element to store, within the namespace.
+        :param data: The data to store.
+        :param ttl: The time that the data is valid for (seconds).
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        with deadline_scope(deadline):
+            return await self._send('POST', 'set_data', self._set_data_params(key, data, ttl))
+
+    async def set_many(self, items, ttl=900, deadline=None):
+        """Sets the data of many keys into the cache.
+
+        The data is stored in a single request if the cache manager supports it,
+        otherwise with concurrent set_data requests.
+
+        :param items: A dictionary of key: data to store, within the namespace.
+        :param ttl: The time that the data is valid for (seconds).
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        with deadline_scope(deadline):
+            response = await self._post_batch('set_many', self._set_many_params(items, ttl))
+            if response is _UNSUPPORTED:
+                response = list(await asyncio.gather(*(
+                    self._send('POST', 'set_data', self._set_data_params(key, data, ttl)) for key, data in items.items()
+                )))
+        return response
+
+    async def renew_lock(self, key, lease=30, deadline=None):
+        """Renews the lock held on the key, so the callers waiting for its data keep waiting, see LockLease.
+
+        :param key: The key of the data element whose lock is held, within the namespace.
+        :param lease: The number of seconds the lock is kept for, unless renewed again.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: True if the lock was renewed, False if it is no longer held or the cache manager
+            does not support leases.
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        if self._lease_supported is False:
+            return False
+        with deadline_scope(deadline):
+            response = await self._send(
+                'POST', 'renew_lock', self._renew_lock_params(key, lease), allow_unsupported=True)
+        return self._lock_renewed(response)
+
+    async def status(self, deadline=None):
+        """Fetches the current status of the cache.
+
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        """
+        with deadline_scope(deadline):
+            return await self._send('GET', 'status')
+
+    async def close(self):
+        """Close a client connection, and its transport unless it was given to the client"""
+        if self._http_client:
+            if self._owns_transport:
+                await self._http_client.close()
+            self._http_client = None
+
+    async def _post_batch(self, path, data):
+        """Posts a batch request, returns _UNSUPPORTED if the cache manager does not support it"""
+        if self._batch_supported is False:
+            return _UNSUPPORTED
+        return self._batch_response(await self._send('POST', path, data, allow_unsupported=True))
+
+    async def _send(self, method, path, data=None, allow_unsupported=False):
+        """Sends the request, returns the decoded response"""
+        body = self._codec.json_dumps(data) if data else None
+        start = time.monotonic()
+        with self._record_errors(path, start, body):
+            response = await wait_for_deadline(self._request(method, path, body), f"call {path} on the cache manager")
+            return self._read(path, start, body, response, allow_unsupported)
+
+    async def _request(self, method, path, body):
+        """Sends the request through the circuit breaker, retrying it according to the retry policy"""
+        with circuit_guard(self._circuit_breaker, "cache manager"):
+            if self._retry is None:
+                return await self._http_client.request(method, path, body=body, headers=self._headers)
+            return await self._retry.call_async(
+                self._http_client.request, method, path, body=body, headers=self._headers,
+                idempotent=path not in self.LOCKING_REQUESTS,
+            )
@@ -0,0 +1,173 @@
+"""
+Asyncio State Manager Client class.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import os
+import json
+
+from socket import error as SocketError
+from typing import Optional
+
+from .asynctransport import AsyncTransport
+from .circuitbreaker import circuit_guard
+from .deadline import deadline_scope, wait_for_deadline
+from .exception import CircuitOpenError, DeadlineExceeded, StateManagerStoreError
+from .protocol import StateManagerProtocol
+from .statemanager import StateManagerUtils
+
+
+class AsyncStateManagerUtils:
+    """Utility functions for State Manager, for checks running on an asyncio event loop.
+
+    The retry policy and circuit breaker are those of StateManagerUtils.
+    """
+
+    client = None
+    # AsyncTransport of the state manager client, e.g. shared with AsyncCacheManagerUtils.transport
+    transport = None
+    host = os.environ.get('OPSVIEW_STATE_MANAGER_HOST')
+    port = os.environ.get('OPSVIEW_STATE_MANAGER_PORT')
+    namespace = os.environ.get('OPSVIEW_STATE_MANAGER_NAMESPACE')
+
+    @staticmethod
+    def _initialise_client():
+        """ Initialise the client """
+        if not AsyncStateManagerUtils.client:
+            AsyncStateManagerUtils.client = AsyncStateManagerClient(
+                AsyncStateManagerUtils.host,
+                AsyncStateManagerUtils.port,
+                AsyncStateManagerUtils.namespace,
+                transport=AsyncStateManagerUtils.transport,
+                retry=StateManagerUtils.retry,
+                circuit_breaker=StateManagerUtils.circuit_breaker,
+            )
+
+    @staticmethod
+    async def store_data(key: str, data: str, ttl: int, timestamp: Optional[float] = None, deadline=None):
+        """ Store or update the data in the persistent storage indexed by key.
+
+        :param key: The key to store the data under.
+        :param data: The data to store.
+        :param ttl: The number of seconds for which the data is valid.
+        :param timestamp: The time of the data.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+
+        Raises a StateManagerStoreError if the data was not saved to the persistent store.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
+        Raises TypeError if either data or key is not a string object
+        """
+        if not isinstance(data, str):
+            raise TypeError(f"Data must be a str type, not {type(data)}")
+
+        AsyncStateManagerUtils._initialise_client()
+        with deadline_scope(deadline):
+            await AsyncStateManagerUtils.client.store_data(key, data, ttl, timestamp)
+
+    @staticmethod
+    async def fetch_data(key: str, deadline=None):
+        """ Fetch the data from the persistent storage, indexed by key.
+
+        :param key: The key under which the data is stored.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: The data, or None if not found.
+
+        Raises a StateManagerStoreError if an error occurred when attempting to fetch the data.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
+        """
+        AsyncStateManagerUtils._initialise_client()
+        with deadline_scope(deadline):
+            return await AsyncStateManagerUtils.client.fetch_data(key)
+
+
+class AsyncStateManagerClient(StateManagerProtocol):
+    """A simple asyncio client to contact the State Manager and set or get persistent data.
+
+    It uses the same requests as StateManagerClient, and can have many requests in flight at the same time,
+    each on one of the pooled connections of its AsyncTransport.
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(
+            self, host, port, namespace,
+            concurrency=10, connection_timeout=30, network_timeout=30, transport=None,
+            retry=None, circuit_breaker=None,
+    ):
+        """Constructor for the asyncio State Manager Client
+
+        :param host: Host IP or name of the state manager, or the path of its Unix domain socket.
+        :param port: Port of the state manager.
+        :param namespace: Namespace for the plugin.
+        :param concurrency: Number of concurrent http connections allowed (default is 10).
+        :param connection_timeout: Number of seconds before HTTP connection times out.
+        :param network_timeout: Number of seconds before the data read times out.
+        :param transport: An AsyncTransport to share with other clients, which is not closed by close()
+            (default is a new AsyncTransport).
+        :param retry: The RetryPolicy of the requests which fail to connect (default is None, no retries).
+        :param circuit_breaker: The CircuitBreaker of the state manager (default is None, no circuit breaker).
+        """
+        super().__init__(host, namespace, retry, circuit_breaker)
+        self._owns_transport = transport is None
+        self._http_client = transport or AsyncTransport(host, port, concurrency, connection_timeout, network_timeout)
+
+    async def store_data(self, key: str, data: str, ttl: int, timestamp: Optional[float] = None, deadline=None):
+        """ Store or update the data in the persistent storage indexed by key.
+
+        :param key: The key to store the data under.
+        :param data: The data to store.
+        :param ttl: The number of seconds for which the data is valid.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+
+        Raises a StateManagerStoreError if the data was not saved to the persistent storage.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
+        Raises TypeError if either data or key is not a string object
+        """
+        params = self._store_params(key, data, ttl, timestamp)
+        with deadline_scope(deadline):
+            response = await self._send_persistent('store_data', params, "store data in the state manager")
+        self._check_stored(response)
+
+    async def fetch_data(self, key: str, deadline=None) -> Optional[str]:
+        """ Fetch the data from the persistent storage, indexed by key.
+
+        :param key: The key under which the data is stored.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: The data, or None if not found.
+
+        Raises a StateManagerStoreError if an error occurred when attempting to fetch the data.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
+        """
+        params = self._fetch_params(key)
+        with deadline_scope(deadline):
+            response = await self._send_persistent('fetch_data', params, "fetch data from the state manager")
+        return self._fetched_data(response)
+
+    async def close(self):
+        """Close a client connection, and its transport unless it was given to the client"""
+        if self._http_client:
+            if self._owns_transport:
+                await self._http_client.close()
+            self._http_client = None
+
+    async def _send_persistent(self, path, data, action):
+        """ Send a request to the State Manager (persistent store) """
+        try:
+            return await wait_for_deadline(self._request(path, json.dumps(data)), action)
+        except SocketError as ex:
+            raise StateManagerStoreError(f"Failed to connect to state manager: {ex}") from None
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as ex:
+            raise StateManagerStoreError(str(ex)) from ex
+
+    async def _request(self, path, body):
+        """Sends the request through the circuit breaker, retrying it according to the retry policy"""
+        with circuit_guard(self._circuit_breaker, "state manager"):
+            if self._retry is None:
+                return await self._http_client.post(path, body=body, headers=self._headers)
+            # storing data with its timestamp and fetching data are idempotent
+            return await self._retry.call_async(self._http_client.post, path, body=body, headers=self._headers)
@@ -0,0 +1,119 @@
+"""
+AsyncTransport Class, the HTTP connections of the asyncio cache manager and state manager clients.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import asyncio
+
+from .transport import BaseTransport, TransportResponse
+
+
+class AsyncTransport(BaseTransport):  # pylint: disable=too-many-instance-attributes
+    """Transport sending HTTP/1.1 requests with asyncio streams, keeping the connections alive between requests.
+
+    Many requests can be in flight at the same time, each on its own connection, up to the concurrency.
+    A transport must only be used from the event loop it was first used in,
+    it can be shared by the asyncio cache manager and state manager clients.
+
+    Keyword Arguments:
+        - host -- Host IP or name of the server, or the path of its Unix domain socket
+        - port -- Port of the server, ignored for a Unix domain socket
+        - concurrency -- Number of concurrent connections allowed (default: 10)
+        - connection_timeout -- Number of seconds before the connection times out (default: 30)
+        - network_timeout -- Number of seconds before the response read times out (default: 30)
+        - unix -- True to connect to a Unix domain socket (default: True if host is an absolute path)
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, host, port, concurrency=10, connection_timeout=30, network_timeout=30, unix=None):
+        super().__init__(host, port, concurrency, connection_timeout, network_timeout)
+        self.unix = str(host).startswith('/') if unix is None else unix
+        self._idle = []
+        self._slots = None
+
+    async def get(self, path, headers=None):
+        """Sends a GET request, returns the response"""
+        return await self.request('GET', path, headers=headers)
+
+    async def post(self, path, body=None, headers=None):
+        """Sends a POST request, returns the response"""
+        return await self.request('POST', path, body=body, headers=headers)
+
+    async def request(self, method, path, body=None, headers=None):
+        """Sends a request, returns a TransportResponse"""
+        if not path.startswith('/'):
+            path = '/' + path
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        async with self._slots:
+            if self._idle:
+                try:
+                    return await self._request(self._idle.pop(), method, path, body, headers)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # the server closed the idle connection, retry on a new one
+                    pass
+            connection = await asyncio.wait_for(self._connect(), self.connection_timeout)
+            return await self._request(connection, method, path, body, headers)
+
+    async def close(self):
+        """Closes the idle connections"""
+        connections, self._idle = self._idle, []
+        for _, writer in connections:
+            writer.close()
+
+    async def _connect(self):
+        if self.unix:
+            return await asyncio.open_unix_connection(self.host)
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def _request(self, connection, method, path, body, headers):  # pylint: disable=too-many-arguments
+        reader, writer = connection
+        try:
+            lines = [f'{method} {path} HTTP/1.1', f'Host: {"localhost" if self.unix else self.host}']
+            lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+            lines.append(f'Content-Length: {len(body or b"")}')
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+            await writer.drain()
+            status_code, status_message, response_headers, data = await asyncio.wait_for(
+                self._read_response(reader), self.network_timeout)
+        except BaseException:
+            writer.close()
+            raise
+        if response_headers.get('connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self._idle.append(connection)
+        return TransportResponse(status_code, status_message, data)
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server")
+        _, status_code, status_message = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = await self._read_chunks(reader)
+        else:
+            data = await reader.readexactly(int(headers.get('content-length', 0)))
+        return int(status_code), status_message, headers, data
+
+    @staticmethod
+    async def _read_chunks(reader):
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                # skip the trailers
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
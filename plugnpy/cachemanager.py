@@ -3,24 +3,330 @@ Cache Manager Client class.
 Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
 """
 
+import contextlib
+import functools
+import math
 import os
-import json
+import random
+import threading
+import time
 
 from socket import error as SocketError
 
-from geventhttpclient import HTTPClient
+from concurrent.futures import ThreadPoolExecutor
 
-from .exception import ResultError
+from .circuitbreaker import circuit_guard
+from .deadline import deadline_scope, deadline_timeout, get_deadline
+from .exception import CircuitOpenError, ResultError
+from .lease import LockLease
+from .payload import INLINE_KEY, PayloadCodec
+from .protocol import _UNSUPPORTED, CacheManagerProtocol
+from .sharding import ShardedCacheManagerClient, endpoint_name, parse_endpoints
+from .transport import get_transport
 from .utils import hash_string
 
 ESCAPE_CHARACTER = '\\'
 DELIMITER = '#'
+SOFT_TTL_KEY = 'plugnpy_soft_ttl'
+ERROR_KEY = 'plugnpy_error'
+# number of seconds a get_data request waits for the lock holder to store the data, by default
+MAX_WAIT_TIME = 30
 
+_MISSING = object()
 
-class CacheManagerUtils:  # pylint: disable=too-few-public-methods
+
+class SoftTTL:
+    """Time to live of data which is refreshed by a single caller, while the others get the stale data.
+
+    The data is fresh for ttl seconds, and is then stale for refresh_window seconds.
+    The first caller getting stale data refreshes it, the other callers get the stale data without waiting.
+    If the refresh fails, the stale data is kept and the refresh is retried after retry_interval seconds.
+    Once the data has been stale for refresh_window seconds, it expires as with a plain TTL.
+
+    With early_refresh, the data may be refreshed before it becomes stale, with a probability increasing
+    as the end of its TTL gets closer and with the time it took to retrieve, so the refreshes are spread out.
+
+    Keyword Arguments:
+        - ttl -- Number of seconds the data is fresh for
+        - refresh_window -- Number of seconds the stale data is returned for while it is refreshed
+        - early_refresh -- Weight of the probabilistic early refresh, 0 to disable it (default: 0),
+            1 is a good value, higher values refresh earlier
+        - retry_interval -- Number of seconds before retrying a failed refresh (default: 5)
+    """
+
+    def __init__(self, ttl, refresh_window, early_refresh=0, retry_interval=5):
+        self.ttl = ttl
+        self.refresh_window = refresh_window
+        self.early_refresh = early_refresh
+        self.retry_interval = retry_interval
+
+    @property
+    def hard_ttl(self):
+        """The number of seconds the data is kept in the cache manager"""
+        return self.ttl + self.refresh_window
+
+    def wrap(self, value, delta):
+        """Returns the value to store, with its freshness and the number of seconds it took to retrieve (delta)"""
+        return {SOFT_TTL_KEY: {'fresh_until': time.time() + self.ttl, 'delta': delta}, 'value': value}
+
+    @staticmethod
+    def unwrap(value):
+        """Returns a tuple of (value, fresh_until, delta), fresh_until is None if the value was not wrapped"""
+        if isinstance(value, dict) and len(value) == 2 and SOFT_TTL_KEY in value and 'value' in value:
+            return value['value'], value[SOFT_TTL_KEY]['fresh_until'], value[SOFT_TTL_KEY]['delta']
+        return value, None, 0
+
+    def should_refresh(self, fresh_until, delta):
+        """Returns True if the data fresh until the given time should be refreshed"""
+        now = time.time()
+        if self.early_refresh and delta:
+            now -= delta * self.early_refresh * math.log(1.0 - random.random())
+        return now >= fresh_until
+
+
+class CachedError(dict):
+    """Error raised by the data retrieval function of get_via_cachemanager, as stored in the cache manager.
+
+    It is equal to the {'error': message} dictionary returned for errors by the previous versions,
+    so it can still be handled as such, while isinstance(data, CachedError) tells a cached error from data.
+
+    Keyword Arguments:
+        - message -- The error message
+        - failures -- Number of times in a row the data retrieval function failed (default: 1)
+        - error_type -- Name of the exception class (default: None)
+        - retry_at -- Time after which the data retrieval is retried, None to keep the error until it expires
+    """
+
+    def __init__(self, message, failures=1, error_type=None, retry_at=None):
+        super().__init__(error=message)
+        self.message = message
+        self.failures = failures
+        self.error_type = error_type
+        self.retry_at = retry_at
+
+    def to_data(self):
+        """Returns the data to store for the error"""
+        return {
+            'error': self.message,
+            ERROR_KEY: {'failures': self.failures, 'type': self.error_type, 'retry_at': self.retry_at},
+        }
+
+    @staticmethod
+    def from_data(value):
+        """Returns the CachedError of the stored data, or the value if it is not an error"""
+        if isinstance(value, dict) and len(value) == 2 and ERROR_KEY in value and 'error' in value:
+            info = value[ERROR_KEY]
+            return CachedError(value['error'], info['failures'], info['type'], info['retry_at'])
+        return value
+
+
+class CacheManagerPolicy:  # pylint: disable=too-few-public-methods
+    """The decisions of CacheManagerUtils which do not depend on how the cache manager is called,
+    shared with AsyncCacheManagerUtils. The settings are those of CacheManagerUtils.
+    """
+
+    @staticmethod
+    def _encode(value, ttl):
+        """Returns a tuple of (data to store, number of seconds it can be kept in-process) of the value to set"""
+        if isinstance(ttl, SoftTTL):
+            return CacheManagerUtils.codec.dumps(ttl.wrap(value, 0)), ttl.ttl
+        return CacheManagerUtils.codec.dumps(value), ttl
+
+    @staticmethod
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def _fetched_data(ttl, start, value, error=None, failures=0, store_error=True):
+        """Returns the data to store for the value returned by the data retrieval function called at start,
+        or for the error it raised, None if the error is not stored.
+        failures is the number of failures of the error being refreshed, if any.
+        """
+        CacheManagerPolicy._record('record_fetch', time.monotonic() - start, error is not None)
+        if error is not None:
+            if not store_error:
+                return None
+            value = CacheManagerPolicy._error_data(error, failures + 1)
+        if isinstance(ttl, SoftTTL):
+            value = ttl.wrap(value, time.monotonic() - start)
+        return CacheManagerUtils.codec.dumps(value)
+
+    @staticmethod
+    def _keep(key, ttl, data, decoded, response=None):
+        """Keeps the value of the data in-process and returns it. decoded is the result of _decode(data),
+        response is the response the data was read from, None if the data was just stored.
+        """
+        value, fresh_until, _ = decoded
+        local_ttl = CacheManagerPolicy._local_ttl(ttl, value, fresh_until, response)
+        CacheManagerPolicy._set_local(key, value, local_ttl, CacheManagerPolicy._data_size(data, response))
+        return value
+
+    @staticmethod
+    def _refresh_key(key):
+        """Returns the key of the refresh marker of the data.
+        The refresh lock is the cache manager lock of the marker, kept until the data may be refreshed again.
+        """
+        return hash_string(f'{key}{DELIMITER}refresh')
+
+    @staticmethod
+    def _refresh_marker(ttl, data):
+        """Returns a tuple of (data, ttl) of the refresh marker stored after a refresh, whose data is the data
+        stored by the refresh, None if there was nothing to store
+        """
+        retry_interval = ttl.retry_interval if isinstance(ttl, SoftTTL) else CacheManagerUtils.error_ttl
+        return CacheManagerUtils.codec.dumps(data is not None), retry_interval
+
+    @staticmethod
+    def _bypass(error):
+        """Raises the CircuitOpenError again, unless the circuit breaker bypasses the cache while it is open"""
+        circuit_breaker = CacheManagerUtils.circuit_breaker
+        if circuit_breaker is None or not circuit_breaker.bypass:
+            raise error
+
+    @staticmethod
+    def _decode(data):
+        """Returns a tuple of (value, fresh_until, delta) of the stored data, see SoftTTL.unwrap().
+        Raises ResultError if there is no data.
+        """
+        if not data:
+            raise ResultError("Failed to retrieve data from cache manager")
+        value, fresh_until, delta = SoftTTL.unwrap(CacheManagerUtils.codec.loads(data))
+        return CachedError.from_data(value), fresh_until, delta
+
+    @staticmethod
+    def _needs_refresh(ttl, value, fresh_until, delta):
+        """Returns a tuple of (True if the stored value must be refreshed, number of failures if it is an error)"""
+        if isinstance(value, CachedError):
+            return value.retry_at is not None and time.time() >= value.retry_at, value.failures
+        refresh = isinstance(ttl, SoftTTL) and fresh_until is not None and ttl.should_refresh(fresh_until, delta)
+        return refresh, None
+
+    @staticmethod
+    def _local_ttl(ttl, value, fresh_until, response=None):
+        """Returns the number of seconds the value can be kept in-process, which is not longer than it is kept by
+        the backend. response is the response the data was read from, None if the data was just stored.
+        """
+        if isinstance(value, CachedError):
+            # errors are not kept in-process, so the next call checks whether they have been retried
+            return 0
+        if fresh_until is not None:
+            # stale data is not kept in-process, so the next call checks whether it has been refreshed
+            return fresh_until - time.time()
+        if response is not None:
+            # the time the data was stored is unknown, unless the backend returns the time left until it expires
+            remaining = response.get('ttl')
+            if remaining is None:
+                remaining = CacheManagerUtils.local_max_age
+            return min(CacheManagerPolicy._hard_ttl(ttl), remaining)
+        return ttl.ttl if isinstance(ttl, SoftTTL) else ttl
+
+    @staticmethod
+    def _error_data(ex, failures):
+        """Returns the data to store for the exception raised by the data retrieval function"""
+        retry_at = None
+        max_retries = CacheManagerUtils.max_error_retries
+        if CacheManagerUtils.error_ttl is not None and (max_retries is None or failures <= max_retries):
+            retry_at = time.time() + CacheManagerUtils.error_ttl
+        return CachedError(str(ex), failures, type(ex).__name__, retry_at).to_data()
+
+    @staticmethod
+    def _lease_alive(response):
+        """Returns True if the response of a caller waiting for the data tells the lease of the lock holder is alive"""
+        return not response.get('data') and not response.get('lock') and bool(response.get('lease'))
+
+    @staticmethod
+    def _lease_wait(start):
+        """Returns the max wait time of the next request of a caller waiting since start for a lock holder,
+        raises ResultError once it has waited for CacheManagerUtils.max_lease_wait seconds
+        """
+        max_lease_wait = CacheManagerUtils.max_lease_wait
+        if max_lease_wait is None:
+            return MAX_WAIT_TIME
+        remaining = start + max_lease_wait - time.monotonic()
+        if remaining <= 0:
+            raise ResultError(f"The data was not stored by the lock holder within {max_lease_wait}s")
+        # the cache manager only accepts whole seconds
+        return min(MAX_WAIT_TIME, max(1, math.ceil(remaining)))
+
+    @staticmethod
+    def _hard_ttl(ttl):
+        """Returns the number of seconds the data is kept in the cache manager"""
+        return ttl.hard_ttl if isinstance(ttl, SoftTTL) else ttl
+
+    @staticmethod
+    def _data_size(data, response):
+        """Returns the size of the stored data, given by the client for the data received inline"""
+        return len(data) if isinstance(data, str) else response.get('size', 0)
+
+    @staticmethod
+    def _get_local(key):
+        """Returns the value from the in-process cache, or _MISSING if it is not cached or disabled"""
+        if CacheManagerUtils.local_cache is None:
+            return _MISSING
+        value = CacheManagerUtils.local_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            CacheManagerPolicy._record('increment', 'local_hits')
+        return value
+
+    @staticmethod
+    def _record(method, *args):
+        """Calls the method of the CacheStats, if enabled"""
+        if CacheManagerUtils.stats is not None:
+            getattr(CacheManagerUtils.stats, method)(*args)
+
+    @staticmethod
+    def _set_local(key, value, ttl, size):
+        """Store the value in the in-process cache, if enabled"""
+        if CacheManagerUtils.local_cache is not None:
+            CacheManagerUtils.local_cache.set(key, value, ttl, size)
+
+    @staticmethod
+    def _is_required(no_cachemanager, cachemanager_host=None):
+        """Check if cache manager is required for this execution"""
+        if cachemanager_host:
+            return not no_cachemanager
+        if not no_cachemanager:
+            raise ResultError("Cache manager host is required")
+        return False
+
+
+class CacheManagerUtils(CacheManagerPolicy):  # pylint: disable=too-few-public-methods
     """Utility functions for cache manager"""
 
     client = None
+    # in-process cache in front of the cache manager, e.g. LocalCache(), None to disable it
+    local_cache = None
+    # maximum number of seconds data read from the backend is kept in-process, when the backend does not return
+    # the time it has left there
+    local_max_age = 30
+    # backend used instead of the cache manager, e.g. a LocalFileCache
+    backend = None
+    # backend used when the cache manager host is not set or the cache manager cannot be reached
+    fallback = None
+    # encoding of the cached data, e.g. PayloadCodec(compress_threshold=65536) to compress large data
+    codec = PayloadCodec()
+    # send the data inline to the cache manager client, see CacheManagerClient
+    inline_data = False
+    # number of seconds before retrying a data retrieval function which failed, None to keep errors for the TTL
+    error_ttl = None
+    # maximum number of retries in a row of a failing data retrieval function, None for no limit
+    max_error_retries = None
+    # transport of the cache manager client, see get_transport()
+    transport = None
+    # RetryPolicy of the calls to the cache manager which fail to connect, None to not retry them
+    retry = None
+    # CircuitBreaker of the cache manager, None to always call it
+    circuit_breaker = None
+    # CacheStats recording the calls to the cache manager, None to not record them
+    stats = None
+    # coalesces the concurrent lookups of the same key within the process, e.g. SingleFlight(), None to disable it.
+    # The coalesced callers get the same value, as with local_cache
+    single_flight = None
+    # number of seconds of the lease renewed while the data retrieval function runs, None to not renew the lock
+    lock_lease = None
+    # maximum number of seconds to wait for a lock holder whose lease is renewed, None for no limit
+    max_lease_wait = 300
+    _client_lock = threading.Lock()
+    # cache manager nodes the keys are sharded across, a list of (host, port) or a string of comma separated
+    # 'host:port', used instead of host and port, see ShardedCacheManagerClient
+    endpoints = os.environ.get('OPSVIEW_CACHE_MANAGER_ENDPOINTS')
     host = os.environ.get('OPSVIEW_CACHE_MANAGER_HOST')
     port = os.environ.get('OPSVIEW_CACHE_MANAGER_PORT')
     namespace = os.environ.get('OPSVIEW_CACHE_MANAGER_NAMESPACE')
@@ -28,12 +334,75 @@ class CacheManagerUtils:  # pylint: disable=too-few-public-methods
     @staticmethod
     def _initialise_client():
         """ Initialise the client """
-        if not CacheManagerUtils.client:
-            CacheManagerUtils.client = CacheManagerClient(
-                CacheManagerUtils.host,
-                CacheManagerUtils.port,
-                CacheManagerUtils.namespace,
-            )
+        if CacheManagerUtils.client:
+            return
+        with CacheManagerUtils._client_lock:
+            if CacheManagerUtils.client:
+                return
+            if not CacheManagerUtils.endpoints:
+                CacheManagerUtils.client = CacheManagerUtils._new_client(
+                    CacheManagerUtils.host, CacheManagerUtils.port, CacheManagerUtils.circuit_breaker)
+                return
+            clients = {}
+            for host, port in parse_endpoints(CacheManagerUtils.endpoints, CacheManagerUtils.port):
+                name = endpoint_name(host, port)
+                # each node has its own circuit, so a node which is down does not stop the calls to the others
+                circuit_breaker = CacheManagerUtils.circuit_breaker
+                if circuit_breaker is not None:
+                    circuit_breaker = circuit_breaker.for_server(name)
+                clients[name] = CacheManagerUtils._new_client(host, port, circuit_breaker)
+            CacheManagerUtils.client = ShardedCacheManagerClient(clients)
+
+    @staticmethod
+    def _new_client(host, port, circuit_breaker):
+        """ Returns a client of the cache manager at the endpoint, with the settings of CacheManagerUtils """
+        return CacheManagerClient(
+            host,
+            port,
+            CacheManagerUtils.namespace,
+            inline_data=CacheManagerUtils.inline_data,
+            codec=CacheManagerUtils.codec,
+            transport=CacheManagerUtils.transport,
+            retry=CacheManagerUtils.retry,
+            circuit_breaker=circuit_breaker,
+            stats=CacheManagerUtils.stats,
+        )
+
+    @staticmethod
+    def _cachemanager_available():
+        """ Returns True if a cache manager, a backend or a fallback is configured """
+        return bool(
+            CacheManagerUtils.host or CacheManagerUtils.endpoints or CacheManagerUtils.backend
+            or CacheManagerUtils.fallback
+        )
+
+    @staticmethod
+    def _get_backend():
+        """ Returns the backend to use: the configured backend, the cache manager client or the fallback """
+        if CacheManagerUtils.backend is not None:
+            return CacheManagerUtils.backend
+        if CacheManagerUtils.host or CacheManagerUtils.endpoints:
+            CacheManagerUtils._initialise_client()
+            return CacheManagerUtils.client
+        return CacheManagerUtils.fallback
+
+    @staticmethod
+    def _call_backend(method, *args):
+        """ Calls the method of the backend, switching to the fallback if the cache manager cannot be reached.
+        Returns a tuple of (backend used, response).
+        """
+        backend = CacheManagerUtils._get_backend()
+        try:
+            return backend, getattr(backend, method)(*args)
+        except CircuitOpenError:
+            fallback = CacheManagerUtils.fallback
+            if fallback is None or backend is fallback:
+                raise
+        except SocketError as ex:
+            fallback = CacheManagerUtils.fallback
+            if fallback is None or backend is fallback:
+                raise ResultError(f"Failed to connect to cache manager: {ex}") from None
+        return fallback, getattr(fallback, method)(*args)
 
     @staticmethod
     def generate_key(*args):
@@ -53,17 +422,21 @@ class CacheManagerUtils:  # pylint: disable=too-few-public-methods
         return hash_string(DELIMITER.join(values))
 
     @staticmethod
-    def set_data(key, data, ttl=900):
+    def set_data(key, data, ttl=900, deadline=None):
         """Set data in the cache manager
 
         :param key: The key to store the data under.
         :param data: The data to store.
-        :param ttl: The number of seconds data is valid for.
+        :param ttl: The number of seconds data is valid for, or a SoftTTL.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
         """
-        CacheManagerUtils._initialise_client()
-        data = json.dumps(data)
+        value = data
+        data, local_ttl = CacheManagerUtils._encode(value, ttl)
         key = hash_string(key)
-        return CacheManagerUtils.client.set_data(key, data, ttl)
+        with deadline_scope(deadline):
+            _, response = CacheManagerUtils._call_backend('set_data', key, data, CacheManagerUtils._hard_ttl(ttl))
+        CacheManagerUtils._set_local(key, value, local_ttl, len(data))
+        return response
 
     @staticmethod
     def get_via_cachemanager(no_cachemanager, key, ttl, func, *args, **kwargs):
@@ -71,60 +444,271 @@ class CacheManagerUtils:  # pylint: disable=too-few-public-methods
 
         If the cache manager is not required, calls the function directly and returns the data.
         If the cache manager is required, tries to get the data from the cachemanager.
+        If CacheManagerUtils.backend is set, it is used instead of the cache manager.
+        If CacheManagerUtils.fallback is set, it is used when the cache manager host is not set or cannot be reached.
+        If CacheManagerUtils.endpoints is set, the keys are sharded across those cache manager nodes.
+        If the circuit breaker of the cache manager is open, the fallback is used, or the function is called directly
+        if the circuit breaker bypasses the cache, otherwise a CircuitOpenError is raised.
         If the data does not exist, calls the function and stores the returned data in the cache manager.
+        The calls to the cache manager are limited to the deadline of the check, if any.
+        If CacheManagerUtils.local_cache is set, the data is also kept in-process until it expires from the cache
+        manager, so repeated calls for the same key within the same process do not contact the cache manager again.
+        If CacheManagerUtils.single_flight is set, concurrent calls for the same key from the threads or greenlets
+        of the process share a single lookup and a single call of the function.
+        The lock is renewed while the function runs if CacheManagerUtils.lock_lease is set,
+        and the callers waiting for the data keep waiting while the lease of the lock holder is alive,
+        for up to CacheManagerUtils.max_lease_wait seconds.
+        With a SoftTTL, stale data is returned while a single caller refreshes it.
 
         :param no_cachemanager: True if cache manager is not required, False otherwise.
         :param key: The key to store the data under.
-        :param ttl: The number of seconds data is valid for.
+        :param ttl: The number of seconds data is valid for, or a SoftTTL.
         :param func: The function to retrieve the data, if the data is not in the cache manager.
         :param args: The arguments to pass to the user's data retrieval function.
         :param kwargs: The keyword arguments to pass to the user's data retrieval function.
         """
-        if not CacheManagerUtils._is_required(no_cachemanager, CacheManagerUtils.host):
+        if not CacheManagerUtils._is_required(no_cachemanager, CacheManagerUtils._cachemanager_available()):
             data = func(*args, **kwargs)
             return data
 
-        CacheManagerUtils._initialise_client()
-
         key = hash_string(key)
+        data = CacheManagerUtils._get_local(key)
+        if data is not _MISSING:
+            return data
+
+        call = functools.partial(func, *args, **kwargs)
+        single_flight = CacheManagerUtils.single_flight
+        if single_flight is None:
+            return CacheManagerUtils._lookup(key, ttl, call)
+        return single_flight.do(key, CacheManagerUtils._lookup, key, ttl, call)
+
+    @staticmethod
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def get_view_via_cachemanager(no_cachemanager, key, view, views, ttl, func, *args, **kwargs):
+        """Gets a view of the data via the cache manager, e.g. the few fields a check reads from a large response
+
+        Works like get_via_cachemanager, except that only the views of the data returned by the function
+        are cached, each under its own key, so the checks download and decode the view they need only.
+        When the view is missing, the function is called once, the requested view is stored under its key
+        with the lock, and the other views are stored under theirs, so they are found by the next checks.
+
+        :param no_cachemanager: True if cache manager is not required, False otherwise.
+        :param key: The key of the data, the views are stored under keys derived from it.
+        :param view: The name of the view to return.
+        :param views: A dictionary of view name: function returning the view from the data of func.
+        :param ttl: The number of seconds the views are valid for, or a SoftTTL.
+        :param func: The function to retrieve the data, if the view is not in the cache manager.
+        :param args: The arguments to pass to the user's data retrieval function.
+        :param kwargs: The keyword arguments to pass to the user's data retrieval function.
+        """
+        if view not in views:
+            raise ValueError(f"Unknown view {view}")
+        if not CacheManagerUtils._is_required(no_cachemanager, CacheManagerUtils._cachemanager_available()):
+            return views[view](func(*args, **kwargs))
+
+        def call():
+            data = func(*args, **kwargs)
+            values = {name: project(data) for name, project in views.items()}
+            others = {CacheManagerUtils.view_key(key, name): value for name, value in values.items() if name != view}
+            if others:
+                CacheManagerUtils._set_views(others, ttl)
+            return values[view]
+
+        return CacheManagerUtils.get_via_cachemanager(False, CacheManagerUtils.view_key(key, view), ttl, call)
+
+    @staticmethod
+    def view_key(key, view):
+        """Returns the key the view of the data of the key is stored under, see get_view_via_cachemanager()"""
+        return f'{key}{DELIMITER}view{DELIMITER}{view}'
+
+    @staticmethod
+    def _set_views(items, ttl):
+        """Stores the views of the data, unlocked, in a single request. They are only stored for the next checks,
+        so a failure to store them is ignored.
+        """
+        local_ttl = ttl.ttl if isinstance(ttl, SoftTTL) else ttl
+        encoded = {}
+        for key, value in items.items():
+            data = ttl.wrap(value, 0) if isinstance(ttl, SoftTTL) else value
+            encoded[hash_string(key)] = (value, CacheManagerUtils.codec.dumps(data))
         try:
-            response = CacheManagerUtils.client.get_data(key)
-        except SocketError as ex:
-            raise ResultError(f"Failed to connect to cache manager: {ex}") from None
-        data, lock = response['data'], response['lock']
-        if lock:
-            # Any exceptions in the function call will be stored in the cache manager under the 'error' key
+            CacheManagerUtils._call_backend(
+                'set_many', {key: data for key, (_, data) in encoded.items()}, CacheManagerUtils._hard_ttl(ttl))
+        except (ResultError, CircuitOpenError):
+            return
+        for key, (value, data) in encoded.items():
+            CacheManagerUtils._set_local(key, value, local_ttl, len(data))
+
+    @staticmethod
+    def _lookup(key, ttl, call):
+        """Gets the data of the hashed key from the backend, calling the function if it is missing or stale"""
+        start = time.monotonic()
+        try:
+            backend, response = CacheManagerUtils._call_backend('get_data', key, CacheManagerUtils._lease_wait(start))
+            while CacheManagerUtils._lease_alive(response):
+                backend, response = CacheManagerUtils._call_backend(
+                    'get_data', key, CacheManagerUtils._lease_wait(start))
+        except CircuitOpenError as ex:
+            CacheManagerUtils._bypass(ex)
+            return call()
+        CacheManagerUtils._record('record_lookup', response, time.monotonic() - start)
+        if response['lock']:
+            with CacheManagerUtils._lock_lease(backend, [key]):
+                data = CacheManagerUtils._fetch(backend, key, ttl, call)
+            return CacheManagerUtils._keep(key, ttl, data, CacheManagerUtils._decode(data))
+        decoded = CacheManagerUtils._decode(response['data'])
+        refresh, failures = CacheManagerUtils._needs_refresh(ttl, *decoded)
+        if refresh:
+            data = CacheManagerUtils._refresh(backend, key, ttl, call, failures)
+            if data is not None:
+                return CacheManagerUtils._keep(key, ttl, data, CacheManagerUtils._decode(data))
+        return CacheManagerUtils._keep(key, ttl, response['data'], decoded, response)
+
+    @staticmethod
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def _fetch(backend, key, ttl, call, failures=0, store_error=True):
+        """Calls the data retrieval function and stores its data, or its error unless store_error is False.
+        Returns the data, also when the cache manager fails to store it, or None if there is nothing to store.
+        """
+        start = time.monotonic()
+        # Any exceptions in the function call will be stored in the cache manager under the 'error' key
+        try:
+            value, error = call(), None
+        except Exception as ex:  # pylint: disable=broad-except
+            value, error = None, ex
+        data = CacheManagerUtils._fetched_data(ttl, start, value, error, failures, store_error)
+        if data is not None:
             try:
-                data = func(*args, **kwargs)
-            except Exception as ex:  # pylint: disable=broad-except
-                data = {'error': str(ex)}
-            data = json.dumps(data)
-            CacheManagerUtils.client.set_data(key, data, ttl)
-        if not data:
-            raise ResultError("Failed to retrieve data from cache manager")
-        data = json.loads(data)
+                backend.set_data(key, data, CacheManagerUtils._hard_ttl(ttl))
+            except (ResultError, CircuitOpenError, SocketError):
+                # the data is returned to the caller, the next callers retrieve it again
+                pass
         return data
 
     @staticmethod
-    def _is_required(no_cachemanager, cachemanager_host=None):
-        """Check if cache manager is required for this execution"""
-        if cachemanager_host:
-            return not no_cachemanager
-        if not no_cachemanager:
-            raise ResultError("Cache manager host is required")
-        return False
+    def _refresh(backend, key, ttl, call, failures=None):
+        """Refreshes the data if no other caller is refreshing it, returns the stored data or None.
+        When refreshing an error, failures is its number of failures, and a new error is stored if the call fails.
+        Otherwise, the stale data is kept if the call fails.
+        The stale data is also kept if the cache manager fails during the refresh.
+        """
+        refresh_key = CacheManagerUtils._refresh_key(key)
+        try:
+            if not backend.get_data(refresh_key, 0)['lock']:
+                return None
+        except (ResultError, CircuitOpenError, SocketError):
+            return None
+        data = CacheManagerUtils._fetch(backend, key, ttl, call, failures or 0, store_error=failures is not None)
+        try:
+            backend.set_data(refresh_key, *CacheManagerUtils._refresh_marker(ttl, data))
+        except (ResultError, CircuitOpenError, SocketError):
+            pass
+        return data
 
+    @staticmethod
+    def _lock_lease(backend, keys):
+        """Returns a context manager renewing the locks held on the keys, if enabled"""
+        if CacheManagerUtils.lock_lease is None:
+            return contextlib.nullcontext()
+        return LockLease(backend, keys, CacheManagerUtils.lock_lease)
+
+    @staticmethod
+    def get_many_via_cachemanager(no_cachemanager, keys, ttl, func, *args, **kwargs):  # pylint: disable=too-many-locals
+        """Gets the data of many keys via the cache manager, in a single request
+
+        Works like get_via_cachemanager, except that func is called once, with the list of the keys
+        for which this call got the lock, and must return a dictionary of key: data.
+        The data of those keys is then stored in the cache manager together.
+
+        :param no_cachemanager: True if cache manager is not required, False otherwise.
+        :param keys: The keys the data is stored under.
+        :param ttl: The number of seconds data is valid for, a SoftTTL is not supported.
+        :param func: The function to retrieve the data of the keys, if the data is not in the cache manager.
+        :param args: The additional arguments to pass to the user's data retrieval function.
+        :param kwargs: The keyword arguments to pass to the user's data retrieval function.
+        :returns: A dictionary of key: data, in the order of the keys.
+        """
+        if isinstance(ttl, SoftTTL):
+            raise ValueError("A SoftTTL is not supported by get_many_via_cachemanager")
+        if not CacheManagerUtils._is_required(no_cachemanager, CacheManagerUtils._cachemanager_available()):
+            data = func(list(keys), *args, **kwargs)
+            return {key: data.get(key) for key in keys}
+
+        hashed_keys = {key: hash_string(key) for key in keys}
+        values = {key: CacheManagerUtils._get_local(hashed_key) for key, hashed_key in hashed_keys.items()}
+        missing = [key for key, value in values.items() if value is _MISSING]
+        if not missing:
+            return values
+
+        start = time.monotonic()
+        try:
+            backend, responses = CacheManagerUtils._call_backend(
+                'get_many', [hashed_keys[key] for key in missing], CacheManagerUtils._lease_wait(start))
+        except CircuitOpenError as ex:
+            CacheManagerUtils._bypass(ex)
+            data = func(missing, *args, **kwargs)
+            values.update({key: data.get(key) for key in missing})
+            return values
+        waiting = [key for key in missing if CacheManagerUtils._lease_alive(responses.get(hashed_keys[key]) or {})]
+        while waiting:
+            backend, more = CacheManagerUtils._call_backend(
+                'get_many', [hashed_keys[key] for key in waiting], CacheManagerUtils._lease_wait(start))
+            responses.update(more)
+            waiting = [key for key in waiting if CacheManagerUtils._lease_alive(more.get(hashed_keys[key]) or {})]
+        seconds = time.monotonic() - start
+        locked = []
+        for key in missing:
+            response = responses.get(hashed_keys[key]) or {}
+            CacheManagerUtils._record('record_lookup', response, seconds)
+            if response.get('lock'):
+                locked.append(key)
+            elif not response.get('data'):
+                raise ResultError(f"Failed to retrieve data for {key} from cache manager")
+        if locked:
+            with CacheManagerUtils._lock_lease(backend, [hashed_keys[key] for key in locked]):
+                computed, failed = CacheManagerUtils._compute_many(locked, func, *args, **kwargs)
+            store_ttl = ttl
+            if failed and CacheManagerUtils.error_ttl is not None:
+                # the function failed for all the locked keys, the keys read from the cache manager are not errors
+                store_ttl = min(ttl, CacheManagerUtils.error_ttl)
+            try:
+                backend.set_many({hashed_keys[key]: computed[key] for key in locked}, store_ttl)
+            except (ResultError, CircuitOpenError, SocketError):
+                # the data is returned to the caller, the next callers retrieve it again
+                pass
+            responses.update({hashed_keys[key]: {'data': computed[key]} for key in locked})
+        for key in missing:
+            response = responses[hashed_keys[key]]
+            decoded = CacheManagerUtils._decode(response['data'])
+            values[key] = CacheManagerUtils._keep(
+                hashed_keys[key], ttl, response['data'], decoded, None if key in locked else response)
+        return values
+
+    @staticmethod
+    def _compute_many(keys, func, *args, **kwargs):
+        """Calls the data retrieval function for the keys.
+        Returns a tuple of (dictionary of key: serialised data, True if the function failed).
+        """
+        # Any exceptions in the function call will be stored in the cache manager under the 'error' key
+        codec = CacheManagerUtils.codec
+        start = time.monotonic()
+        try:
+            data = func(keys, *args, **kwargs)
+        except Exception as ex:  # pylint: disable=broad-except
+            CacheManagerUtils._record('record_fetch', time.monotonic() - start, True)
+            return dict.fromkeys(keys, codec.dumps(CacheManagerUtils._error_data(ex, 1))), True
+        CacheManagerUtils._record('record_fetch', time.monotonic() - start)
+        return {key: codec.dumps(data.get(key)) for key in keys}, False
 
-class CacheManagerClient:
-    """A simple client to contact the cachemanager and set or get cached data"""
 
-    HTTP_STATUS_OK_MIN = 200
-    HTTP_STATUS_OK_MAX = 299
+class CacheManagerClient(CacheManagerProtocol):  # pylint: disable=too-many-instance-attributes
+    """A simple client to contact the cachemanager and set or get cached data"""
 
     # pylint: disable=too-many-arguments, too-many-positional-arguments
     def __init__(
             self, host, port, namespace,
-            concurrency=1, connection_timeout=30, network_timeout=30
+            concurrency=1, connection_timeout=30, network_timeout=30, batch_concurrency=8,
+            inline_data=False, codec=None, transport=None, retry=None, circuit_breaker=None, stats=None,
     ):
         """Constructor for Cache Manager Client
 
@@ -134,69 +718,251 @@ class CacheManagerClient:
         :param concurrency: Number of concurrent http connections allowed (default is 1).
         :param connection_timeout: Number of seconds before HTTP connection times out.
         :param network_timeout: Number of seconds before the data read times out.
+        :param batch_concurrency: Number of concurrent http connections used by get_many and set_many
+            when the cache manager does not support batch requests (default is 8).
+        :param inline_data: True to send the JSON data inline, as {"value": data}, instead of as a JSON string,
+            so it is not encoded and decoded twice. Requires a cache manager storing any JSON data (default is False).
+        :param codec: The PayloadCodec used to encode the requests (default is a PayloadCodec with no compression).
+        :param transport: The kind of transport, 'gevent', 'http' or 'unix', see get_transport() (default is 'unix'
+            if host is the absolute path of a Unix domain socket, 'gevent' otherwise).
+        :param retry: The RetryPolicy of the requests which fail to connect (default is None, no retries).
+        :param circuit_breaker: The CircuitBreaker of the cache manager (default is None, no circuit breaker).
+        :param stats: The CacheStats recording the requests (default is None, requests not recorded).
         """
-        self._namespace = namespace
-        self._headers = {'Referer': host, 'Content-Type': 'application/json'}
-        self._http_client = HTTPClient(
+        super().__init__(host, namespace, codec, retry, circuit_breaker, stats)
+        self._inline_data = inline_data
+        self._http_client = get_transport(
             host,
             port,
+            transport,
             concurrency=concurrency,
             connection_timeout=connection_timeout,
             network_timeout=network_timeout,
         )
+        self._batch_client_args = (host, port, transport, batch_concurrency, connection_timeout, network_timeout)
+        self._batch_http_client = None
+        self._batch_lock = threading.Lock()
+        self._lease_http_client = None
 
-    def get_data(self, key, max_wait_time=30):
+    def get_data(self, key, max_wait_time=30, deadline=None):
         """Gets data from the cache. Optionally, may get a lock if there is no data present.
 
         :param key: The key of the data element to fetch, within the namespace.
-        :param max_wait_time: Max time to wait for a lock (seconds).
+        :param max_wait_time: Max time to wait for a lock (seconds), capped to the time left until the deadline.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
         :returns: A tuple of (data, lock_key). The 'lock_key' may be None.
+            A cache manager supporting leases also returns the number of seconds left of the lease of the lock
+            holder under the 'lease' key, when the max wait time passed before the data was stored,
+            and may return the number of seconds left until the data expires under the 'ttl' key.
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
         """
-        params = {
-            'namespace': self._namespace,
-            'key': key,
-            'max_wait_time': max_wait_time,
-        }
-        return self._post('get_data', params)
+        with deadline_scope(deadline):
+            params = self._get_data_params(key, self._cap_wait_time(max_wait_time))
+            if not self._inline_data:
+                return self._post('get_data', params)
+            response, size = self._post('get_data', params, sized=True)
+        return self._set_size(response, size)
+
+    def get_many(self, keys, max_wait_time=30, deadline=None):
+        """Gets the data of many keys from the cache. Optionally, may get a lock for the keys with no data present.
+
+        The keys are fetched in a single request if the cache manager supports it,
+        otherwise with concurrent get_data requests.
 
-    def set_data(self, key, data, ttl=900):
+        :param keys: The keys of the data elements to fetch, within the namespace.
+        :param max_wait_time: Max time to wait for a lock (seconds), capped to the time left until the deadline.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: A dictionary of key: response, each response has the same 'data' and 'lock' keys as get_data.
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        keys = list(dict.fromkeys(keys))
+        with deadline_scope(deadline):
+            max_wait_time = self._cap_wait_time(max_wait_time)
+            responses = self._post_batch('get_many', self._get_many_params(keys, max_wait_time))
+            if responses is _UNSUPPORTED:
+                responses = dict(zip(keys, self._post_concurrently(
+                    'get_data', [self._get_data_params(key, max_wait_time) for key in keys])))
+            elif self._inline_data:
+                responses, size = responses
+                responses = {key: self._set_size(response, size // len(keys)) for key, response in responses.items()}
+        return self._responses(keys, responses)
+
+    def set_data(self, key, data, ttl=900, deadline=None):
         """Sets data into the cache.
 
         :param key: The key of the data element to store, within the namespace.
         :param data: The data to store.
         :param ttl: The time that the data is valid for (seconds).
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
         """
-        params = {
-            'namespace': self._namespace,
-            'key': key,
-            'data': data,
-            'ttl': ttl,
-        }
-        return self._post('set_data', params)
+        with deadline_scope(deadline):
+            return self._post('set_data', self._encode_data(self._set_data_params(key, data, ttl)))
+
+    def set_many(self, items, ttl=900, deadline=None):
+        """Sets the data of many keys into the cache.
 
-    def status(self):
-        """Fetches the current status of the cache."""
-        return self._send(self._http_client.get, 'status')
+        The data is stored in a single request if the cache manager supports it,
+        otherwise with concurrent set_data requests.
+
+        :param items: A dictionary of key: data to store, within the namespace.
+        :param ttl: The time that the data is valid for (seconds).
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        with deadline_scope(deadline):
+            response = self._post_batch('set_many', self._encode_data(self._set_many_params(items, ttl)))
+            if response is _UNSUPPORTED:
+                response = self._post_concurrently('set_data', [
+                    self._encode_data(self._set_data_params(key, data, ttl)) for key, data in items.items()
+                ])
+            elif self._inline_data:
+                response = response[0]
+        return response
+
+    def renew_lock(self, key, lease=30, deadline=None):
+        """Renews the lock held on the key, so the callers waiting for its data keep waiting, see LockLease.
+
+        The renewals are sent on a connection of the standard library if the client uses gevent,
+        so they can be sent from a thread while the lock holder blocks.
+
+        :param key: The key of the data element whose lock is held, within the namespace.
+        :param lease: The number of seconds the lock is kept for, unless renewed again.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: True if the lock was renewed, False if it is no longer held or the cache manager
+            does not support leases.
+
+        Raises DeadlineExceeded if the call cannot complete before the deadline.
+        """
+        if self._lease_supported is False:
+            return False
+        with deadline_scope(deadline):
+            response = self._send(
+                self._lease_transport().post, 'renew_lock', self._renew_lock_params(key, lease), allow_unsupported=True)
+        return self._lock_renewed(response)
+
+    def status(self, deadline=None):
+        """Fetches the current status of the cache.
+
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        """
+        with deadline_scope(deadline):
+            return self._send(self._http_client.get, 'status')
 
     def close(self):
         """Close a client connection"""
         if self._http_client:
             self._http_client.close()
+            self._http_client = None
+        if self._batch_http_client:
+            self._batch_http_client.close()
+            self._batch_http_client = None
+        if self._lease_http_client:
+            self._lease_http_client.close()
+            self._lease_http_client = None
+
+    def _encode_data(self, params):
+        """Returns the request body of the params with the data inlined, or the params if the data is not inlined"""
+        if not self._inline_data:
+            return params
+        fields = {name: value for name, value in params.items() if name not in ('data', 'items')}
+        body = self._codec.json_dumps(fields)
+        # the JSON text of the data is added to the body without the closing brace, instead of being encoded again
+        if 'data' in params:
+            return f'{body[:-1]}, "data": {self._inline(params["data"])}}}'
+        items = ', '.join(
+            f'{self._codec.json_dumps(key)}: {self._inline(data)}' for key, data in params['items'].items())
+        return f'{body[:-1]}, "items": {{{items}}}}}'
+
+    def _inline(self, data):
+        if isinstance(data, str) and PayloadCodec.is_json(data):
+            return f'{{"{INLINE_KEY}": {data}}}'
+        return self._codec.json_dumps(data)
 
-    def _post(self, path, data):
-        return self._send(self._http_client.post, path, data)
+    @staticmethod
+    def _set_size(response, size):
+        if response and not isinstance(response.get('data'), (str, type(None))):
+            response['size'] = size
+        return response
+
+    def _post(self, path, data, **kwargs):
+        return self._send(self._http_client.post, path, data, **kwargs)
+
+    def _post_batch(self, path, data):
+        """Posts a batch request, returns _UNSUPPORTED if the cache manager does not support it"""
+        if self._batch_supported is False:
+            return _UNSUPPORTED
+        return self._batch_response(
+            self._send(self._http_client.post, path, data, allow_unsupported=True, sized=self._inline_data))
+
+    def _lease_transport(self):
+        """Returns the transport of the lease renewals"""
+        if not self._http_client.cooperative:
+            return self._http_client
+        host, port, _, _, connection_timeout, network_timeout = self._batch_client_args
+        with self._batch_lock:
+            if not self._lease_http_client:
+                self._lease_http_client = get_transport(
+                    host,
+                    port,
+                    'http',
+                    connection_timeout=connection_timeout,
+                    network_timeout=network_timeout,
+                )
+            return self._lease_http_client
+
+    def _post_concurrently(self, path, params):
+        """Posts a request for each of the params, on a pool of connections. Returns the list of responses."""
+        host, port, transport, concurrency, connection_timeout, network_timeout = self._batch_client_args
+        with self._batch_lock:
+            if not self._batch_http_client:
+                self._batch_http_client = get_transport(
+                    host,
+                    port,
+                    transport,
+                    concurrency=concurrency,
+                    connection_timeout=connection_timeout,
+                    network_timeout=network_timeout,
+                )
+            batch_http_client = self._batch_http_client
+        # greenlets and threads do not inherit the context of the caller, so the deadline is passed on explicitly
+        deadline = get_deadline()
+
+        def post(data):
+            with deadline_scope(deadline):
+                if self._inline_data:
+                    return self._set_size(*self._send(batch_http_client.post, path, data, sized=True))
+                return self._send(batch_http_client.post, path, data)
+
+        if not batch_http_client.cooperative:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                return list(executor.map(post, params))
+        # only imported when used, as importing gevent is slow
+        from gevent.pool import Pool  # pylint: disable=import-outside-toplevel
+        return Pool(concurrency).map(post, params)
 
-    def _send(self, method, path, data=None):
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def _send(self, method, path, data=None, allow_unsupported=False, sized=False):
+        """Sends the request, returns the decoded response, and its size if sized is True"""
+        body = None
         if data:
-            body = json.dumps(data)
-            response = method(path, body=body, headers=self._headers)
-        else:
-            response = method(path, headers=self._headers)
-        self._check_for_error(response)
-        raw_response = response.read()
-        return json.loads(raw_response) if raw_response else None
-
-    def _check_for_error(self, response):
-        if (response.status_code < self.HTTP_STATUS_OK_MIN) or (response.status_code > self.HTTP_STATUS_OK_MAX):
-            raw_body = response.read()
-            raise ResultError(f"{response.status_code}: {response.status_message} - {raw_body}")
+            body = data if isinstance(data, str) else self._codec.json_dumps(data)
+        start = time.monotonic()
+        with self._record_errors(path, start, body), deadline_timeout(
+                f"call {path} on the cache manager", self._http_client.cooperative):
+            if body is not None:
+                response = self._request(method, path, body=body, headers=self._headers)
+            else:
+                response = self._request(method, path, headers=self._headers)
+            return self._read(path, start, body, response, allow_unsupported, sized)
+
+    def _request(self, method, path, **kwargs):
+        """Sends the request through the circuit breaker, retrying it according to the retry policy"""
+        with circuit_guard(self._circuit_breaker, "cache manager"):
+            if self._retry is None:
+                return method(path, **kwargs)
+            return self._retry.call(method, path, idempotent=path not in self.LOCKING_REQUESTS, **kwargs)
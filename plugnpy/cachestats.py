@@ -0,0 +1,165 @@
+"""
+CacheStats Class, counts the calls made to the cache manager by a check.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import json
+import threading
+
+from .metric import Metric
+from .utils import locked_file
+
+
+class CacheStats:
+    """Object recording the calls to the cache manager, to see where the time of a check goes.
+
+    CacheManagerClient records the latency, errors and payload bytes of its requests,
+    CacheManagerUtils records the outcome of each lookup: in-process cache hits, cache manager hits,
+    locks handed out, time blocked waiting for another caller holding the lock,
+    and the time spent in the data retrieval functions.
+
+    The cache manager does not tell whether a get_data request waited for a lock,
+    so a request returning data in more than lock_wait_threshold seconds is counted as a lock wait instead of a hit.
+
+    The counters can be added to a Check as hidden performance data with attach(),
+    or added to a JSON file aggregating the counters of all the checks running on a collector with dump().
+
+    Keyword Arguments:
+        - prefix -- Prefix of the names of the metrics (default: 'cachemanager_')
+        - lock_wait_threshold -- Number of seconds after which a get_data request returning data
+          is counted as a lock wait (default: 0.1)
+    """
+
+    COUNTERS = (
+        'local_hits', 'hits', 'lock_waits', 'lock_wait_time', 'locks', 'lock_timeouts',
+        'fetches', 'fetch_time', 'fetch_errors',
+    )
+    CALL_COUNTERS = ('count', 'errors', 'time', 'max_time', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, prefix='cachemanager_', lock_wait_threshold=0.1):
+        self.prefix = prefix
+        self.lock_wait_threshold = lock_wait_threshold
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.calls = {}
+
+    def record_call(self, method, seconds, bytes_sent=0, bytes_received=0, error=False):
+        """Records a request to the cache manager.
+
+        :param method: The request, e.g. 'get_data'.
+        :param seconds: The latency of the request.
+        :param bytes_sent: The size of the request body.
+        :param bytes_received: The size of the response body.
+        :param error: True if the request failed.
+        """
+        with self._lock:
+            call = self.calls.get(method)
+            if call is None:
+                call = self.calls[method] = dict.fromkeys(self.CALL_COUNTERS, 0)
+            call['count'] += 1
+            call['errors'] += bool(error)
+            call['time'] += seconds
+            call['max_time'] = max(call['max_time'], seconds)
+            call['bytes_sent'] += bytes_sent
+            call['bytes_received'] += bytes_received
+
+    def record_lookup(self, response, seconds):
+        """Records the outcome of a get_data request of CacheManagerUtils.
+
+        :param response: The response, with the 'data' and 'lock' keys.
+        :param seconds: The latency of the request.
+        """
+        if response.get('lock'):
+            self.increment('locks')
+        elif not response.get('data'):
+            self.increment('lock_timeouts')
+            self.increment('lock_wait_time', seconds)
+        elif seconds > self.lock_wait_threshold:
+            self.increment('lock_waits')
+            self.increment('lock_wait_time', seconds)
+        else:
+            self.increment('hits')
+
+    def record_fetch(self, seconds, error=False):
+        """Records a call of a data retrieval function"""
+        self.increment('fetches')
+        self.increment('fetch_time', seconds)
+        if error:
+            self.increment('fetch_errors')
+
+    def increment(self, counter, value=1):
+        """Adds the value to the counter"""
+        with self._lock:
+            self.counters[counter] += value
+
+    def hit_ratio(self):
+        """Returns the percentage of the lookups which did not call the data retrieval function, or None"""
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['local_hits'] + counters['hits'] + counters['lock_waits'] + counters['locks']
+        if not lookups:
+            return None
+        return 100.0 * (lookups - counters['locks']) / lookups
+
+    def as_dict(self):
+        """Returns a copy of the counters, as a dictionary with the 'counters' and 'calls' keys"""
+        with self._lock:
+            calls = {method: dict(call) for method, call in self.calls.items()}
+            return {'counters': dict(self.counters), 'calls': calls}
+
+    def metrics(self):
+        """Returns the counters as hidden metrics, displayed in the performance data only"""
+        stats = self.as_dict()
+        counters = stats['counters']
+        values = [(name, counters[name], 's' if name.endswith('_time') else '') for name in self.COUNTERS]
+        hit_ratio = self.hit_ratio()
+        if hit_ratio is not None:
+            values.append(('hit_ratio', hit_ratio, '%'))
+        for method, call in sorted(stats['calls'].items()):
+            values.extend([
+                (f'{method}_calls', call['count'], ''),
+                (f'{method}_errors', call['errors'], ''),
+                (f'{method}_time', call['time'], 's'),
+                (f'{method}_max_time', call['max_time'], 's'),
+            ])
+        values.extend([
+            ('bytes_sent', sum(call['bytes_sent'] for call in stats['calls'].values()), 'B'),
+            ('bytes_received', sum(call['bytes_received'] for call in stats['calls'].values()), 'B'),
+        ])
+        return [
+            Metric(
+                f'{self.prefix}{name}', value, unit, display_in_summary=False, convert_metric=False,
+                perf_data_precision=3 if unit in ('s', '%') else 0,
+            )
+            for name, value, unit in values
+        ]
+
+    def attach(self, check):
+        """Adds the counters to the performance data of the check when its output is written"""
+        check.add_metric_source(self.metrics)
+
+    def dump(self, path):
+        """Adds the counters to the ones stored in the JSON file, created if it does not exist.
+        The file is locked with flock() while it is updated, so many checks can add their counters to the same file.
+        """
+        stats = self.as_dict()
+        with locked_file(path) as stats_file:
+            try:
+                total = json.loads(stats_file.read())
+            except ValueError:
+                total = {}
+            total.setdefault('checks', 0)
+            total['checks'] += 1
+            counters = total.setdefault('counters', {})
+            for name, value in stats['counters'].items():
+                counters[name] = counters.get(name, 0) + value
+            calls = total.setdefault('calls', {})
+            for method, call in stats['calls'].items():
+                total_call = calls.setdefault(method, dict.fromkeys(self.CALL_COUNTERS, 0))
+                for name, value in call.items():
+                    total_call[name] = max(total_call.get(name, 0), value) if name == 'max_time' else (
+                        total_call.get(name, 0) + value)
+            stats_file.seek(0)
+            stats_file.truncate()
+            stats_file.write(json.dumps(total))
+        return total
@@ -3,27 +3,117 @@ Check class, contains Check Object that controls the check execution.
 Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
 """
 
+import itertools
+import os
 import sys
+import threading
+from .collector import DEFAULT_MAX_WORKERS, CollectorPool
+from .deadline import Deadline, Watchdog, reset_deadline, set_deadline
 from .metric import Metric
+from .metricbatch import MetricBatch
+from .output import OutputWriter
 
 
-class Check():
+class Check():  # pylint: disable=too-many-instance-attributes
     """Object for defining and running Opsview Service Checks.
 
+    The states of the metrics are tracked as they are added, so the exit code is known without going through
+    the metrics again. The metrics appended to self.metrics directly, and the changes of the state of a Metric,
+    are detected and the states tracked again; the states of a MetricBatch must not be changed once it is added.
+
     Keyword Arguments:
         - state_type -- The string printed before the Service Check status (default: METRIC)
         - sep -- The string separating each metric's output (default: ', ')
+        - max_output_bytes -- Maximum size of the output in bytes, truncated at whole metrics (default: no limit)
+        - deadline -- Number of seconds after which the metrics added so far are output with an UNKNOWN status
+            (default: no deadline)
+        - deadline_signal -- True to interrupt the main thread with SIGALRM at the deadline, instead of writing
+            the output from a timer thread and exiting the process, see Watchdog (default: False)
     """
     STATUS = {0: 'OK', 1: 'WARNING', 2: 'CRITICAL', 3: 'UNKNOWN'}
 
-    def __init__(self, state_type="METRIC", sep=', '):
+    PARTIAL_RESULTS_MESSAGE = "Partial results, check did not complete within {seconds}s"
+
+    # the partial results are output a little before the deadline, so they are written before it is reached
+    OUTPUT_MARGIN = 0.5
+    OUTPUT_MARGIN_RATIO = 0.1
+
+    METRIC_NAME_REPLACEMENTS = str.maketrans({"'": '_', '"': '_', '=': '_'})
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, state_type="METRIC", sep=', ', max_output_bytes=None, deadline=None, deadline_signal=False):
         self.state_type = state_type
         self.sep = sep
+        self.max_output_bytes = max_output_bytes
         self.metrics = []
+        self._metric_sources = []
+        self._state = Metric.STATUS_OK
+        self._state_counts = dict.fromkeys(Check.STATUS, 0)
+        # number of metrics of self.metrics whose states are tracked
+        self._tracked = 0
+        # Metric.state_generation when the states were tracked
+        self._state_generation = Metric.state_generation
+        self._output_lock = threading.RLock()
+        self._output_claimed = False
+        self._output_done = threading.Event()
+        self.deadline = None
+        self._deadline_token = None
+        self._watchdog = None
+        if deadline is not None:
+            self.deadline = Deadline(deadline)
+            self._deadline_token = set_deadline(self.deadline)
+            margin = min(Check.OUTPUT_MARGIN, deadline * Check.OUTPUT_MARGIN_RATIO)
+            self._watchdog = Watchdog(deadline - margin, self._deadline_exceeded, use_signal=deadline_signal)
+            self._watchdog.start()
+
+    @property
+    def state(self):
+        """The worst state of the metrics added so far"""
+        self._check_tracked()
+        return self._state
+
+    @property
+    def state_counts(self):
+        """The number of metrics added so far in each state, by status code"""
+        self._check_tracked()
+        return dict(self._state_counts)
+
+    def _count_state(self, state, count=1):
+        """Track the state of newly added metrics"""
+        self._state_counts[state] = self._state_counts.get(state, 0) + count
+        if count and state > self._state:
+            self._state = state
+
+    def _append(self, metric, state_counts):
+        """Add a Metric or MetricBatch, tracking the states of its metrics"""
+        self._check_tracked()
+        self.metrics.append(metric)
+        self._tracked += 1
+        for state, count in state_counts.items():
+            self._count_state(state, count)
+
+    def _check_tracked(self):
+        """Tracks the states again if self.metrics was changed other than by the add_metric methods,
+        or the state of a Metric was changed since they were tracked"""
+        if self._tracked != len(self.metrics) or self._state_generation != Metric.state_generation:
+            self._track_all()
+
+    def _track_all(self):
+        """Tracks the states of all the metrics, as they are now"""
+        self._state_generation = Metric.state_generation
+        self._state = Metric.STATUS_OK
+        self._state_counts = dict.fromkeys(Check.STATUS, 0)
+        self._tracked = len(self.metrics)
+        for metric in self.metrics:
+            if isinstance(metric, MetricBatch):
+                for state, count in metric.state_counts.items():
+                    self._count_state(state, count)
+            else:
+                self._count_state(metric.state)
 
     def add_metric_obj(self, metric_obj):
         """Add a metric to the check's performance data from an existing Metric object"""
-        self.metrics.append(metric_obj)
+        self._append(metric_obj, {metric_obj.state: 1})
 
     def add_metric(  # pylint: disable=too-many-arguments, too-many-positional-arguments, too-many-locals
             self, name, value, unit='', warning_threshold=None,
@@ -58,17 +148,74 @@ class Check():
             summary_precision=summary_precision, perf_data_precision=perf_data_precision,
             message=message,
         )
-        self.metrics.append(metric)
+        self._append(metric, {metric.state: 1})
+
+    def add_metrics(  # pylint: disable=too-many-arguments, too-many-positional-arguments
+            self, names, values, unit='', warning_threshold=None, critical_threshold=None, **shared_options):
+        """Add many metrics sharing the same unit, thresholds and display options to the check's performance data.
+
+        The metrics are stored in a single MetricBatch and are rendered without creating a Metric object per value.
+
+        Keyword Arguments:
+        - names -- Sequence of names of the Metrics
+        - values -- Sequence of numeric values of the Metrics (note: do not include unit of measure)
+        - unit -- Unit of Measure of the Metrics
+        - warning_threshold -- Warning threshold for the Metrics (default: '')
+        - critical_threshold -- Critical threshold for the Metrics (default: '')
+        - shared_options -- Any other MetricBatch option, e.g. display_format, display_names, convert_metric
+        """
+        batch = MetricBatch(names, values, unit, warning_threshold, critical_threshold, **shared_options)
+        self._append(batch, batch.state_counts)
+
+    def add_metric_source(self, source):
+        """Add a callable returning Metric objects, which are added to the check when its output is written,
+        e.g. the metrics() method of a CacheStats"""
+        self._metric_sources.append(source)
+
+    def add_unknown(self, name, message):
+        """Add a metric in UNKNOWN state, displayed as the message in the summary and without performance data"""
+        self._check_tracked()
+        metric = Metric(name, None, '', display_in_perf=False, message=message)
+        metric.state = Metric.STATUS_UNKNOWN
+        # the state of the new metric is tracked when it is added, the other metrics need not be tracked again
+        self._state_generation = Metric.state_generation
+        self.add_metric_obj(metric)
+
+    def collect(self, collectors, timeout=None, max_workers=DEFAULT_MAX_WORKERS):
+        """Run independent data collectors concurrently and return their results.
+
+        Collectors which raise an exception or time out are added to the check as UNKNOWN metrics,
+        and are missing from the returned results.
+        When the check has a deadline, collectors still running when it is reached are timed out.
+
+        Keyword Arguments:
+        - collectors -- Dictionary of name: callable, each callable is called without arguments
+        - timeout -- Number of seconds each collector may run for, or a dictionary of name: seconds (default: no limit)
+        - max_workers -- Maximum number of collectors running at the same time (default: 8)
+        """
+        results, errors = CollectorPool(
+            collectors, timeout=timeout, max_workers=max_workers, deadline=self.deadline).run()
+        for name, error in errors.items():
+            # the collector names may contain characters which are not valid in metric names
+            self.add_unknown(str(name).translate(Check.METRIC_NAME_REPLACEMENTS), f"{name} collector failed: {error}")
+        return results
 
     def add_message(self, message):
         """Add a message"""
-        self.metrics[-1].message = message
+        metric = self.metrics[-1]
+        if isinstance(metric, MetricBatch):
+            metric.messages[len(metric) - 1] = message
+        else:
+            metric.message = message
 
     def exit(self, code, message):
         """Exits with specified message and specified exit status.
         Note: existing messages and metrics are discarded.
         """
+        if not self._claim_output():
+            self._wait_for_output()
         print(f"{self.state_type} {Check.STATUS[code]} - {message}")
+        self._output_done.set()
         sys.exit(code)
 
     def exit_ok(self, message):
@@ -97,14 +244,77 @@ class Check():
 
     def final(self):
         """Calculates the final check output and exit status, prints and exits with the appropriate code."""
-        human_results = [str(metric) for metric in self.metrics if metric.display_in_summary]
-        perf_results = [metric.perf_data for metric in self.metrics if metric.display_in_perf]
+        if not self._claim_output():
+            self._wait_for_output()
+        exit_code = self.state
+        self._write_output(exit_code, self._summaries())
+        sys.exit(exit_code)
+
+    def _claim_output(self):
+        """Returns True if the caller may write the output.
+        With a deadline, stops the watchdog and returns True for the first caller only, so that the output is written
+        once, either by the caller or by the watchdog.
+        """
+        if self._watchdog is None:
+            return True
+        with self._output_lock:
+            self._watchdog.cancel()
+            self._reset_deadline()
+            if self._output_claimed:
+                return False
+            self._output_claimed = True
+            return True
 
-        summary = "{0}{1}{2}".format(self.sep.join(human_results),  # pylint: disable=consider-using-f-string
-                                     ' | ' if perf_results else '',
-                                     ' '.join(perf_results))
+    def _reset_deadline(self):
+        """Restores the deadline of the context the check was created in"""
+        if self._deadline_token is None:
+            return
+        try:
+            reset_deadline(self._deadline_token)
+        except ValueError:
+            # the output is written from another context than the one the check was created in
+            pass
+        self._deadline_token = None
 
-        exit_code = max(metric.state for metric in self.metrics)
+    def _wait_for_output(self):
+        """Waits for the output already being written by the deadline watchdog, then exits UNKNOWN"""
+        self._output_done.wait()
+        sys.exit(Metric.STATUS_UNKNOWN)
 
-        print(f"{self.state_type} {Check.STATUS[exit_code]} - {summary}")
-        sys.exit(exit_code)
+    def _write_output(self, exit_code, summaries):
+        for source in self._metric_sources:
+            for metric in source():
+                self.add_metric_obj(metric)
+        writer = OutputWriter(max_bytes=self.max_output_bytes)
+        writer.write(f"{self.state_type} {Check.STATUS[exit_code]} - ", summaries, self.sep, self._perf_data())
+        self._output_done.set()
+
+    def _deadline_exceeded(self, in_main_thread):
+        """Outputs the metrics added so far with an UNKNOWN status, and exits"""
+        with self._output_lock:
+            if self._output_claimed:
+                return
+            self._output_claimed = True
+        message = self.PARTIAL_RESULTS_MESSAGE.format(seconds=self.deadline.seconds)
+        self._write_output(Metric.STATUS_UNKNOWN, itertools.chain([message], self._summaries()))
+        if in_main_thread:
+            self._reset_deadline()
+            sys.exit(Metric.STATUS_UNKNOWN)
+        # the main thread cannot be interrupted from another thread
+        os._exit(Metric.STATUS_UNKNOWN)  # pylint: disable=protected-access
+
+    def _summaries(self):
+        """Yields the summary string of each metric displayed in the summary"""
+        for metric in self.metrics:
+            if isinstance(metric, MetricBatch):
+                yield from metric.summaries()
+            elif metric.display_in_summary:
+                yield str(metric)
+
+    def _perf_data(self):
+        """Yields the state and perf data string of each metric displayed in the performance data"""
+        for metric in self.metrics:
+            if isinstance(metric, MetricBatch):
+                yield from zip(metric.states.tolist(), metric.perf_data())
+            elif metric.display_in_perf:
+                yield metric.state, metric.perf_data
@@ -0,0 +1,144 @@
+"""
+CircuitBreaker Class, stops the calls to a cache manager or state manager which keeps failing.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import contextlib
+import json
+import time
+
+from socket import error as SocketError
+
+from .exception import CircuitOpenError
+from .utils import hash_string, locked_file
+
+
+@contextlib.contextmanager
+def circuit_guard(circuit_breaker, server):
+    """Context manager reporting the outcome of the enclosed call to the server to the circuit breaker, if any.
+
+    :param circuit_breaker: The CircuitBreaker of the server, or None.
+    :param server: Name of the server, used in the error message.
+    Raises CircuitOpenError if the circuit is open, without running the enclosed block.
+    """
+    if circuit_breaker is None:
+        yield
+        return
+    if not circuit_breaker.allow():
+        raise CircuitOpenError(f"Not calling the {server}, its circuit breaker is open")
+    try:
+        yield
+    except SocketError:
+        circuit_breaker.record_failure()
+        raise
+    circuit_breaker.record_success()
+
+
+class CircuitBreaker:
+    """A circuit breaker whose state is kept in a small file, shared by the plugin processes of a collector.
+
+    The circuit opens after failure_threshold calls in a row fail to reach the server,
+    then the calls fail fast with a CircuitOpenError, or bypass the cache if bypass is True,
+    instead of each process waiting for its own connection timeouts.
+    Once cool_off seconds have passed, a single call is let through to probe the server:
+    the circuit closes if it succeeds, and opens for another cool_off seconds if it fails.
+    The file is locked with flock() while it is updated, and only written when the state changes.
+
+    Keyword Arguments:
+        - path -- Path of the state file, created if it does not exist
+        - failure_threshold -- Number of failures in a row opening the circuit (default: 5)
+        - cool_off -- Number of seconds the circuit stays open before probing the server (default: 30)
+        - probe_timeout -- Number of seconds before another probe is let through if the probe
+          does not report its result (default: cool_off)
+        - bypass -- True if get_via_cachemanager calls the data retrieval function directly while the circuit is
+          open, False to raise a CircuitOpenError (default: False)
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, path, failure_threshold=5, cool_off=30, probe_timeout=None, bypass=False):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cool_off = cool_off
+        self.probe_timeout = cool_off if probe_timeout is None else probe_timeout
+        self.bypass = bypass
+
+    def for_server(self, name):
+        """Returns a circuit breaker with the same settings, whose state file is that of the named server,
+        e.g. a node of a ShardedCacheManagerClient, so each server has its own circuit
+        """
+        return CircuitBreaker(
+            f'{self.path}.{hash_string(name)[:16]}', self.failure_threshold, self.cool_off, self.probe_timeout,
+            self.bypass,
+        )
+
+    def allow(self):
+        """Returns True if a call may be made: the circuit is closed, or this call is the probe of an open circuit"""
+        state = self._read()
+        if not state['open_until']:
+            return True
+        now = time.time()
+        if now < state['open_until']:
+            return False
+        with locked_file(self.path) as state_file:
+            state = self._load(state_file)
+            if now < state['open_until']:
+                return False
+            # the other calls fail fast until the probe reports its result, or does not in time
+            state['open_until'] = now + self.probe_timeout
+            self._dump(state_file, state)
+        return True
+
+    def is_open(self):
+        """Returns True if the calls currently fail fast"""
+        return time.time() < self._read()['open_until']
+
+    def record_success(self):
+        """Reports a call which reached the server, closing the circuit"""
+        if self._read() == self._closed():
+            return
+        with locked_file(self.path) as state_file:
+            self._dump(state_file, self._closed())
+
+    def record_failure(self):
+        """Reports a call which failed to reach the server, opening the circuit after failure_threshold failures"""
+        with locked_file(self.path) as state_file:
+            state = self._load(state_file)
+            state['failures'] += 1
+            # a failed probe opens the circuit again straight away
+            if state['open_until'] or state['failures'] >= self.failure_threshold:
+                state['open_until'] = time.time() + self.cool_off
+            self._dump(state_file, state)
+
+    def reset(self):
+        """Closes the circuit"""
+        with locked_file(self.path) as state_file:
+            self._dump(state_file, self._closed())
+
+    @staticmethod
+    def _closed():
+        return {'failures': 0, 'open_until': 0}
+
+    def _read(self):
+        import fcntl  # pylint: disable=import-outside-toplevel
+        try:
+            with open(self.path, encoding='utf-8') as state_file:
+                fcntl.flock(state_file, fcntl.LOCK_SH)
+                return self._load(state_file)
+        except FileNotFoundError:
+            return self._closed()
+
+    def _load(self, state_file):
+        state_file.seek(0)
+        try:
+            state = json.loads(state_file.read())
+            return {'failures': int(state['failures']), 'open_until': float(state['open_until'])}
+        except (ValueError, KeyError, TypeError):
+            # an empty or corrupt state file is a closed circuit
+            return self._closed()
+
+    @staticmethod
+    def _dump(state_file, state):
+        state_file.seek(0)
+        state_file.truncate()
+        state_file.write(json.dumps(state))
+        state_file.flush()
@@ -0,0 +1,119 @@
+"""
+CollectorPool Class, runs independent data collectors concurrently.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import contextvars
+import queue
+import threading
+import time
+
+from .exception import CollectorTimeout
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class CollectorPool:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    """Object for running data collectors concurrently on a bounded pool of threads.
+
+    Each collector is timed from when it starts running. A collector that times out is abandoned
+    (Python threads cannot be killed) and its worker is replaced, so the remaining collectors keep running.
+    The worker threads are daemon threads, so abandoned collectors do not prevent the plugin from exiting.
+
+    Keyword Arguments:
+        - collectors -- Dictionary of name: callable, each callable is called without arguments
+        - timeout -- Number of seconds each collector may run for, or a dictionary of name: seconds (default: no limit)
+        - max_workers -- Maximum number of collectors running at the same time (default: 8)
+        - deadline -- Deadline after which all the unfinished collectors are timed out (default: no deadline)
+
+    The collectors run in a copy of the caller's context, so they can read the deadline with remaining_time().
+    """
+
+    def __init__(self, collectors, timeout=None, max_workers=DEFAULT_MAX_WORKERS, deadline=None):
+        self.collectors = collectors
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self._context = contextvars.copy_context()
+        self._pending = queue.Queue()
+        self._started = {}
+        self._finished = {}
+        self._condition = threading.Condition()
+
+    def run(self):
+        """Runs the collectors and waits for all of them to complete or time out.
+
+        :returns: A tuple of (results, errors) dictionaries, by collector name.
+            Errors are the exception raised by the collector, or a CollectorTimeout.
+        """
+        for name, func in self.collectors.items():
+            self._pending.put((name, func))
+        for _ in range(min(self.max_workers, len(self.collectors))):
+            self._start_worker()
+
+        with self._condition:
+            while len(self._finished) < len(self.collectors):
+                wait_time = self._expire_collectors()
+                if len(self._finished) < len(self.collectors):
+                    self._condition.wait(wait_time)
+
+        results = {}
+        errors = {}
+        for name in self.collectors:
+            success, value = self._finished[name]
+            if success:
+                results[name] = value
+            else:
+                errors[name] = value
+        return results, errors
+
+    def _get_timeout(self, name):
+        return self.timeout.get(name) if isinstance(self.timeout, dict) else self.timeout
+
+    def _expire_collectors(self):
+        """Marks the running collectors past their timeout as finished, returns the time until the next timeout"""
+        if self.deadline and self.deadline.expired():
+            # stop the collectors which have not started yet
+            while not self._pending.empty():
+                self._pending.get_nowait()
+            for name in self.collectors:
+                self._finished.setdefault(name, (False, CollectorTimeout(
+                    f"check deadline of {self.deadline.seconds}s exceeded")))
+            return None
+        now = time.monotonic()
+        wait_time = self.deadline.remaining() if self.deadline else None
+        for name, start in self._started.items():
+            timeout = self._get_timeout(name)
+            if name in self._finished or timeout is None:
+                continue
+            remaining = start + timeout - now
+            if remaining <= 0:
+                self._finished[name] = (False, CollectorTimeout(f"timed out after {timeout}s"))
+                self._start_worker()
+            elif wait_time is None or remaining < wait_time:
+                wait_time = remaining
+        return wait_time
+
+    def _start_worker(self):
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def _worker(self):
+        while True:
+            try:
+                name, func = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            with self._condition:
+                self._started[name] = time.monotonic()
+                self._condition.notify_all()
+            try:
+                outcome = (True, self._context.copy().run(func))
+            except Exception as ex:  # pylint: disable=broad-except
+                outcome = (False, ex)
+            with self._condition:
+                abandoned = name in self._finished
+                self._finished.setdefault(name, outcome)
+                self._condition.notify_all()
+            if abandoned:
+                # the collector timed out and this worker was replaced, so it must not run another collector
+                return
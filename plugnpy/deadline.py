@@ -0,0 +1,181 @@
+"""
+Deadline and Watchdog classes, to keep a check within its time budget.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import signal
+import socket
+import threading
+import time
+
+from .exception import DeadlineExceeded
+
+_CURRENT_DEADLINE = contextvars.ContextVar('plugnpy_deadline', default=None)
+
+
+class Deadline:
+    """Object to represent the point in time by which a check must have completed.
+
+    Keyword Arguments:
+        - seconds -- Number of seconds from now until the deadline
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """Returns the number of seconds left until the deadline, 0 once it has passed"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        """Returns True once the deadline has passed"""
+        return self.remaining() <= 0
+
+
+def get_deadline():
+    """Returns the Deadline of the current context, or None if there is no deadline"""
+    return _CURRENT_DEADLINE.get()
+
+
+def set_deadline(deadline):
+    """Sets the Deadline of the current context, returns a token to restore the previous one with reset_deadline()"""
+    return _CURRENT_DEADLINE.set(deadline)
+
+
+def reset_deadline(token):
+    """Restores the Deadline of the current context that was replaced by set_deadline()"""
+    _CURRENT_DEADLINE.reset(token)
+
+
+def remaining_time(default=None):
+    """Returns the number of seconds left until the deadline of the current context, or default if there is none"""
+    deadline = _CURRENT_DEADLINE.get()
+    if deadline is None:
+        return default
+    return deadline.remaining()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline=None):
+    """Context manager setting the deadline of the current context for the enclosed block.
+
+    :param deadline: A Deadline, or a number of seconds from now. The deadline of the current context is kept
+        if there is no deadline or if the current one is earlier.
+    """
+    current = _CURRENT_DEADLINE.get()
+    if deadline is None:
+        yield current
+        return
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    if current is not None and current.expires_at <= deadline.expires_at:
+        yield current
+        return
+    token = _CURRENT_DEADLINE.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _CURRENT_DEADLINE.reset(token)
+
+
+@contextlib.contextmanager
+def deadline_timeout(action, cooperative=True):
+    """Context manager limiting the I/O of the enclosed block to the deadline of the current context.
+
+    :param action: Description of the enclosed block, used in the error message.
+    :param cooperative: True if the I/O is gevent based, so it is interrupted by a gevent Timeout.
+        Otherwise, the I/O must use socket timeouts capped to remaining_time(),
+        the socket timeouts raised once the deadline has passed are converted to DeadlineExceeded.
+    Raises DeadlineExceeded if the deadline has already passed, or passes before the enclosed block completes.
+    """
+    budget = remaining_time()
+    if budget is None:
+        yield
+        return
+    if budget <= 0:
+        raise DeadlineExceeded(f"No time left to {action}")
+    if not cooperative:
+        try:
+            yield
+        except socket.timeout:
+            if remaining_time() > 0:
+                raise
+            raise DeadlineExceeded(f"Deadline exceeded while trying to {action}") from None
+        return
+    # only the gevent based clients use this, so gevent is not imported by checks not using them
+    import gevent  # pylint: disable=import-outside-toplevel
+    with gevent.Timeout(budget, DeadlineExceeded(f"Deadline exceeded while trying to {action}")):
+        yield
+
+
+async def wait_for_deadline(awaitable, action):
+    """Awaits the awaitable within the deadline of the current context, the asyncio form of deadline_timeout().
+
+    :param awaitable: The awaitable to await, e.g. the coroutine of a request.
+    :param action: Description of the awaitable, used in the error message.
+    Raises DeadlineExceeded if the deadline has already passed, or passes before the awaitable completes.
+    """
+    budget = remaining_time()
+    if budget is None:
+        return await awaitable
+    if budget <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"No time left to {action}")
+    try:
+        return await asyncio.wait_for(awaitable, budget)
+    except asyncio.TimeoutError:
+        if remaining_time() > 0:
+            raise
+        raise DeadlineExceeded(f"Deadline exceeded while trying to {action}") from None
+
+
+class Watchdog:
+    """Object calling back when a number of seconds has elapsed, unless cancelled before.
+
+    The callback is called from a timer thread by default.
+    With use_signal, when started from the main thread of a platform supporting SIGALRM, the callback is called
+    from a signal handler in the main thread instead, so it can interrupt the work in progress
+    (e.g. by raising SystemExit). This takes over SIGALRM and the real-time interval timer of the process
+    until the watchdog is cancelled, so it must not be used by plugins using signal.alarm() or setitimer().
+    The callback is called with a single argument, True if it is called in the main thread.
+
+    Keyword Arguments:
+        - seconds -- Number of seconds before calling back
+        - callback -- The function to call
+        - use_signal -- True to call back from a SIGALRM handler when possible (default: False)
+    """
+
+    def __init__(self, seconds, callback, use_signal=False):
+        self.seconds = seconds
+        self.callback = callback
+        self.use_signal = use_signal
+        self._timer = None
+        self._previous_handler = None
+
+    def start(self):
+        """Starts the watchdog"""
+        if self.use_signal and hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGALRM, self._handle_signal)
+            signal.setitimer(signal.ITIMER_REAL, max(self.seconds, 0.001))
+        else:
+            self._timer = threading.Timer(self.seconds, self.callback, args=(False,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        """Stops the watchdog, if it has not called back yet"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        elif self._previous_handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous_handler)
+            self._previous_handler = None
+
+    def _handle_signal(self, signum, frame):  # pylint: disable=unused-argument
+        self.callback(True)
@@ -18,6 +18,14 @@ class ResultError(Exception):
     or returns a result that is essentially unusable."""
 
 
+class DeadlineExceeded(ResultError):
+    """To be thrown when a call cannot complete before the deadline of the check"""
+
+
+class CircuitOpenError(ResultError):
+    """To be thrown when a call is not made because the circuit breaker of the server is open"""
+
+
 class AssumedOK(Exception):
     """To be thrown when the status of the check cannot be identified.
     This is usually used when the check requires the result of a previous run and this is the first run."""
@@ -33,3 +41,7 @@ class InvalidMetricName(Exception):
 
 class StateManagerStoreError(Exception):
     """ Used to report a State Manager error """
+
+
+class CollectorTimeout(Exception):
+    """Used to report a collector which did not complete within its timeout"""
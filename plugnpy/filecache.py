@@ -0,0 +1,179 @@
+"""
+Local File Cache class, a cache manager backend shared by the plugins running on the same collector.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from .deadline import deadline_scope, remaining_time
+from .utils import hash_string
+
+
+class LocalFileCache:
+    """A cache stored in a local SQLite database, with the same interface and lock protocol as CacheManagerClient.
+
+    It can be used by CacheManagerUtils as its backend, or as a fallback when the cache manager is not available.
+    The database uses the WAL journal mode so that concurrent plugin processes can read while one writes.
+    Like the cache manager, get_data() hands out a lock to a single caller when the data is missing,
+    the other callers wait until the lock holder stores the data with set_data().
+    The locks are flock() locks on a file per key, so they are released if the lock holder exits.
+
+    Keyword Arguments:
+        - path -- Path of the SQLite database file, created if it does not exist
+        - namespace -- Namespace for the plugin
+        - lock_dir -- Directory of the lock files (default: the database path followed by '.locks')
+    """
+
+    POLL_INTERVAL = 0.05
+    SQLITE_TIMEOUT = 5
+
+    def __init__(self, path, namespace, lock_dir=None):
+        self._path = path
+        self._namespace = namespace or ''
+        self._lock_dir = lock_dir or f'{path}.locks'
+        os.makedirs(self._lock_dir, exist_ok=True)
+        self._locks = {}
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=self.SQLITE_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'namespace TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL, expires_at REAL NOT NULL, '
+            'PRIMARY KEY (namespace, key))')
+        self._db.execute('CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)')
+
+    def get_data(self, key, max_wait_time=30, deadline=None):
+        """Gets data from the cache. May get a lock if there is no data present.
+
+        :param key: The key of the data element to fetch, within the namespace.
+        :param max_wait_time: Max time to wait for a lock (seconds), capped to the time left until the deadline.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: A dictionary with the 'data' and 'lock' keys, as returned by the cache manager,
+            and the number of seconds left until the data expires under the 'ttl' key.
+        """
+        with deadline_scope(deadline):
+            budget = remaining_time()
+        if budget is not None:
+            max_wait_time = min(max_wait_time, budget)
+        wait_until = time.monotonic() + max_wait_time
+        while True:
+            response = self._read(key)
+            if response is not None:
+                return response
+            if self._acquire_lock(key):
+                # the data may have been stored between the read and getting the lock
+                response = self._read(key)
+                if response is not None:
+                    self._release_lock(key)
+                    return response
+                return {'data': None, 'lock': True}
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                return {'data': None, 'lock': None}
+            time.sleep(min(self.POLL_INTERVAL, remaining))
+
+    def get_many(self, keys, max_wait_time=30, deadline=None):
+        """Gets the data of many keys from the cache. May get a lock for the keys with no data present.
+
+        :param keys: The keys of the data elements to fetch, within the namespace.
+        :param max_wait_time: Max time to wait for the locks (seconds), capped to the time left until the deadline.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
+        :returns: A dictionary of key: response, each response has the same 'data' and 'lock' keys as get_data.
+        """
+        # take all the free locks first, then wait for the other callers within a single wait time
+        responses = {key: self.get_data(key, 0) for key in dict.fromkeys(keys)}
+        with deadline_scope(deadline), deadline_scope(max_wait_time):
+            for key, response in responses.items():
+                if response['data'] is None and not response['lock']:
+                    responses[key] = self.get_data(key, max_wait_time)
+        return responses
+
+    def set_data(self, key, data, ttl=900, deadline=None):  # pylint: disable=unused-argument
+        """Sets data into the cache, and releases the lock on the key if it is held.
+
+        :param key: The key of the data element to store, within the namespace.
+        :param data: The data to store.
+        :param ttl: The time that the data is valid for (seconds).
+        :param deadline: Accepted for compatibility with CacheManagerClient, local writes are not limited.
+        """
+        self._store({key: data}, ttl)
+
+    def set_many(self, items, ttl=900, deadline=None):  # pylint: disable=unused-argument
+        """Sets the data of many keys into the cache in a single transaction, and releases the locks held on them.
+
+        :param items: A dictionary of key: data to store, within the namespace.
+        :param ttl: The time that the data is valid for (seconds).
+        :param deadline: Accepted for compatibility with CacheManagerClient, local writes are not limited.
+        """
+        self._store(items, ttl)
+
+    def renew_lock(self, key, lease=30, deadline=None):  # pylint: disable=unused-argument
+        """Returns True if the lock on the key is held. The locks do not expire, as they are released if the lock
+        holder exits, so they do not need to be renewed.
+
+        :param key: The key of the data element whose lock is held, within the namespace.
+        :param lease: Accepted for compatibility with CacheManagerClient.
+        :param deadline: Accepted for compatibility with CacheManagerClient.
+        """
+        return key in self._locks
+
+    def status(self, deadline=None):  # pylint: disable=unused-argument
+        """Fetches the current status of the cache."""
+        with self._db_lock:
+            entries = self._db.execute(
+                'SELECT COUNT(*) FROM cache WHERE expires_at > ?', (time.time(),)).fetchone()[0]
+        return {'path': self._path, 'entries': entries}
+
+    def close(self):
+        """Close the database, and release the locks held"""
+        for key in list(self._locks):
+            self._release_lock(key)
+        if self._db:
+            self._db.close()
+            self._db = None
+
+    def _store(self, items, ttl):
+        now = time.time()
+        try:
+            with self._db_lock:
+                with self._db:
+                    self._db.execute('BEGIN')
+                    self._db.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+                    self._db.executemany(
+                        'INSERT OR REPLACE INTO cache (namespace, key, data, expires_at) VALUES (?, ?, ?, ?)',
+                        [(self._namespace, key, data, now + ttl) for key, data in items.items()])
+        finally:
+            for key in items:
+                self._release_lock(key)
+
+    def _read(self, key):
+        """Returns the response of the data of the key, with the number of seconds left until it expires,
+        or None if there is no data"""
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT data, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?',
+                (self._namespace, key, now)).fetchone()
+        return {'data': row[0], 'lock': None, 'ttl': row[1] - now} if row else None
+
+    def _acquire_lock(self, key):
+        lock_path = os.path.join(self._lock_dir, hash_string(f'{self._namespace}#{key}') + '.lock')
+        import fcntl  # pylint: disable=import-outside-toplevel
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._locks[key] = fd
+        return True
+
+    def _release_lock(self, key):
+        fd = self._locks.pop(key, None)
+        if fd is not None:
+            import fcntl  # pylint: disable=import-outside-toplevel
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
@@ -0,0 +1,86 @@
+"""
+LockLease Class, keeps the cache manager locks of a long running data retrieval alive.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import asyncio
+import threading
+
+
+class LockLease:
+    """Context manager renewing the cache manager locks held on keys while the enclosed block runs.
+
+    The callers waiting for the data of a locked key keep waiting while the lease of its lock is alive,
+    so the lock holder can take longer than their max_wait_time to retrieve the data.
+    The lease is renewed every interval seconds, from a background thread, or from an asyncio task
+    when used with `async with` and an AsyncCacheManagerClient.
+    If the lock holder dies, the lease runs out and a waiting caller gets the lock instead.
+    The renewals stop once the block exits, or once the lock of every key is lost,
+    e.g. because the cache manager does not support leases.
+
+    Keyword Arguments:
+        - client -- The CacheManagerClient, or AsyncCacheManagerClient, holding the locks
+        - keys -- The keys whose locks are held
+        - lease -- Number of seconds the locks are kept for after each renewal (default: 30)
+        - interval -- Number of seconds between two renewals (default: a third of the lease)
+    """
+
+    def __init__(self, client, keys, lease=30, interval=None):
+        self.client = client
+        self.keys = list(keys)
+        self.lease = lease
+        self.interval = lease / 3 if interval is None else interval
+        self.renewals = 0
+        self._stopped = threading.Event()
+        # the thread, or asyncio task, renewing the lease
+        self._runner = None
+
+    def renew(self):
+        """Renews the locks once, returns True if any lock is still held"""
+        self.keys = [key for key in self.keys if self.client.renew_lock(key, self.lease)]
+        self.renewals += 1
+        return bool(self.keys)
+
+    async def renew_async(self):
+        """Renews the locks once with an AsyncCacheManagerClient, returns True if any lock is still held"""
+        self.keys = [key for key in self.keys if await self.client.renew_lock(key, self.lease)]
+        self.renewals += 1
+        return bool(self.keys)
+
+    def __enter__(self):
+        self._runner = threading.Thread(target=self._run, name='plugnpy-lock-lease', daemon=True)
+        self._runner.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        # not joined, so the block does not wait for a renewal in flight, which fails once the data is stored
+        self._stopped.set()
+
+    async def __aenter__(self):
+        self._runner = asyncio.ensure_future(self._run_async())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._runner.cancel()
+        try:
+            await self._runner
+        except asyncio.CancelledError:
+            pass
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                if not self.renew():
+                    return
+            except Exception:  # pylint: disable=broad-except
+                # a failed renewal is retried at the next interval, while the lease may still be alive
+                pass
+
+    async def _run_async(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if not await self.renew_async():
+                    return
+            except Exception:  # pylint: disable=broad-except
+                pass
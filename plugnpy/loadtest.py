@@ -0,0 +1,336 @@
+"""
+Load test harness, running concurrent simulated plugin processes against a cache manager.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import queue as queue_module
+import threading
+import time
+
+from .cachemanager import CacheManagerUtils
+from .standin import StandInServer
+from .statemanager import StateManagerClient
+
+# buckets of the lock wait histogram, in seconds
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+# number of seconds between two checks of the processes which died without a result
+RESULT_POLL_INTERVAL = 1
+
+
+class LoadTestConfig:  # pylint: disable=too-few-public-methods, too-many-instance-attributes
+    """Settings of a load test, passed to each simulated plugin process.
+
+    Each process runs the check of a plugin iterations times: it gets the data of a key via the cache manager
+    with get_via_cachemanager, and stores and fetches its state if state_manager is True.
+    The data retrieval function simulates an upstream call taking fetch_time seconds.
+    The processes start at the same time, so they all miss the cache at once, and the keys of consecutive
+    iterations are spread over a number of keys.
+
+    Keyword Arguments:
+        - host -- Host of the cache manager, and state manager, or the path of its Unix domain socket
+        - port -- Port of the cache manager, and state manager
+        - processes -- Number of concurrent plugin processes (default: 10)
+        - iterations -- Number of checks run by each process (default: 10)
+        - keys -- Number of distinct keys (default: 1)
+        - ttl -- Number of seconds the data is cached for (default: 60)
+        - fetch_time -- Number of seconds of the simulated upstream call (default: 0.5)
+        - payload_size -- Number of bytes of the data returned by the upstream call (default: 1024)
+        - interval -- Number of seconds between two checks of a process (default: 0)
+        - state_manager -- True to store and fetch the state of each check (default: False)
+        - transport -- The kind of transport of the clients, see get_transport() (default: 'http')
+        - namespace -- Namespace of the plugin (default: 'loadtest')
+        - start_timeout -- Number of seconds a process waits for the other processes to start, it then runs
+          its checks without waiting for them (default: 60)
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments, too-many-locals
+    def __init__(
+            self, host, port, processes=10, iterations=10, keys=1, ttl=60, fetch_time=0.5, payload_size=1024,
+            interval=0, state_manager=False, transport='http', namespace='loadtest', start_timeout=60,
+    ):
+        self.host = host
+        self.port = port
+        self.processes = processes
+        self.iterations = iterations
+        self.keys = keys
+        self.ttl = ttl
+        self.fetch_time = fetch_time
+        self.payload_size = payload_size
+        self.interval = interval
+        self.state_manager = state_manager
+        self.transport = transport
+        self.namespace = namespace
+        self.start_timeout = start_timeout
+
+
+def run_load_test(config, server=None):
+    """Runs the simulated plugin processes, and returns the report of the load test, see make_report().
+
+    :param config: The LoadTestConfig.
+    :param server: The StandInServer the processes run against, if any, to add its statistics to the report.
+    """
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(config.processes)
+    queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker, args=(index, config, barrier, queue), name=f'plugnpy-loadtest-{index}', daemon=True)
+        for index in range(config.processes)
+    ]
+    for process in processes:
+        process.start()
+    results = _results(processes, queue)
+    for process in processes:
+        process.join()
+    return make_report(config, results, server.stats() if server else None)
+
+
+def _results(processes, queue):
+    """Returns the results of the processes, with a failed result for each process which died without one"""
+    results = {}
+    while len(results) < len(processes):
+        try:
+            result = queue.get(timeout=RESULT_POLL_INTERVAL)
+        except queue_module.Empty:
+            # the results are sent before the processes exit, so none is coming once the others have exited
+            if all(process.exitcode is not None for index, process in enumerate(processes) if index not in results):
+                break
+            continue
+        results[result['index']] = result
+    for index, process in enumerate(processes):
+        if index not in results:
+            process.join()
+            results[index] = {'index': index, 'error': f'Process exited with code {process.exitcode}'}
+    return [results[index] for index in range(len(processes))]
+
+
+def _worker(index, config, barrier, queue):
+    """Runs the checks of a simulated plugin process, and puts its results on the queue"""
+    try:
+        state_client = _setup(config)
+    except Exception as ex:  # pylint: disable=broad-except
+        # the other processes do not wait for this one to start
+        barrier.abort()
+        queue.put({'index': index, 'error': f'{type(ex).__name__}: {ex}'})
+        return
+    calls = []
+    fetches = []
+
+    def fetch(key):
+        start = time.time()
+        time.sleep(config.fetch_time)
+        fetches.append({'key': key, 'start': start, 'end': time.time()})
+        return 'x' * config.payload_size
+
+    try:
+        barrier.wait(config.start_timeout)
+    except threading.BrokenBarrierError:
+        # a process failed to start, the others run their checks without it
+        pass
+    started = time.time()
+    for iteration in range(config.iterations):
+        key = f'key-{(index + iteration) % config.keys}'
+        fetched = len(fetches)
+        start = time.monotonic()
+        error = None
+        try:
+            CacheManagerUtils.get_via_cachemanager(False, key, config.ttl, fetch, key)
+            if state_client:
+                state_client.store_data(f'state-{index}', json.dumps({'iteration': iteration}), config.ttl)
+                state_client.fetch_data(f'state-{index}')
+        except Exception as ex:  # pylint: disable=broad-except
+            error = f'{type(ex).__name__}: {ex}'
+        calls.append({
+            'key': key, 'seconds': time.monotonic() - start, 'fetched': len(fetches) > fetched, 'error': error,
+        })
+        if config.interval:
+            time.sleep(config.interval)
+    queue.put({'index': index, 'started': started, 'finished': time.time(), 'calls': calls, 'fetches': fetches})
+
+
+def _setup(config):
+    """Sets up the clients of a simulated plugin process, returns its state manager client, if any"""
+    CacheManagerUtils.host = config.host
+    CacheManagerUtils.port = config.port
+    CacheManagerUtils.namespace = config.namespace
+    CacheManagerUtils.transport = config.transport
+    # each check of a plugin runs in a new process, with an empty in-process cache
+    CacheManagerUtils.local_cache = None
+    if config.state_manager:
+        return StateManagerClient(config.host, config.port, config.namespace, transport=config.transport)
+    return None
+
+
+def make_report(config, results, server_stats=None):
+    """Returns the report of the results of the processes, a dictionary with the keys:
+
+    - calls, errors, duration, throughput -- Number of checks, failed checks, seconds and checks per second
+    - latency -- Percentiles of the duration of the checks
+    - fetches -- Number of upstream calls
+    - herd_fetches -- Number of upstream calls made while another call for the same key was in flight,
+      0 if the lock protocol prevents the thundering herd
+    - max_concurrent_fetches -- Largest number of upstream calls in flight for the same key
+    - lock_waits -- Percentiles and histogram of the time the checks waited for another process retrieving
+      the data, measured by the server if known, otherwise estimated by the processes as the duration
+      of the checks which did not fetch the data and took more than half of fetch_time
+    - errors_by_type -- Number of failed checks by error
+    - failed_processes, process_errors -- Number of processes which failed to run their checks, and their errors
+    - server -- The statistics of the server, if known
+    """
+    process_errors = _count_errors(results)
+    results = [result for result in results if 'error' not in result]
+    calls = [call for result in results for call in result['calls']]
+    fetches = sorted((fetch for result in results for fetch in result['fetches']), key=lambda fetch: fetch['start'])
+    duration = 0
+    if results:
+        duration = max(result['finished'] for result in results) - min(result['started'] for result in results)
+    seconds = [call['seconds'] for call in calls]
+    # a process which did not fetch the data, and took longer than a hit, waited for the lock holder
+    waits = [call['seconds'] for call in calls if not call['fetched'] and call['seconds'] > config.fetch_time / 2]
+    if server_stats is not None:
+        waits = server_stats['lock_waits']
+    errors = _count_errors(calls)
+    herd, max_concurrent = _herd(fetches)
+    elapsed = max(duration, 1e-9)
+    report = {
+        'processes': config.processes,
+        'calls': len(calls),
+        'errors': sum(errors.values()),
+        'duration': elapsed,
+        'throughput': len(calls) / elapsed,
+        'latency': _percentiles(seconds),
+        'fetches': len(fetches),
+        'herd_fetches': herd,
+        'max_concurrent_fetches': max_concurrent,
+        'lock_waits': dict(_percentiles(waits), count=len(waits), histogram=_histogram(waits)),
+        'errors_by_type': errors,
+        'failed_processes': sum(process_errors.values()),
+        'process_errors': process_errors,
+    }
+    if server_stats is not None:
+        report['server'] = dict(server_stats, lock_waits=len(server_stats['lock_waits']))
+    return report
+
+
+def _count_errors(items):
+    """Returns the number of the calls or results failed with each error"""
+    errors = {}
+    for item in items:
+        if item.get('error'):
+            errors[item['error']] = errors.get(item['error'], 0) + 1
+    return errors
+
+
+def _herd(fetches):
+    """Returns the number of upstream calls overlapping another one for the same key, and the largest overlap"""
+    herd = 0
+    max_concurrent = 0
+    in_flight = {}
+    for fetch in fetches:
+        ends = [end for end in in_flight.get(fetch['key'], []) if end > fetch['start']]
+        herd += bool(ends)
+        ends.append(fetch['end'])
+        in_flight[fetch['key']] = ends
+        max_concurrent = max(max_concurrent, len(ends))
+    return herd, max_concurrent
+
+
+def _percentiles(values):
+    """Returns the p50, p90, p99 and max of the values, with the nearest-rank method"""
+    values = sorted(values)
+    if not values:
+        return {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    percentiles = {f'p{rank}': values[max(math.ceil(rank / 100 * len(values)) - 1, 0)] for rank in (50, 90, 99)}
+    percentiles['max'] = values[-1]
+    return percentiles
+
+
+def _histogram(values):
+    """Returns the number of values in each of the WAIT_BUCKETS, as a dictionary of upper bound: count"""
+    histogram = {f'<={bucket}s': 0 for bucket in WAIT_BUCKETS}
+    histogram[f'>{WAIT_BUCKETS[-1]}s'] = 0
+    for value in values:
+        bucket = next((bucket for bucket in WAIT_BUCKETS if value <= bucket), None)
+        histogram[f'<={bucket}s' if bucket is not None else f'>{WAIT_BUCKETS[-1]}s'] += 1
+    return histogram
+
+
+def format_report(report):
+    """Returns the report as text"""
+    def seconds(values):
+        return ', '.join(
+            f'{name}={value:.3f}s' if value is not None else f'{name}=-' for name, value in values.items()
+            if name in ('p50', 'p90', 'p99', 'max'))
+
+    lines = [
+        f"processes: {report['processes']}  checks: {report['calls']}  errors: {report['errors']}",
+        f"throughput: {report['throughput']:.1f} checks/s over {report['duration']:.2f}s",
+        f"latency: {seconds(report['latency'])}",
+        f"upstream fetches: {report['fetches']}  herd fetches: {report['herd_fetches']}  "
+        f"max concurrent fetches of a key: {report['max_concurrent_fetches']}",
+        f"lock waits: {report['lock_waits']['count']}  {seconds(report['lock_waits'])}",
+        "lock wait histogram: " + '  '.join(
+            f'{bucket}: {count}' for bucket, count in report['lock_waits']['histogram'].items()),
+    ]
+    lines.extend(f"error: {error} x{count}" for error, count in report['errors_by_type'].items())
+    if report['failed_processes']:
+        lines.append(f"failed processes: {report['failed_processes']}")
+        lines.extend(f"process error: {error} x{count}" for error, count in report['process_errors'].items())
+    if 'server' in report:
+        server = report['server']
+        lines.append(
+            f"server: requests={server['requests']} locks={sum(server['locks'].values())} "
+            f"lock_timeouts={server['lock_timeouts']} lease_renewals={server['lease_renewals']} "
+            f"injected_errors={server['injected_errors']} dropped={server['dropped']}")
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    """Runs a load test and prints its report, e.g. python -m plugnpy.loadtest --processes 50 --keys 5
+
+    Without --host, the processes run against a StandInServer with the given latency and failure injection.
+    """
+    parser = argparse.ArgumentParser(description="Load test of the cache manager clients")
+    parser.add_argument('--host', help="Host of a running cache manager, default: a local stand-in server")
+    parser.add_argument('--port', type=int, default=0, help="Port of the cache manager")
+    parser.add_argument('--processes', type=int, default=10, help="Number of concurrent plugin processes")
+    parser.add_argument('--iterations', type=int, default=10, help="Number of checks run by each process")
+    parser.add_argument('--keys', type=int, default=1, help="Number of distinct keys")
+    parser.add_argument('--ttl', type=float, default=60, help="Seconds the data is cached for")
+    parser.add_argument('--fetch-time', type=float, default=0.5, help="Seconds of the simulated upstream call")
+    parser.add_argument('--payload-size', type=int, default=1024, help="Bytes of the cached data")
+    parser.add_argument('--interval', type=float, default=0, help="Seconds between two checks of a process")
+    parser.add_argument('--state-manager', action='store_true', help="Store and fetch the state of each check")
+    parser.add_argument('--latency', type=float, default=0, help="Seconds added to each request of the stand-in")
+    parser.add_argument('--jitter', type=float, default=0, help="Maximum random seconds added to the latency")
+    parser.add_argument('--error-rate', type=float, default=0, help="Probability of a 500 response")
+    parser.add_argument('--drop-rate', type=float, default=0, help="Probability of closing the connection")
+    parser.add_argument('--lock-timeout', type=float, default=60, help="Seconds a lock of the stand-in is held")
+    parser.add_argument('--start-timeout', type=float, default=60, help="Seconds to wait for the processes to start")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    options = parser.parse_args(args)
+    server = None
+    if options.host is None:
+        server = StandInServer(
+            latency=options.latency, jitter=options.jitter, error_rate=options.error_rate,
+            drop_rate=options.drop_rate, lock_timeout=options.lock_timeout,
+        ).start()
+    host, port = server.address if server else (options.host, options.port)
+    config = LoadTestConfig(
+        host, port, options.processes, options.iterations, options.keys, options.ttl, options.fetch_time,
+        options.payload_size, options.interval, options.state_manager, start_timeout=options.start_timeout,
+    )
+    try:
+        report = run_load_test(config, server)
+    finally:
+        if server:
+            server.stop()
+    print(json.dumps(report, indent=2) if options.json else format_report(report))
+
+
+if __name__ == '__main__':
+    main()
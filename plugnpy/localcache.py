@@ -0,0 +1,83 @@
+"""
+LocalCache Class, an in-process cache with TTL and LRU eviction.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+class LocalCache:
+    """In-process cache, with a time to live per entry and a size cap in bytes.
+
+    When the size cap is reached, the least recently used entries are evicted.
+    The size of an entry is given by the caller, e.g. the length of its serialised form.
+    The cached values are returned as they are stored, so they must not be modified by the caller.
+
+    Keyword Arguments:
+        - max_bytes -- The maximum total size of the cached entries (default: 16MiB)
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('hits', 'misses', 'evictions', 'expirations'), 0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Returns the value cached under the key, or default if it is missing or has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[2]
+
+    def set(self, key, value, ttl, size):
+        """Caches the value under the key for ttl seconds.
+        Values larger than the size cap, or with no time to live, are not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if ttl <= 0 or size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        """Removes the value cached under the key, if any."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Removes all the cached values, and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self):
+        """Returns the number of hits, misses, evictions and expirations, and the current entries and size."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), size=self._size, max_bytes=self.max_bytes)
+
+    def _remove(self, key):
+        self._size -= self._entries.pop(key)[1]
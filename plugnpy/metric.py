@@ -3,9 +3,21 @@ Metric Class.
 Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
 """
 
+import functools
+import itertools
+from bisect import bisect_right
+
 from .exception import InvalidMetricName, InvalidMetricThreshold
 from .utils import convert_seconds
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# Maximum number of distinct (threshold, si_bytes_conversion) pairs kept parsed in memory
+THRESHOLD_CACHE_SIZE = 1024
+
 
 class Metric:  # pylint: disable=too-many-instance-attributes
     """Object to represent Metrics added to a Check object.
@@ -23,8 +35,22 @@ class Metric:  # pylint: disable=too-many-instance-attributes
         - convert_metric -- Whether to convert the metric value to a more human friendly unit (default: False)
         - si_bytes_conversion -- Whether to convert values using the SI standard, uses IEC by default (default: False)
         - precision -- The number of decimal places to round the metric value to (default 2)
+
+    Metric uses __slots__ to keep the memory footprint of checks with many metrics low,
+    the summary and perf data strings are only formatted when requested.
         """
 
+    __slots__ = (
+        'name', 'value', 'unit', 'warning_threshold', 'critical_threshold', 'display_format', 'display_name',
+        'display_in_summary', 'display_in_perf', 'message', 'convert_metric', 'si_bytes_conversion', '_state',
+        'summary_precision', 'perf_data_precision', '_perf_data',
+    )
+
+    # changed whenever the state of a metric is changed after it was created,
+    # so a Check knows when the states it tracks must be tracked again
+    state_generation = 0
+    _STATE_GENERATIONS = itertools.count(1)
+
     P_INF = float('inf')
     N_INF = float('-inf')
 
@@ -89,6 +115,9 @@ class Metric:  # pylint: disable=too-many-instance-attributes
         UNIT_EXA: lambda factor: 1.0 / factor ** 6,
     }
 
+    # Conversion tables computed from DISPLAY_UNIT_FACTORS, by (unit, si_bytes_conversion)
+    _CONVERSION_TABLES = {}
+
     def __init__(  # pylint: disable=too-many-arguments, too-many-positional-arguments, too-many-locals
             self, name, value, unit,
             warning_threshold=None,
@@ -103,10 +132,7 @@ class Metric:  # pylint: disable=too-many-instance-attributes
             perf_data_precision=2,
             message='',
     ):
-        if ("'" in name) or ('"' in name):
-            raise InvalidMetricName("Metric names cannot contain \"'\".")
-        if "=" in name:
-            raise InvalidMetricName("Metric names cannot contain \"=\".")
+        Metric.validate_name(name)
         self.name = name
         self.value = value
         self.unit = unit
@@ -117,63 +143,146 @@ class Metric:  # pylint: disable=too-many-instance-attributes
         self.display_in_summary = display_in_summary
         self.display_in_perf = display_in_perf
         self.message = message
+        self._perf_data = None
 
         self.convert_metric = convert_metric or (convert_metric is None and unit in Metric.BYTE_UNITS)
 
         self.si_bytes_conversion = si_bytes_conversion
-        self.state = Metric.evaluate(value, warning_threshold, critical_threshold, si_bytes_conversion)
+        self._state = Metric.evaluate(value, warning_threshold, critical_threshold, si_bytes_conversion)
 
-        try:
-            self.summary_precision = int(summary_precision)
-        except (ValueError, TypeError) as ex:
-            raise Exception(  # pylint: disable=broad-exception-raised
-                f"Invalid value for summary precision '{summary_precision}': {ex}") from None
+        self.summary_precision = Metric.parse_precision(summary_precision, 'summary precision')
+        self.perf_data_precision = Metric.parse_precision(perf_data_precision, 'performance data precision')
 
-        try:
-            self.perf_data_precision = int(perf_data_precision)
-        except (ValueError, TypeError) as ex:
-            raise Exception(  # pylint: disable=broad-exception-raised
-                f"Invalid value for performance data precision '{perf_data_precision}': {ex}") from None
         try:
             self.value = float(self.value)
-            self.perf_data = Metric.calculate_perf_data(
-                self.name, self.value, self.unit, self.warning_threshold, self.critical_threshold,
-                precision=self.perf_data_precision)
         except (ValueError, TypeError):
-            self.perf_data = ''
+            pass
+
+    @property
+    def state(self):
+        """The state of the metric, one of the STATUS_ codes"""
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        self._state = state
+        Metric.state_generation = next(Metric._STATE_GENERATIONS)
+
+    @property
+    def perf_data(self):
+        """The perf data string for the metric, formatted when requested (empty for non-numeric values),
+        unless it has been set
+        """
+        if self._perf_data is not None:
+            return self._perf_data
+        if not isinstance(self.value, float):
+            return ''
+        return Metric.calculate_perf_data(
+            self.name, self.value, self.unit, self.warning_threshold, self.critical_threshold,
+            precision=self.perf_data_precision)
+
+    @perf_data.setter
+    def perf_data(self, perf_data):
+        self._perf_data = perf_data
 
     def __str__(self):
         if self.message:
             return self.message
-        unit = self.UNIT_MAPPING.get(self.unit) or self.unit
-        value = self.value
+        return Metric.calculate_summary(
+            self.display_format, self.display_name, self.value, self.unit, convert_metric=self.convert_metric,
+            si_bytes_conversion=self.si_bytes_conversion, precision=self.summary_precision)
+
+    @staticmethod
+    def validate_name(name):
+        """Raises InvalidMetricName if the name cannot be used for a Metric"""
+        if ("'" in name) or ('"' in name):
+            raise InvalidMetricName("Metric names cannot contain \"'\".")
+        if "=" in name:
+            raise InvalidMetricName("Metric names cannot contain \"=\".")
 
-        if self.convert_metric:
-            value, unit = Metric.convert_value(self.value, unit, si_bytes_conversion=self.si_bytes_conversion)
+    @staticmethod
+    def parse_precision(precision, description):
+        """Returns the precision as an int, raising an Exception naming the description if it is not valid"""
+        try:
+            return int(precision)
+        except (ValueError, TypeError) as ex:
+            raise Exception(  # pylint: disable=broad-exception-raised
+                f"Invalid value for {description} '{precision}': {ex}") from None
 
+    @staticmethod
+    def calculate_summary(  # pylint: disable=too-many-arguments, too-many-positional-arguments
+            display_format, display_name, value, unit,
+            convert_metric=False, si_bytes_conversion=False, precision=2):
+        """Returns the summary string for the check"""
+        unit = Metric.UNIT_MAPPING.get(unit) or unit
+
+        if convert_metric:
+            value, unit = Metric.convert_value(value, unit, si_bytes_conversion=si_bytes_conversion)
+        return Metric.format_summary(display_format, display_name, value, unit, precision)
+
+    @staticmethod
+    def format_summary(display_format, display_name, value, unit, precision=2):
+        """Returns the summary string for an already converted value and unit"""
         # try to convert value to precision specified if it's a number
         try:
             value = float(value)
-            value = f"{value:.{self.summary_precision}f}"
+            value = f"{value:.{precision}f}"
         except (ValueError, TypeError):
             pass
 
-        return self.display_format.format(**{'name': self.display_name,
-                                             'value': value,
-                                             'unit': unit})
+        return display_format.format(**{'name': display_name,
+                                        'value': value,
+                                        'unit': unit})
 
     @staticmethod
     def evaluate(value, warning_threshold, critical_threshold, si_bytes_conversion=False):
         """Returns the status code of a check by evaluating the value against warning and critical thresholds"""
         status = Metric.STATUS_OK
         if warning_threshold:
-            if Metric._check_range(value, *Metric._parse_threshold(warning_threshold, si_bytes_conversion)):
+            if Threshold.parse(warning_threshold, si_bytes_conversion).check(value):
                 status = Metric.STATUS_WARNING
         if critical_threshold:
-            if Metric._check_range(value, *Metric._parse_threshold(critical_threshold, si_bytes_conversion)):
+            if Threshold.parse(critical_threshold, si_bytes_conversion).check(value):
                 status = Metric.STATUS_CRITICAL
         return status
 
+    @staticmethod
+    def evaluate_many(values, warning_threshold, critical_threshold, si_bytes_conversion=False):
+        """Returns the status codes of many values evaluated against the same warning and critical thresholds.
+
+        Gives the same results as calling evaluate() for each value.
+        When NumPy is installed the values are evaluated in bulk and a numpy array is returned,
+        otherwise a list is returned.
+        """
+        warning = Threshold.parse(warning_threshold, si_bytes_conversion) if warning_threshold else None
+        critical = Threshold.parse(critical_threshold, si_bytes_conversion) if critical_threshold else None
+
+        if not warning and not critical:
+            # as with evaluate(), the values are not converted when there is no threshold, so they may be non-numeric
+            if numpy is not None:
+                return numpy.full(len(values), Metric.STATUS_OK, dtype=numpy.int8)
+            return [Metric.STATUS_OK] * len(values)
+
+        if numpy is not None:
+            values = numpy.asarray(values, dtype=float)
+            states = numpy.full(values.shape, Metric.STATUS_OK, dtype=numpy.int8)
+            if warning:
+                states[warning.check_many(values)] = Metric.STATUS_WARNING
+            if critical:
+                states[critical.check_many(values)] = Metric.STATUS_CRITICAL
+            return states
+
+        states = []
+        for value in values:
+            value = float(value)
+            if critical and critical.check(value):
+                states.append(Metric.STATUS_CRITICAL)
+            elif warning and warning.check(value):
+                states.append(Metric.STATUS_WARNING)
+            else:
+                states.append(Metric.STATUS_OK)
+        return states
+
     @staticmethod
     def calculate_perf_data(name, value, unit,  # pylint: disable=too-many-arguments, too-many-positional-arguments
                             warning_threshold, critical_threshold, precision=2):
@@ -195,21 +304,64 @@ class Metric:  # pylint: disable=too-many-instance-attributes
                 f"Invalid value for value '{value}': {ex}") from None
 
         if unit in Metric.CONVERTIBLE_UNITS:
+            return Metric._convert_with_table(value, unit, Metric._get_conversion_table(unit, si_bytes_conversion))
+        return value, unit
+
+    @staticmethod
+    def convert_values(values, unit, si_bytes_conversion=False):
+        """Converts many values in the same unit with the right prefix for display.
+        Returns a list of (value, unit) tuples, as returned by convert_value() for each value.
+        """
+        converted = []
+        table = Metric._get_conversion_table(unit, si_bytes_conversion) if unit in Metric.CONVERTIBLE_UNITS else None
+        for value in values:
+            try:
+                value = float(value)
+            except (ValueError, TypeError) as ex:
+                raise Exception(  # pylint: disable=broad-exception-raised
+                    f"Invalid value for value '{value}': {ex}") from None
+            converted.append(Metric._convert_with_table(value, unit, table) if table else (value, unit))
+        return converted
+
+    @staticmethod
+    def _get_conversion_table(unit, si_bytes_conversion):
+        """Returns the precomputed prefix thresholds, multiplication factors and units for a convertible unit.
+        The thresholds are sorted in ascending order so the prefix can be found with a bisection.
+        """
+        table_key = (unit, bool(si_bytes_conversion))
+        table = Metric._CONVERSION_TABLES.get(table_key)
+        if table is None:
             conversion_factor = Metric._get_conversion_factor(unit, si_bytes_conversion)
+            table = []
+            for prefixes, convertible_units in ((Metric.UNIT_PREFIXES_N, Metric.CONVERTIBLE_UNITS_N),
+                                                (Metric.UNIT_PREFIXES_P, Metric.CONVERTIBLE_UNITS_P)):
+                entries = []
+                if unit in convertible_units:
+                    for key in reversed(prefixes):
+                        multiplication_factor = Metric.DISPLAY_UNIT_FACTORS[key](conversion_factor)
+                        entries.append((1.0 / multiplication_factor, multiplication_factor, f'{key}{unit}'))
+                table.append(([entry[0] for entry in entries], [entry[1:] for entry in entries]))
+            table = Metric._CONVERSION_TABLES[table_key] = tuple(table)
+        return table
 
-            keys = []
-            if value < 1 and unit in Metric.CONVERTIBLE_UNITS_N:
-                keys = Metric.UNIT_PREFIXES_N
-            elif value > 1 and unit in Metric.CONVERTIBLE_UNITS_P:
-                keys = Metric.UNIT_PREFIXES_P
-            elif unit == Metric.UNIT_SECONDS:
-                return convert_seconds(value), ''
-
-            for key in keys:
-                multiplication_factor = Metric.DISPLAY_UNIT_FACTORS[key](conversion_factor)
-                if 1.0 / multiplication_factor <= value:
-                    return value * multiplication_factor, f'{key}{unit}'
-        return value, unit
+    @staticmethod
+    def _convert_with_table(value, unit, table):
+        """Converts a float value using the table returned by _get_conversion_table()."""
+        (n_thresholds, n_entries), (p_thresholds, p_entries) = table
+        if value < 1 and n_entries:
+            thresholds, entries = n_thresholds, n_entries
+        elif value > 1 and p_entries:
+            thresholds, entries = p_thresholds, p_entries
+        elif unit == Metric.UNIT_SECONDS:
+            return convert_seconds(value), ''
+        else:
+            return value, unit
+
+        index = bisect_right(thresholds, value)
+        if not index:
+            return value, unit
+        multiplication_factor, prefixed_unit = entries[index - 1]
+        return value * multiplication_factor, prefixed_unit
 
     @staticmethod
     def _get_conversion_factor(unit, si_bytes_conversion):
@@ -283,3 +435,61 @@ class Metric:  # pylint: disable=too-many-instance-attributes
         if check_outside_range:
             return outside_range
         return not outside_range
+
+
+class Threshold:
+    """Object to represent a parsed Nagios threshold range.
+
+    Threshold strings are parsed once into their start, end and inside/outside flag.
+    Use Threshold.parse() to share parsed objects between metrics using the same threshold string.
+
+    Keyword Arguments:
+        - threshold -- The threshold string, e.g. '10', '~:5', '@1KB:2KB'
+        - si_bytes_conversion -- Whether to convert unit prefixes using the SI standard (default: False)
+    """
+
+    __slots__ = ('threshold', 'start', 'end', 'check_outside_range')
+
+    def __init__(self, threshold, si_bytes_conversion=False):
+        self.threshold = threshold
+        self.start, self.end, self.check_outside_range = Metric._parse_threshold(  # pylint: disable=protected-access
+            threshold, si_bytes_conversion)
+        self.start, self.end = float(self.start), float(self.end)
+
+    def __repr__(self):
+        return f"Threshold({self.threshold!r}, start={self.start}, end={self.end}, " \
+               f"check_outside_range={self.check_outside_range})"
+
+    @staticmethod
+    @functools.lru_cache(maxsize=THRESHOLD_CACHE_SIZE)
+    def parse(threshold, si_bytes_conversion=False):
+        """Returns the Threshold object for the threshold string, parsing it only on first use."""
+        return Threshold(threshold, si_bytes_conversion)
+
+    @staticmethod
+    def cache_clear():
+        """Empties the cache of parsed thresholds."""
+        Threshold.parse.cache_clear()
+
+    @staticmethod
+    def cache_info():
+        """Returns the hits, misses, maxsize and currsize statistics of the parsed thresholds cache."""
+        return Threshold.parse.cache_info()
+
+    def check(self, value):
+        """Returns True if the value should raise an alert against this threshold."""
+        value = float(value)
+        outside_range = value < self.start or value > self.end
+        if self.check_outside_range:
+            return outside_range
+        return not outside_range
+
+    def check_many(self, values):
+        """Returns a boolean numpy array marking the values which should raise an alert against this threshold.
+        Requires NumPy to be installed.
+        """
+        values = numpy.asarray(values, dtype=float)
+        outside_range = (values < self.start) | (values > self.end)
+        if self.check_outside_range:
+            return outside_range
+        return ~outside_range
@@ -0,0 +1,123 @@
+"""
+MetricBatch Class.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+from array import array
+from collections import Counter
+
+from .metric import Metric
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class MetricBatch:  # pylint: disable=too-many-instance-attributes
+    """Columnar store for many metrics sharing the same unit, thresholds and display options.
+
+    Names and values are kept in arrays, states are evaluated in bulk and the summary and perf data
+    strings are rendered directly from the arrays, without creating a Metric object per value.
+
+    Keyword Arguments:
+        - names -- Sequence of names of the Metrics
+        - values -- Sequence of numeric values of the Metrics (note: do not include unit of measure)
+        - unit -- Unit of Measure of the Metrics
+        - warning_threshold -- Warning threshold for the Metrics (default: '')
+        - critical_threshold -- Critical threshold for the Metrics (default: '')
+        - display_format -- Formatting string to print the Metrics (default: "{name} is {value}{unit}")
+        - display_names -- Sequence of names to be used in friendly output (default: values of names)
+        - display_in_summary -- Whether to print the metrics in the summary (default: True)
+        - display_in_perf -- Whether to print the metrics in performance data (default: True)
+        - convert_metric -- Whether to convert the metric values to a more human friendly unit (default: False)
+        - si_bytes_conversion -- Whether to convert values using the SI standard, uses IEC by default (default: False)
+        - summary_precision -- The number of decimal places to round the metric values in the summary to (default 2)
+        - perf_data_precision -- The number of decimal places to round the metric values in the perf data to (default 2)
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments, too-many-positional-arguments, too-many-locals
+            self, names, values, unit='',
+            warning_threshold=None,
+            critical_threshold=None,
+            display_format="{name} is {value}{unit}",
+            display_names=None,
+            display_in_summary=True,
+            display_in_perf=True,
+            convert_metric=None,
+            si_bytes_conversion=False,
+            summary_precision=2,
+            perf_data_precision=2,
+    ):
+        self.names = list(names)
+        for name in self.names:
+            Metric.validate_name(name)
+        if numpy is not None:
+            self.values = numpy.asarray(values, dtype=float)
+        else:
+            self.values = array('d', (float(value) for value in values))
+        if len(self.values) != len(self.names):
+            raise ValueError(f"Got {len(self.values)} values for {len(self.names)} metric names.")
+        self.display_names = list(display_names) if display_names else self.names
+        if len(self.display_names) != len(self.names):
+            raise ValueError(f"Got {len(self.display_names)} display names for {len(self.names)} metric names.")
+
+        self.unit = unit
+        self.warning_threshold = warning_threshold or ''
+        self.critical_threshold = critical_threshold or ''
+        self.display_format = display_format
+        self.display_in_summary = display_in_summary
+        self.display_in_perf = display_in_perf
+        self.convert_metric = convert_metric or (convert_metric is None and unit in Metric.BYTE_UNITS)
+        self.si_bytes_conversion = si_bytes_conversion
+        self.messages = {}
+
+        states = Metric.evaluate_many(self.values, warning_threshold, critical_threshold, si_bytes_conversion)
+        self.states = states if numpy is not None else array('b', states)
+
+        self.summary_precision = Metric.parse_precision(summary_precision, 'summary precision')
+        self.perf_data_precision = Metric.parse_precision(perf_data_precision, 'performance data precision')
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def state(self):
+        """The worst state of all the metrics in the batch"""
+        if not self.names:
+            return Metric.STATUS_OK
+        return int(max(self.states))
+
+    @property
+    def state_counts(self):
+        """The number of metrics in the batch in each state, by status code"""
+        if numpy is not None:
+            return dict(enumerate(numpy.bincount(self.states, minlength=Metric.STATUS_UNKNOWN + 1).tolist()))
+        return dict(Counter(self.states))
+
+    def summaries(self):
+        """Yields the summary string of each metric, in order"""
+        if not self.display_in_summary:
+            return
+        unit = Metric.UNIT_MAPPING.get(self.unit) or self.unit
+        values = self.values.tolist()
+        if self.convert_metric:
+            converted = Metric.convert_values(values, unit, si_bytes_conversion=self.si_bytes_conversion)
+        else:
+            converted = [(value, unit) for value in values]
+        for index, (display_name, (value, value_unit)) in enumerate(zip(self.display_names, converted)):
+            message = self.messages.get(index) if self.messages else None
+            if message:
+                yield message
+                continue
+            yield Metric.format_summary(
+                self.display_format, display_name, value, value_unit, precision=self.summary_precision)
+
+    def perf_data(self):
+        """Yields the perf data string of each metric, in order"""
+        if not self.display_in_perf:
+            return
+        for name, value in zip(self.names, self.values.tolist()):
+            yield Metric.calculate_perf_data(
+                name, value, self.unit, self.warning_threshold, self.critical_threshold,
+                precision=self.perf_data_precision)
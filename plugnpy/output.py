@@ -0,0 +1,128 @@
+"""
+OutputWriter Class.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import os
+import sys
+
+
+class OutputWriter:  # pylint: disable=too-few-public-methods
+    """Object for writing the output of a Check to stdout.
+
+    The output is encoded and streamed in chunks, instead of being joined into a single string.
+    When a byte budget is set, the output is truncated at whole metric boundaries so that it is never
+    cut in the middle of a summary or perf data item. The perf data of the worst state metrics is kept first.
+
+    Keyword Arguments:
+        - max_bytes -- Maximum number of bytes to write, including the trailing new line (default: no limit)
+        - chunk_size -- Number of bytes buffered before writing to the stream (default: 65536)
+        - stream -- Stream to write to (default: sys.stdout)
+    """
+
+    CHUNK_SIZE = 65536
+    ENCODING = 'utf-8'
+    TRUNCATION_MARKER = '...'
+    PERF_SEPARATOR = ' | '
+
+    def __init__(self, max_bytes=None, chunk_size=CHUNK_SIZE, stream=None):
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._stream = stream
+        self._chunk = []
+        self._chunk_length = 0
+
+    def write(self, header, summaries, sep, perf_data):
+        """Writes the check output.
+
+        Keyword Arguments:
+            - header -- The string printed before the summary, e.g. "METRIC OK - "
+            - summaries -- Iterable of summary strings
+            - sep -- The string separating each summary
+            - perf_data -- Iterable of (state, perf data string) tuples
+        """
+        if self.max_bytes is None:
+            self._write_all(header, summaries, sep, perf_data)
+        else:
+            self._write_truncated(header, summaries, sep, perf_data)
+        self._flush()
+
+    def _write_all(self, header, summaries, sep, perf_data):
+        self._write(header.encode(self.ENCODING))
+        sep = sep.encode(self.ENCODING)
+        for index, summary in enumerate(summaries):
+            if index:
+                self._write(sep)
+            self._write(summary.encode(self.ENCODING))
+        self._write_perf_data(perf.encode(self.ENCODING) for _, perf in perf_data)
+        self._write(os.linesep.encode(self.ENCODING))
+
+    def _write_truncated(self, header, summaries, sep, perf_data):  # pylint: disable=too-many-locals
+        header = header.encode(self.ENCODING)
+        sep = sep.encode(self.ENCODING)
+        marker = self.TRUNCATION_MARKER.encode(self.ENCODING)
+        summaries = [summary.encode(self.ENCODING) for summary in summaries]
+        perf_data = [(state, perf.encode(self.ENCODING)) for state, perf in perf_data]
+
+        # space left once the header and trailing new line are written
+        budget = self.max_bytes - len(header) - len(os.linesep)
+
+        summary_length = sum(len(summary) for summary in summaries) + len(sep) * max(len(summaries) - 1, 0)
+        kept_summaries = len(summaries)
+        if summary_length > budget:
+            # keep as many whole summaries as possible, followed by the truncation marker
+            summary_length = len(marker)
+            for kept_summaries, summary in enumerate(summaries):
+                length = len(summary) + len(sep)
+                if summary_length + length > budget:
+                    break
+                summary_length += length
+        budget -= summary_length
+
+        # keep the perf data of the worst state metrics first, then output it in the original order
+        kept_perf = set()
+        perf_length = len(self.PERF_SEPARATOR) - 1
+        for index in sorted(range(len(perf_data)), key=lambda index: -perf_data[index][0]):
+            length = len(perf_data[index][1]) + 1
+            if perf_length + length <= budget:
+                kept_perf.add(index)
+                perf_length += length
+
+        self._write(header)
+        for index, summary in enumerate(summaries[:kept_summaries]):
+            if index:
+                self._write(sep)
+            self._write(summary)
+        if kept_summaries < len(summaries):
+            if kept_summaries:
+                self._write(sep)
+            self._write(marker)
+        self._write_perf_data(perf for index, (_, perf) in enumerate(perf_data) if index in kept_perf)
+        self._write(os.linesep.encode(self.ENCODING))
+
+    def _write_perf_data(self, perf_data):
+        for index, perf in enumerate(perf_data):
+            self._write(b' ' if index else self.PERF_SEPARATOR.encode(self.ENCODING))
+            self._write(perf)
+
+    def _write(self, data):
+        self._chunk.append(data)
+        self._chunk_length += len(data)
+        if self._chunk_length >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._chunk:
+            return
+        data = b''.join(self._chunk)
+        self._chunk = []
+        self._chunk_length = 0
+        stream = self._stream or sys.stdout
+        buffer = getattr(stream, 'buffer', None)
+        if buffer is None:
+            stream.write(data.decode(self.ENCODING))
+            return
+        # text written to the stream before the check output must be written out first
+        stream.flush()
+        buffer.write(data)
+        buffer.flush()
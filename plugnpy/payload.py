@@ -0,0 +1,102 @@
+"""
+PayloadCodec Class, encodes the data stored in the cache manager.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import base64
+import json
+import math
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+COMPRESSED_PREFIX = 'z:'
+INLINE_KEY = 'value'
+
+
+class PayloadCodec:
+    """Object converting the values cached by CacheManagerUtils to and from the data stored in the cache manager.
+
+    By default the data is the JSON text of the value, as stored by the previous versions of plugnpy.
+    Optionally, the JSON text larger than compress_threshold bytes is compressed with zlib and stored as
+    COMPRESSED_PREFIX followed by its base64 encoding. As JSON text never starts with COMPRESSED_PREFIX,
+    both forms can be read back, so data written by older clients stays readable.
+    Compressed data can only be read by the clients supporting it.
+
+    The data may also be received inline, as the JSON object {"value": value} instead of a JSON string
+    (see CacheManagerClient inline_data), in which case it is already decoded.
+
+    Keyword Arguments:
+        - compress_threshold -- Minimum size in bytes of the JSON text to compress (default: None, no compression)
+        - compress_level -- The zlib compression level (default: 6)
+        - json_backend -- 'json', or 'orjson' to encode and decode the JSON text with orjson, which is faster,
+            falling back to the json module for the values orjson does not handle the same way (default: 'json')
+    """
+
+    def __init__(self, compress_threshold=None, compress_level=6, json_backend='json'):
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+        if json_backend not in ('json', 'orjson'):
+            raise ValueError(f"Unknown JSON backend: {json_backend}")
+        if json_backend == 'orjson' and orjson is None:
+            raise ValueError("The orjson JSON backend is not installed")
+        self.json_backend = json_backend
+
+    def json_dumps(self, obj):
+        """Returns the JSON text of the object"""
+        if self.json_backend == 'orjson':
+            try:
+                text = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)  # pylint: disable=no-member
+            except TypeError:
+                # e.g. integers larger than 64 bits, which the json module supports
+                pass
+            else:
+                # orjson writes NaN and Infinity as null, which the json module keeps
+                if b'null' not in text or not _has_non_finite(obj):
+                    return text.decode('utf-8')
+        return json.dumps(obj)
+
+    def json_loads(self, text):
+        """Returns the object of the JSON text"""
+        if self.json_backend == 'orjson':
+            try:
+                return orjson.loads(text)  # pylint: disable=no-member
+            except orjson.JSONDecodeError:  # pylint: disable=no-member
+                # e.g. NaN and Infinity, written by the json module
+                pass
+        return json.loads(text)
+
+    def dumps(self, value):
+        """Returns the data to store for the value"""
+        text = self.json_dumps(value)
+        if self.compress_threshold is None or len(text) < self.compress_threshold:
+            return text
+        compressed = zlib.compress(text.encode('utf-8'), self.compress_level)
+        return COMPRESSED_PREFIX + base64.b64encode(compressed).decode('ascii')
+
+    def loads(self, data):
+        """Returns the value of the stored data"""
+        if not isinstance(data, str):
+            return data[INLINE_KEY]
+        if data.startswith(COMPRESSED_PREFIX):
+            data = zlib.decompress(base64.b64decode(data[len(COMPRESSED_PREFIX):])).decode('utf-8')
+        return self.json_loads(data)
+
+    @staticmethod
+    def is_json(data):
+        """Returns True if the stored data is JSON text, False if it is compressed"""
+        return not data.startswith(COMPRESSED_PREFIX)
+
+
+def _has_non_finite(obj):
+    """Returns True if the object contains a NaN or infinite float"""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
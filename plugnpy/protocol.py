@@ -0,0 +1,170 @@
+"""
+Protocol classes, the requests and responses shared by the clients and the asyncio clients
+of the cache manager and state manager.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import contextlib
+import json
+import time
+
+from .deadline import remaining_time
+from .exception import ResultError, StateManagerStoreError
+from .payload import PayloadCodec
+
+# returned instead of the response of a request the cache manager does not support
+_UNSUPPORTED = object()
+
+
+class ClientProtocol:  # pylint: disable=too-few-public-methods
+    """Base class of the clients, with the namespace, headers, retry policy and circuit breaker of the requests"""
+
+    HTTP_STATUS_OK_MIN = 200
+    HTTP_STATUS_OK_MAX = 299
+
+    def __init__(self, host, namespace, retry=None, circuit_breaker=None):
+        self._namespace = namespace
+        self._retry = retry
+        self._circuit_breaker = circuit_breaker
+        self._headers = {'Referer': host, 'Content-Type': 'application/json'}
+
+    def _is_ok(self, response):
+        """Returns True if the status code of the response is a success"""
+        return self.HTTP_STATUS_OK_MIN <= response.status_code <= self.HTTP_STATUS_OK_MAX
+
+
+class CacheManagerProtocol(ClientProtocol):  # pylint: disable=too-few-public-methods
+    """Base class of CacheManagerClient and AsyncCacheManagerClient, building their requests and reading
+    the responses, so the clients only differ by how the requests are sent.
+    """
+
+    # status codes of a cache manager which does not support the batch requests
+    HTTP_STATUS_UNSUPPORTED = (404, 405, 501)
+    # requests which may hand out a lock, so they are not idempotent
+    LOCKING_REQUESTS = ('get_data', 'get_many')
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, host, namespace, codec=None, retry=None, circuit_breaker=None, stats=None):
+        super().__init__(host, namespace, retry, circuit_breaker)
+        self._codec = codec or PayloadCodec()
+        self._stats = stats
+        self._batch_supported = None
+        self._lease_supported = None
+
+    def _get_data_params(self, key, max_wait_time):
+        return {'namespace': self._namespace, 'key': key, 'max_wait_time': max_wait_time}
+
+    def _get_many_params(self, keys, max_wait_time):
+        return {'namespace': self._namespace, 'keys': keys, 'max_wait_time': max_wait_time}
+
+    def _set_data_params(self, key, data, ttl):
+        return {'namespace': self._namespace, 'key': key, 'data': data, 'ttl': ttl}
+
+    def _set_many_params(self, items, ttl):
+        return {'namespace': self._namespace, 'items': items, 'ttl': ttl}
+
+    def _renew_lock_params(self, key, lease):
+        return {'namespace': self._namespace, 'key': key, 'lease': lease}
+
+    @staticmethod
+    def _cap_wait_time(max_wait_time):
+        budget = remaining_time()
+        if budget is not None:
+            # the cache manager only accepts whole seconds
+            max_wait_time = min(max_wait_time, max(int(budget), 1))
+        return max_wait_time
+
+    @staticmethod
+    def _responses(keys, responses):
+        """Returns the response of each of the keys, with no data and no lock for the keys missing from responses"""
+        missing = {'data': None, 'lock': None}
+        return {key: responses.get(key) or missing for key in keys}
+
+    def _batch_response(self, response):
+        """Returns the response of a batch request, remembering whether the cache manager supports them"""
+        self._batch_supported = response is not _UNSUPPORTED
+        return response
+
+    def _lock_renewed(self, response):
+        """Returns True if the response of a renew_lock request tells the lock was renewed,
+        remembering whether the cache manager supports leases
+        """
+        self._lease_supported = response is not _UNSUPPORTED
+        return self._lease_supported and bool(response and response.get('success'))
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def _read(self, path, start, body, response, allow_unsupported=False, sized=False):
+        """Reads and records the response of the request sent at start, returns the decoded response,
+        and its size if sized is True, or _UNSUPPORTED if allow_unsupported and the cache manager does not support
+        the request. Raises ResultError if the request failed.
+        """
+        if allow_unsupported and response.status_code in self.HTTP_STATUS_UNSUPPORTED:
+            self._record(path, start, body, response.read())
+            return _UNSUPPORTED
+        self._check_for_error(response)
+        raw_response = response.read()
+        self._record(path, start, body, raw_response)
+        decoded = self._codec.json_loads(raw_response) if raw_response else None
+        return (decoded, len(raw_response or '')) if sized else decoded
+
+    @contextlib.contextmanager
+    def _record_errors(self, path, start, body):
+        """Records the request sent at start as failed if it raises an exception"""
+        try:
+            yield
+        except Exception:
+            self._record(path, start, body, None, error=True)
+            raise
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def _record(self, path, start, body, raw_response, error=False):
+        """Records the request in the CacheStats, if any"""
+        if self._stats is not None:
+            self._stats.record_call(path, time.monotonic() - start, len(body or ''), len(raw_response or ''), error)
+
+    def _check_for_error(self, response):
+        if not self._is_ok(response):
+            raw_body = response.read()
+            raise ResultError(f"{response.status_code}: {response.status_message} - {raw_body}")
+
+
+class StateManagerProtocol(ClientProtocol):  # pylint: disable=too-few-public-methods
+    """Base class of StateManagerClient and AsyncStateManagerClient, building their requests and reading
+    the responses, so the clients only differ by how the requests are sent.
+    """
+
+    def _store_params(self, key, data, ttl, timestamp):
+        if not isinstance(data, str):
+            raise TypeError(f"Data must be a str type, not {type(data)}")
+        return {
+            'namespace': self._namespace,
+            'key': key,
+            'data': data,
+            'ttl': ttl,
+            'timestamp': timestamp or time.time(),
+        }
+
+    def _fetch_params(self, key):
+        return {'namespace': self._namespace, 'key': key}
+
+    def _check_stored(self, response):
+        """Raises a StateManagerStoreError if the response of a store_data request is an error"""
+        if not self._is_ok(response):
+            raise StateManagerStoreError(f"{response.status_code}: {response.status_message} - {response.read()}")
+
+    def _fetched_data(self, response):
+        """Returns the data of the response of a fetch_data request, or None if not found.
+        Raises a StateManagerStoreError if the response is an error.
+        """
+        if response.status_code == 404:
+            # data not found
+            return None
+
+        raw_body = response.read()
+        if not self._is_ok(response):
+            raise StateManagerStoreError(f"{response.status_code}: {response.status_message} - {raw_body}")
+
+        try:
+            return json.loads(raw_body.decode('utf-8'))['data']
+        except Exception as ex:
+            raise StateManagerStoreError(f"Unable to process response ({ex}) - {raw_body}") from ex
@@ -0,0 +1,79 @@
+"""
+RetryPolicy Class, retries the calls to the cache manager and state manager which fail to connect.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import asyncio
+import random
+import time
+
+from socket import error as SocketError
+
+from .deadline import remaining_time
+
+
+class RetryPolicy:
+    """Object retrying the calls failing with a socket error, after a jittered exponential backoff.
+
+    The delay before retry n (from 0) is a random number of seconds between 0 and
+    min(max_delay, base_delay * multiplier ** n), so the processes retrying at the same time spread out.
+    A call is not retried if the delay would go past the deadline of the current context.
+    Idempotent calls are retried on any socket error. The other calls, e.g. getting data which may hand out
+    a lock, are only retried when the connection was refused, as the request then never reached the server.
+
+    Keyword Arguments:
+        - attempts -- Maximum number of attempts of a call, including the first one (default: 3)
+        - base_delay -- Maximum number of seconds before the first retry (default: 0.1)
+        - max_delay -- Maximum number of seconds between two attempts (default: 2)
+        - multiplier -- Factor applied to the maximum delay after each retry (default: 2)
+    """
+
+    def __init__(self, attempts=3, base_delay=0.1, max_delay=2, multiplier=2):
+        if attempts < 1:
+            raise ValueError("A retry policy requires at least one attempt")
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def delay(self, retry):
+        """Returns the number of seconds to wait before the retry, from 0"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** retry))
+
+    def call(self, func, *args, idempotent=True, **kwargs):
+        """Calls the function, retrying it while it raises a socket error. Returns its result.
+
+        :param func: The function to call.
+        :param args: The arguments to pass to the function.
+        :param idempotent: False if the call must only be retried when the connection was refused.
+        :param kwargs: The keyword arguments to pass to the function.
+        """
+        retry = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except SocketError as ex:
+                delay = self._next_delay(ex, retry, idempotent)
+            time.sleep(delay)
+            retry += 1
+
+    async def call_async(self, func, *args, idempotent=True, **kwargs):
+        """Awaits the coroutine function, retrying it while it raises a socket error, see call()"""
+        retry = 0
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except SocketError as ex:
+                delay = self._next_delay(ex, retry, idempotent)
+            await asyncio.sleep(delay)
+            retry += 1
+
+    def _next_delay(self, ex, retry, idempotent):
+        """Returns the delay before the retry of the call which raised the socket error, or raises it again"""
+        if retry + 1 >= self.attempts or not (idempotent or isinstance(ex, ConnectionRefusedError)):
+            raise ex
+        delay = self.delay(retry)
+        budget = remaining_time()
+        if budget is not None and delay >= budget:
+            raise ex
+        return delay
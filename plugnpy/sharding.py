@@ -0,0 +1,227 @@
+"""
+Consistent-hash sharding of the keys across many cache manager nodes.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import bisect
+import time
+
+from socket import error as SocketError
+
+from .exception import CircuitOpenError
+from .utils import hash_string
+
+
+def parse_endpoints(endpoints, default_port=None):
+    """Returns the list of (host, port) of the endpoints of the cache manager nodes.
+
+    :param endpoints: A list of (host, port), or a string of comma separated 'host:port',
+        where a host which is an absolute path is the path of a Unix domain socket, with no port,
+        and an IPv6 address is enclosed in brackets, e.g. '[::1]:8181'.
+    :param default_port: The port of the endpoints given without one.
+
+    Raises a ValueError if an endpoint has no host, or no port and there is no default port,
+    or is an IPv6 address without brackets.
+    """
+    if not isinstance(endpoints, str):
+        return [tuple(endpoint) for endpoint in endpoints]
+    parsed = []
+    for endpoint in endpoints.split(','):
+        endpoint = endpoint.strip()
+        if not endpoint:
+            continue
+        if endpoint.startswith('/'):
+            parsed.append((endpoint, None))
+            continue
+        if endpoint.startswith('['):
+            host, _, port = endpoint[1:].partition(']')
+            if port and not port.startswith(':'):
+                raise ValueError(f"Invalid cache manager endpoint: {endpoint}")
+            port = port[1:]
+        else:
+            host, _, port = endpoint.partition(':')
+            if ':' in port:
+                raise ValueError(f"IPv6 address of a cache manager endpoint without brackets: {endpoint}")
+        port = port or default_port
+        if not host or not port:
+            raise ValueError(f"Cache manager endpoint without a host or a port: {endpoint}")
+        parsed.append((host, port))
+    return parsed
+
+
+def endpoint_name(host, port):
+    """Returns the name of the node at the endpoint, which places it on the HashRing"""
+    return host if port is None else f'{host}:{port}'
+
+
+class HashRing:
+    """A consistent hash ring of nodes.
+
+    Each node is placed at replicas points of the ring, and a key belongs to the node of the first point
+    following the position of the key. The nodes following it on the ring take over its keys if it is down,
+    so only the keys of that node move, and they are spread over the remaining nodes.
+    The points of a node only depend on its name, so every process maps the keys to the same nodes.
+
+    Keyword Arguments:
+        - nodes -- Names of the nodes
+        - replicas -- Number of points of each node on the ring (default: 100)
+    """
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = list(dict.fromkeys(nodes))
+        if not self.nodes:
+            raise ValueError("A hash ring requires at least one node")
+        points = sorted(
+            (self.position(f'{node}#{replica}'), node) for node in self.nodes for replica in range(replicas)
+        )
+        self._positions = [position for position, _ in points]
+        self._owners = [node for _, node in points]
+
+    @staticmethod
+    def position(key):
+        """Returns the position of the key on the ring.
+
+        Keys already hashed by generate_key(), or get_via_cachemanager(), are used as they are.
+        """
+        if len(key) != 64:
+            key = hash_string(key)
+        try:
+            return int(key[:16], 16)
+        except ValueError:
+            return int(hash_string(key)[:16], 16)
+
+    def get_node(self, key):
+        """Returns the node the key belongs to"""
+        return self._owners[bisect.bisect(self._positions, self.position(key)) % len(self._owners)]
+
+    def get_nodes(self, key):
+        """Returns the nodes in the order they take over the key: its node first, then the next nodes of the ring"""
+        start = bisect.bisect(self._positions, self.position(key))
+        nodes = []
+        for index in range(len(self._owners)):
+            node = self._owners[(start + index) % len(self._owners)]
+            if node not in nodes:
+                nodes.append(node)
+                if len(nodes) == len(self.nodes):
+                    break
+        return nodes
+
+
+class ShardedCacheManagerClient:
+    """A client sharding the keys across many cache manager nodes, with the interface of CacheManagerClient.
+
+    Each key is sent to its node on a HashRing of the clients of the nodes.
+    A node whose client fails to connect, or whose circuit breaker is open, is skipped for down_time seconds,
+    and its keys go to the next nodes of the ring in the meantime, while the keys of the other nodes do not move.
+    The call fails only if no node can be reached.
+
+    Keyword Arguments:
+        - clients -- Dictionary of node name: client of the node, e.g. a CacheManagerClient
+        - replicas -- Number of points of each node on the ring (default: 100)
+        - down_time -- Number of seconds a node which cannot be reached is skipped (default: 30)
+    """
+
+    def __init__(self, clients, replicas=100, down_time=30):
+        self.clients = dict(clients)
+        self.ring = HashRing(self.clients, replicas)
+        self.down_time = down_time
+        self._down_until = {}
+
+    def get_data(self, key, *args, **kwargs):
+        """Gets data from the node of the key, see CacheManagerClient.get_data()"""
+        return self._call('get_data', key, *args, **kwargs)
+
+    def set_data(self, key, *args, **kwargs):
+        """Sets data into the node of the key, see CacheManagerClient.set_data()"""
+        return self._call('set_data', key, *args, **kwargs)
+
+    def renew_lock(self, key, *args, **kwargs):
+        """Renews the lock held on the key on its node, see CacheManagerClient.renew_lock()"""
+        return self._call('renew_lock', key, *args, **kwargs)
+
+    def get_many(self, keys, *args, **kwargs):
+        """Gets the data of many keys, with a get_many request to the node of each group of keys,
+        see CacheManagerClient.get_many()
+
+        :returns: A dictionary of key: response, in the order of the keys.
+        """
+        keys = list(dict.fromkeys(keys))
+        responses = {}
+        for response in self._call_many('get_many', keys, lambda group: group, *args, **kwargs):
+            responses.update(response)
+        return {key: responses[key] for key in keys}
+
+    def set_many(self, items, *args, **kwargs):
+        """Sets the data of many keys, with a set_many request to the node of each group of keys,
+        see CacheManagerClient.set_many()
+
+        :returns: The list of the responses of the nodes.
+        """
+        return self._call_many(
+            'set_many', list(items), lambda group: {key: items[key] for key in group}, *args, **kwargs)
+
+    def status(self, deadline=None):
+        """Fetches the status of each node.
+
+        :returns: A dictionary of node name: status, or {'error': message} for the nodes which cannot be reached.
+        """
+        statuses = {}
+        for name, client in self.clients.items():
+            try:
+                statuses[name] = client.status(deadline=deadline)
+            except (SocketError, CircuitOpenError) as ex:
+                self._mark_down(name)
+                statuses[name] = {'error': str(ex)}
+        return statuses
+
+    def close(self):
+        """Closes the clients of the nodes"""
+        for client in self.clients.values():
+            client.close()
+
+    def is_down(self, name):
+        """Returns True if the node is currently skipped"""
+        return time.monotonic() < self._down_until.get(name, 0)
+
+    def _mark_down(self, name):
+        self._down_until[name] = time.monotonic() + self.down_time
+
+    def _candidates(self, key, failed=()):
+        """Returns the nodes to try for the key: the nodes which are up in ring order, then the nodes marked down,
+        as they may be back, except the nodes which already failed during this call
+        """
+        nodes = [node for node in self.ring.get_nodes(key) if node not in failed]
+        return [node for node in nodes if not self.is_down(node)] + [node for node in nodes if self.is_down(node)]
+
+    def _call(self, method, key, *args, **kwargs):
+        """Calls the method of the client of the node of the key, failing over to the next nodes"""
+        error = None
+        for name in self._candidates(key):
+            try:
+                return getattr(self.clients[name], method)(key, *args, **kwargs)
+            except (SocketError, CircuitOpenError) as ex:
+                self._mark_down(name)
+                error = ex
+        raise error
+
+    def _call_many(self, method, keys, make_arg, *args, **kwargs):
+        """Calls the method of the clients of the nodes of the keys, with the argument made from the keys of each node,
+        moving the keys of the nodes which fail to the next nodes. Returns the list of the responses.
+        """
+        responses = []
+        failed = set()
+        while keys:
+            groups = {}
+            for key in keys:
+                groups.setdefault(self._candidates(key, failed)[0], []).append(key)
+            keys = []
+            for name, group in groups.items():
+                try:
+                    responses.append(getattr(self.clients[name], method)(make_arg(group), *args, **kwargs))
+                except (SocketError, CircuitOpenError):
+                    self._mark_down(name)
+                    failed.add(name)
+                    if len(failed) == len(self.clients):
+                        raise
+                    keys.extend(group)
+        return responses
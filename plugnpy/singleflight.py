@@ -0,0 +1,112 @@
+"""
+SingleFlight Class, coalesces the concurrent calls for the same key within a process.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import sys
+import threading
+
+from .deadline import remaining_time
+from .exception import DeadlineExceeded
+
+
+class SingleFlight:
+    """Object making the concurrent calls for the same key share the outcome of a single call.
+
+    The first caller for a key calls the function, the callers arriving while it is in flight wait for it
+    and get its result, or its exception, instead of calling the function again.
+    The callers may be threads or greenlets: when gevent is used without monkey patching,
+    the greenlets of the main thread wait on a gevent Event, so the caller in flight can run.
+    A call for the key made by the caller in flight itself, from within the function, is not coalesced,
+    as it would wait for itself.
+    The waits are limited to the deadline of the current context, if any.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """Calls the function, unless a call for the same key is in flight, and returns its result.
+
+        :param key: The key identifying the call.
+        :param func: The function to call.
+        :param args: The arguments to pass to the function.
+        :param kwargs: The keyword arguments to pass to the function.
+        Raises the exception raised by the function, or DeadlineExceeded if the deadline passes while waiting.
+        """
+        event = None
+        with self._lock:
+            flight = self._flights.get(key)
+            caller = self._caller()
+            if flight is None:
+                flight = self._flights[key] = _Flight(caller)
+            elif flight.caller == caller:
+                flight = None
+            else:
+                event = self._new_event()
+                flight.waiters.append(event)
+        if flight is None:
+            return func(*args, **kwargs)
+        if event is None:
+            return self._call(key, flight, func, args, kwargs)
+        return self._wait(flight, event)
+
+    def in_flight(self):
+        """Returns the number of calls in flight"""
+        with self._lock:
+            return len(self._flights)
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def _call(self, key, flight, func, args, kwargs):
+        try:
+            flight.result = func(*args, **kwargs)
+        except BaseException as ex:
+            flight.error = ex
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                waiters = flight.waiters
+            for event in waiters:
+                event.set()
+        return flight.result
+
+    @staticmethod
+    def _wait(flight, event):
+        if not event.wait(remaining_time()):
+            raise DeadlineExceeded("Deadline exceeded while waiting for a concurrent call")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    @staticmethod
+    def _caller():
+        """Returns the identity of the calling greenlet, or thread if greenlets are not used"""
+        greenlet = sys.modules.get('greenlet')
+        if greenlet is not None:
+            return id(greenlet.getcurrent())
+        return threading.get_ident()
+
+    @staticmethod
+    def _new_event():
+        gevent = sys.modules.get('gevent')
+        if gevent is not None and threading.current_thread() is threading.main_thread():
+            # only imported when gevent is used, as importing gevent is slow
+            from gevent import monkey  # pylint: disable=import-outside-toplevel
+            if not monkey.is_module_patched('threading'):
+                from gevent.event import Event  # pylint: disable=import-outside-toplevel
+                return Event()
+        return threading.Event()
+
+
+class _Flight:  # pylint: disable=too-few-public-methods
+    """A call in flight, with the events of the callers waiting for it"""
+
+    __slots__ = ('caller', 'waiters', 'result', 'error')
+
+    def __init__(self, caller):
+        self.caller = caller
+        self.waiters = []
+        self.result = None
+        self.error = None
@@ -0,0 +1,403 @@
+"""
+StandInServer Class, an in-memory cache manager and state manager to test and load test the clients.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import argparse
+import http.server
+import json
+import os
+import random
+import socket
+import socketserver
+import threading
+import time
+
+
+class StandInServer:  # pylint: disable=too-many-instance-attributes
+    """An HTTP server answering the requests of the cache manager and state manager clients from memory.
+
+    It implements the get_data/get_many lock protocol of the cache manager: the first caller for a missing key
+    gets the lock, the other callers wait up to their max_wait_time for the lock holder to store the data
+    with set_data/set_many. A lock runs out after lock_timeout seconds, or after its lease if it is renewed
+    with renew_lock, and is then handed out to the next caller. It also implements status, and the
+    store_data/fetch_data requests of the state manager, so the clients and get_via_cachemanager can be tested
+    and load tested without an Opsview deployment.
+
+    Latency and failures are injected in every request, and can be changed while the server runs:
+    a request is delayed by latency plus a random jitter, then its connection is closed without a response
+    with a probability of drop_rate, or it fails with a 500 response with a probability of error_rate.
+
+    The connections are kept alive between requests, unless keep_alive is False, in which case each response
+    closes its connection. A connection kept alive is closed by the server once it has been idle for idle_timeout
+    seconds, without telling the client, as the real servers do.
+
+    The server records the connections, the requests, the locks handed out for each key and how long the callers
+    waited for a lock holder, see stats().
+
+    Keyword Arguments:
+        - host -- Host to listen on, or the path of a Unix domain socket (default: '127.0.0.1')
+        - port -- Port to listen on, 0 for a free port (default: 0)
+        - latency -- Number of seconds added to each request (default: 0)
+        - jitter -- Maximum number of random seconds added to the latency (default: 0)
+        - error_rate -- Probability of a request failing with a 500 response (default: 0)
+        - drop_rate -- Probability of a connection being closed without a response (default: 0)
+        - lock_timeout -- Number of seconds a lock is held, unless the data is stored or the lock renewed
+          (default: 60)
+        - batch -- True to answer the get_many and set_many requests, False to answer them with a 404
+          as a cache manager not supporting them (default: True)
+        - keep_alive -- False to close the connection after each response (default: True)
+        - idle_timeout -- Number of seconds an idle connection is kept alive, None for no limit (default: None)
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(
+            self, host='127.0.0.1', port=0, latency=0, jitter=0, error_rate=0, drop_rate=0, lock_timeout=60,
+            batch=True, keep_alive=True, idle_timeout=None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.lock_timeout = lock_timeout
+        self.batch = batch
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self._condition = threading.Condition()
+        self._cache = {}
+        self._state = {}
+        self._locks = {}
+        self._stats = self._new_stats()
+        self._server = None
+
+    @property
+    def address(self):
+        """Returns the (host, port) the server listens on, with a port of None for a Unix domain socket"""
+        if self._server is None or self._unix:
+            return self.host, None
+        return self._server.server_address[:2]
+
+    @property
+    def _unix(self):
+        return str(self.host).startswith('/')
+
+    def start(self):
+        """Starts serving the requests from a background thread, returns the server"""
+        if self._unix:
+            self._server = _UnixServer(self.host, _Handler)
+        else:
+            self._server = _TCPServer((self.host, self.port), _Handler)
+        self._server.standin = self
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), name='plugnpy-standin', daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stops the server, and wakes up the callers waiting for a lock"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        with self._condition:
+            self._condition.notify_all()
+        if self._unix and os.path.exists(self.host):
+            os.unlink(self.host)
+
+    def serve_forever(self):
+        """Serves the requests until interrupted"""
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """Returns a copy of the statistics, as a dictionary with the keys:
+
+        - connections -- Number of connections accepted
+        - requests -- Number of requests of each path
+        - injected_errors -- Number of requests failed with a 500 response
+        - dropped -- Number of connections closed without a response
+        - locks -- Number of locks handed out for each namespace#key
+        - lock_waits -- Number of seconds each caller waited for a lock holder
+        - lock_timeouts -- Number of callers whose max wait time passed before the data was stored
+        - lease_renewals -- Number of locks renewed
+        """
+        with self._condition:
+            return {
+                name: dict(value) if isinstance(value, dict) else (
+                    list(value) if isinstance(value, list) else value)
+                for name, value in self._stats.items()
+            }
+
+    def reset(self):
+        """Removes the data, locks and statistics"""
+        with self._condition:
+            self._cache.clear()
+            self._state.clear()
+            self._locks.clear()
+            self._stats = self._new_stats()
+
+    @staticmethod
+    def _new_stats():
+        return {
+            'connections': 0,
+            'requests': {},
+            'injected_errors': 0,
+            'dropped': 0,
+            'locks': {},
+            'lock_waits': [],
+            'lock_timeouts': 0,
+            'lease_renewals': 0,
+        }
+
+    def handle(self, path, params):
+        """Returns the (status code, response) of a request to the path, with the decoded JSON params"""
+        handlers = {
+            'get_data': lambda: self._get(params['namespace'], params['key'], params.get('max_wait_time', 30)),
+            'get_many': lambda: self._get_many(params['namespace'], params['keys'], params.get('max_wait_time', 30)),
+            'set_data': lambda: self._set(params['namespace'], {params['key']: params['data']}, params['ttl']),
+            'set_many': lambda: self._set(params['namespace'], params['items'], params['ttl']),
+            'renew_lock': lambda: self._renew(params['namespace'], params['key'], params['lease']),
+            'status': self._status,
+            'store_data': lambda: self._store(params),
+            'fetch_data': lambda: self._fetch(params['namespace'], params['key']),
+        }
+        if path not in handlers or (path in ('get_many', 'set_many') and not self.batch):
+            return 404, {'error': f"Unknown request: {path}"}
+        try:
+            return handlers[path]()
+        except (KeyError, TypeError) as ex:
+            return 400, {'error': f"Invalid request: {ex}"}
+
+    def _connected(self):
+        with self._condition:
+            self._stats['connections'] += 1
+
+    def _record(self, path):
+        with self._condition:
+            requests = self._stats['requests']
+            requests[path] = requests.get(path, 0) + 1
+
+    def _get(self, namespace, key, max_wait_time):
+        return 200, self._lookup(f'{namespace}#{key}', max_wait_time)
+
+    def _get_many(self, namespace, keys, max_wait_time):
+        # take all the free locks first, then wait for the other callers within a single wait time
+        responses = {key: self._lookup(f'{namespace}#{key}', 0, record=False) for key in keys}
+        wait_until = time.monotonic() + max_wait_time
+        for key, response in responses.items():
+            if response['data'] is None and not response['lock']:
+                responses[key] = self._lookup(f'{namespace}#{key}', max(wait_until - time.monotonic(), 0))
+        return 200, responses
+
+    def _lookup(self, name, max_wait_time, record=True):
+        start = time.monotonic()
+        wait_until = start + max_wait_time
+        waited = False
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                data = self._read(self._cache, name)
+                if data is not None:
+                    if waited:
+                        self._stats['lock_waits'].append(now - start)
+                    return {'data': data, 'lock': None, 'ttl': self._cache[name][1] - time.time()}
+                # a lock which ran out is handed out again
+                if self._locks.get(name, 0) <= now:
+                    self._locks[name] = now + self.lock_timeout
+                    self._stats['locks'][name] = self._stats['locks'].get(name, 0) + 1
+                    return {'data': None, 'lock': True}
+                if wait_until <= now or self._server is None:
+                    if record:
+                        self._stats['lock_timeouts'] += 1
+                        self._stats['lock_waits'].append(now - start)
+                    return {'data': None, 'lock': None, 'lease': self._locks[name] - now}
+                self._condition.wait(min(wait_until, self._locks[name]) - now)
+                waited = True
+
+    def _set(self, namespace, items, ttl):
+        expires_at = time.time() + ttl
+        with self._condition:
+            for key, data in items.items():
+                name = f'{namespace}#{key}'
+                self._cache[name] = (data, expires_at)
+                self._locks.pop(name, None)
+            self._condition.notify_all()
+        return 200, {'success': True}
+
+    def _renew(self, namespace, key, lease):
+        name = f'{namespace}#{key}'
+        with self._condition:
+            now = time.monotonic()
+            if self._read(self._cache, name) is not None or self._locks.get(name, 0) <= now:
+                return 200, {'success': False}
+            self._locks[name] = now + lease
+            self._stats['lease_renewals'] += 1
+            # the waiters wait until the new end of the lease
+            self._condition.notify_all()
+        return 200, {'success': True}
+
+    def _status(self):
+        with self._condition:
+            now = time.time()
+            entries = sum(1 for _, expires_at in self._cache.values() if expires_at > now)
+            locks = sum(1 for expires_at in self._locks.values() if expires_at > time.monotonic())
+        return 200, {'entries': entries, 'locks': locks, 'state_entries': len(self._state)}
+
+    def _store(self, params):
+        name = f"{params['namespace']}#{params['key']}"
+        with self._condition:
+            self._state[name] = (params['data'], time.time() + params['ttl'])
+        return 200, {'success': True}
+
+    def _fetch(self, namespace, key):
+        with self._condition:
+            data = self._read(self._state, f'{namespace}#{key}')
+        if data is None:
+            return 404, {'error': 'Not found'}
+        return 200, {'data': data}
+
+    @staticmethod
+    def _read(store, name):
+        value = store.get(name)
+        if value is None:
+            return None
+        data, expires_at = value
+        if expires_at <= time.time():
+            del store[name]
+            return None
+        return data
+
+    def _fault(self):
+        """Returns the fault injected in a request: 'drop', 'error' or None, after the injected latency"""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if random.random() < self.drop_rate:
+            with self._condition:
+                self._stats['dropped'] += 1
+            return 'drop'
+        if random.random() < self.error_rate:
+            with self._condition:
+                self._stats['injected_errors'] += 1
+            return 'error'
+        return None
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Handler of the requests of the StandInServer"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # the body is written after the headers, it must not wait for the delayed ACK of the headers
+        self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+        standin = self.server.standin
+        # the connections idle for longer are closed when the read of the next request times out
+        self.timeout = standin.idle_timeout
+        standin._connected()  # pylint: disable=protected-access
+        super().setup()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles a request with JSON params"""
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            self._respond(400, {'error': 'Invalid JSON'})
+            return
+        self._handle(params)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles a request without params, e.g. status"""
+        self._handle({})
+
+    def _handle(self, params):
+        standin = self.server.standin
+        if standin._server is not self.server:  # pylint: disable=protected-access
+            # a stopped server drops the connections its clients kept alive
+            self._drop()
+            return
+        path = self.path.strip('/').split('?')[0]
+        standin._record(path)  # pylint: disable=protected-access
+        fault = standin._fault()  # pylint: disable=protected-access
+        if fault == 'drop':
+            self._drop()
+            return
+        if fault == 'error':
+            self._respond(500, {'error': 'Injected error'})
+            return
+        self._respond(*standin.handle(path, params))
+
+    def _drop(self):
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+    def _respond(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if not self.server.standin.keep_alive:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class _TCPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    standin = None
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    standin = None
+    daemon_threads = True
+    request_queue_size = 128
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # http.server expects the address of a TCP client
+        return request, ('localhost', 0)
+
+
+def main(args=None):
+    """Runs a StandInServer until interrupted, e.g. python -m plugnpy.standin --port 8181 --latency 0.01"""
+    parser = argparse.ArgumentParser(description="In-memory stand-in for the cache manager and state manager")
+    parser.add_argument('--host', default='127.0.0.1', help="Host to listen on, or the path of a Unix socket")
+    parser.add_argument('--port', type=int, default=8181, help="Port to listen on")
+    parser.add_argument('--latency', type=float, default=0, help="Seconds added to each request")
+    parser.add_argument('--jitter', type=float, default=0, help="Maximum random seconds added to the latency")
+    parser.add_argument('--error-rate', type=float, default=0, help="Probability of a 500 response")
+    parser.add_argument('--drop-rate', type=float, default=0, help="Probability of closing the connection")
+    parser.add_argument('--lock-timeout', type=float, default=60, help="Seconds a lock is held")
+    parser.add_argument('--no-batch', action='store_true', help="Answer get_many and set_many with a 404")
+    parser.add_argument('--no-keep-alive', action='store_true', help="Close the connection after each response")
+    parser.add_argument('--idle-timeout', type=float, help="Seconds an idle connection is kept alive")
+    options = parser.parse_args(args)
+    server = StandInServer(
+        options.host, options.port, options.latency, options.jitter, options.error_rate, options.drop_rate,
+        options.lock_timeout, not options.no_batch, not options.no_keep_alive, options.idle_timeout,
+    )
+    print(f"Serving on {options.host}:{options.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
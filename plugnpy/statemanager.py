@@ -5,14 +5,15 @@ Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
 
 import os
 import json
-import time
 
 from socket import error as SocketError
 from typing import Optional
 
-from geventhttpclient import HTTPClient
-
-from .exception import StateManagerStoreError
+from .circuitbreaker import circuit_guard
+from .deadline import deadline_scope, deadline_timeout
+from .exception import CircuitOpenError, DeadlineExceeded, StateManagerStoreError
+from .protocol import StateManagerProtocol
+from .transport import get_transport
 
 ESCAPE_CHARACTER = '\\'
 DELIMITER = '#'
@@ -22,6 +23,12 @@ class StateManagerUtils:
     """Utility functions for State Manager"""
 
     client = None
+    # transport of the state manager client, see get_transport()
+    transport = None
+    # RetryPolicy of the calls to the state manager which fail to connect, None to not retry them
+    retry = None
+    # CircuitBreaker of the state manager, None to always call it
+    circuit_breaker = None
     host = os.environ.get('OPSVIEW_STATE_MANAGER_HOST')
     port = os.environ.get('OPSVIEW_STATE_MANAGER_PORT')
     namespace = os.environ.get('OPSVIEW_STATE_MANAGER_NAMESPACE')
@@ -34,50 +41,58 @@ class StateManagerUtils:
                 StateManagerUtils.host,
                 StateManagerUtils.port,
                 StateManagerUtils.namespace,
+                transport=StateManagerUtils.transport,
+                retry=StateManagerUtils.retry,
+                circuit_breaker=StateManagerUtils.circuit_breaker,
             )
 
     @staticmethod
-    def store_data(key: str, data: str, ttl: int, timestamp: Optional[float] = None):
+    def store_data(key: str, data: str, ttl: int, timestamp: Optional[float] = None, deadline=None):
         """ Store or update the data in the persistent storage indexed by key.
 
         :param key: The key to store the data under.
         :param data: The data to store.
         :param ttl: The number of seconds for which the data is valid.
         :param timestamp: The time of the data.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
 
         Raises a StateManagerStoreError if the data was not saved to the persistent store.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
         Raises TypeError if either data or key is not a string object
         """
         if not isinstance(data, str):
             raise TypeError(f"Data must be a str type, not {type(data)}")
 
         StateManagerUtils._initialise_client()
-        StateManagerUtils.client.store_data(key, data, ttl, timestamp)
+        with deadline_scope(deadline):
+            StateManagerUtils.client.store_data(key, data, ttl, timestamp)
 
     @staticmethod
-    def fetch_data(key: str):
+    def fetch_data(key: str, deadline=None):
         """ Fetch the data from the persistent storage, indexed by key.
 
         :param key: The key under which the data is stored.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
         :returns: The data, or None if not found.
 
         Raises a StateManagerStoreError if an error occccurred when attempting to fetch the data.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
         """
         StateManagerUtils._initialise_client()
-        return StateManagerUtils.client.fetch_data(key)
+        with deadline_scope(deadline):
+            return StateManagerUtils.client.fetch_data(key)
 
 
-class StateManagerClient:
+class StateManagerClient(StateManagerProtocol):
     """A simple client to contact the State Manager and set or get persistent data"""
 
     # pylint: disable=duplicate-code
-    HTTP_STATUS_OK_MIN = 200
-    HTTP_STATUS_OK_MAX = 299
-
     # pylint: disable=too-many-arguments, too-many-positional-arguments
     def __init__(
             self, host, port, namespace,
-            concurrency=1, connection_timeout=30, network_timeout=30
+            concurrency=1, connection_timeout=30, network_timeout=30, transport=None, retry=None, circuit_breaker=None,
     ):
         """Constructor for State Manager Client
 
@@ -87,80 +102,67 @@ class StateManagerClient:
         :param concurrency: Number of concurrent http connections allowed (default is 1).
         :param connection_timeout: Number of seconds before HTTP connection times out.
         :param network_timeout: Number of seconds before the data read times out.
+        :param transport: The kind of transport, 'gevent', 'http' or 'unix', see get_transport() (default is 'unix'
+            if host is the absolute path of a Unix domain socket, 'gevent' otherwise).
+        :param retry: The RetryPolicy of the requests which fail to connect (default is None, no retries).
+        :param circuit_breaker: The CircuitBreaker of the state manager (default is None, no circuit breaker).
         """
-        self._namespace = namespace
-        self._headers = {'Referer': host, 'Content-Type': 'application/json'}
-        self._http_client = HTTPClient(
+        super().__init__(host, namespace, retry, circuit_breaker)
+        self._http_client = get_transport(
             host,
             port,
+            transport,
             concurrency=concurrency,
             connection_timeout=connection_timeout,
             network_timeout=network_timeout,
         )
 
-    def store_data(self, key: str, data: str, ttl: int, timestamp: Optional[float] = None):
+    def store_data(self, key: str, data: str, ttl: int, timestamp: Optional[float] = None, deadline=None):
         """ Store or update the data in the persistent storage indexed by key.
 
         :param key: The key to store the data under.
         :param data: The data to store.
         :param ttl: The number of seconds for which the data is valid.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
 
         Raises a StateManagerStoreError if the data was not saved to the persistent storage.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
         Raises TypeError if either data or key is not a string object
         """
-        if not isinstance(data, str):
-            raise TypeError(f"Data must be a str type, not {type(data)}")
-
-        params = {
-            'namespace': self._namespace,
-            'key': key,
-            'data': data,
-            'ttl': ttl,
-            'timestamp': timestamp or time.time(),
-        }
-        try:
-            response = self._send_persistent(self._http_client.post, 'store_data', params)
-        except StateManagerStoreError:
-            raise
-        except Exception as ex:
-            raise StateManagerStoreError(str(ex)) from ex
-
-        if (response.status_code < self.HTTP_STATUS_OK_MIN) or (response.status_code > self.HTTP_STATUS_OK_MAX):
-            raw_body = response.read()
-            raise StateManagerStoreError(f"{response.status_code}: {response.status_message} - {raw_body}")
+        params = self._store_params(key, data, ttl, timestamp)
+        with deadline_scope(deadline), deadline_timeout(
+                "store data in the state manager", self._http_client.cooperative):
+            try:
+                response = self._send_persistent(self._http_client.post, 'store_data', params)
+            except (StateManagerStoreError, DeadlineExceeded, CircuitOpenError):
+                raise
+            except Exception as ex:
+                raise StateManagerStoreError(str(ex)) from ex
+            self._check_stored(response)
     # pylint: enable=duplicate-code
 
-    def fetch_data(self, key: str) -> Optional[str]:
+    def fetch_data(self, key: str, deadline=None) -> Optional[str]:
         """ Fetch the data from the persistent storage, indexed by key.
 
         :param key: The key under which the data is stored.
+        :param deadline: A Deadline or number of seconds the call must complete within (default: check deadline).
         :returns: The data, or None if not found.
 
         Raises a StateManagerStoreError if an error occurred when attempting to fetch the data.
+        Raises a DeadlineExceeded if the call cannot complete before the deadline.
+        Raises a CircuitOpenError if the circuit breaker of the state manager is open.
         """
-        params = {
-            'namespace': self._namespace,
-            'key': key,
-        }
-        try:
-            response = self._send_persistent(self._http_client.post, 'fetch_data', params)
-        except StateManagerStoreError:
-            raise
-        except Exception as ex:
-            raise StateManagerStoreError(str(ex)) from ex
-
-        if response.status_code == 404:
-            # data not found
-            return None
-
-        raw_body = response.read()
-        if (response.status_code < self.HTTP_STATUS_OK_MIN) or (response.status_code > self.HTTP_STATUS_OK_MAX):
-            raise StateManagerStoreError(f"{response.status_code}: {response.status_message} - {raw_body}")
-
-        try:
-            return json.loads(raw_body.decode('utf-8'))['data']
-        except Exception as ex:
-            raise StateManagerStoreError(f"Unable to process response ({ex}) - {raw_body}") from ex
+        params = self._fetch_params(key)
+        with deadline_scope(deadline), deadline_timeout(
+                "fetch data from the state manager", self._http_client.cooperative):
+            try:
+                response = self._send_persistent(self._http_client.post, 'fetch_data', params)
+            except (StateManagerStoreError, DeadlineExceeded, CircuitOpenError):
+                raise
+            except Exception as ex:
+                raise StateManagerStoreError(str(ex)) from ex
+            return self._fetched_data(response)
 
     def close(self):
         """Close a client connection"""
@@ -172,7 +174,12 @@ class StateManagerClient:
         """ Send a request to the State Manager (persistent store) """
         body = json.dumps(data)
         try:
-            response = method(path, body=body, headers=self._headers)
+            with circuit_guard(self._circuit_breaker, "state manager"):
+                if self._retry is None:
+                    response = method(path, body=body, headers=self._headers)
+                else:
+                    # storing data with its timestamp and fetching data are idempotent
+                    response = self._retry.call(method, path, body=body, headers=self._headers)
         except SocketError as ex:
             raise StateManagerStoreError(f"Failed to connect to state manager: {ex}") from None
         return response
@@ -0,0 +1,277 @@
+"""
+Transport classes, the HTTP connections shared by the cache manager and state manager clients.
+Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
+"""
+
+import http.client
+import socket
+import threading
+
+from .deadline import remaining_time
+
+_TRANSPORTS = {}
+_TRANSPORTS_LOCK = threading.Lock()
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+def get_transport(host, port, transport=None, concurrency=1, connection_timeout=30, network_timeout=30):
+    """Returns a transport to the given host and port.
+
+    The transports are shared by the clients using the same kind of transport, host, port and concurrency,
+    and keep their connections alive between requests.
+    Each call must be matched by a call to close() of the returned transport, once it is no longer used.
+
+    :param host: Host IP or name of the server, or the path of its Unix domain socket.
+    :param port: Port of the server, ignored for a Unix domain socket.
+    :param transport: 'gevent' to use geventhttpclient, 'http' to use http.client from the standard library,
+        or 'unix' to use http.client over a Unix domain socket
+        (default: 'unix' if host is an absolute path, 'gevent' otherwise).
+    :param concurrency: Number of concurrent connections allowed.
+    :param connection_timeout: Number of seconds before the connection times out.
+    :param network_timeout: Number of seconds before the data read times out.
+    """
+    if transport is None:
+        transport = 'unix' if str(host).startswith('/') else 'gevent'
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {transport}")
+    key = (transport, host, port, concurrency)
+    with _TRANSPORTS_LOCK:
+        instance = _TRANSPORTS.get(key)
+        if instance is None:
+            instance = TRANSPORTS[transport](host, port, concurrency, connection_timeout, network_timeout)
+            instance.key = key
+            _TRANSPORTS[key] = instance
+        instance.users += 1
+    return instance
+
+
+class BaseTransport:  # pylint: disable=too-few-public-methods
+    """The server and the limits of the connections of a transport, shared by the transports and AsyncTransport"""
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, host, port, concurrency, connection_timeout, network_timeout):
+        self.host = host
+        self.port = port
+        self.concurrency = concurrency
+        self.connection_timeout = connection_timeout
+        self.network_timeout = network_timeout
+
+
+class Transport(BaseTransport):
+    """Base class of the transports, sending HTTP requests to a server.
+
+    Keyword Arguments:
+        - host -- Host IP or name of the server, or the path of its Unix domain socket
+        - port -- Port of the server
+        - concurrency -- Number of concurrent connections allowed
+        - connection_timeout -- Number of seconds before the connection times out
+        - network_timeout -- Number of seconds before the data read times out
+    """
+
+    # True if the requests are gevent based, so they can be interrupted by a gevent Timeout
+    cooperative = False
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, host, port, concurrency=1, connection_timeout=30, network_timeout=30):
+        super().__init__(host, port, concurrency, connection_timeout, network_timeout)
+        self.key = None
+        self.users = 0
+
+    def get(self, path, headers=None):
+        """Sends a GET request, returns the response"""
+        return self.request('GET', path, headers=headers)
+
+    def post(self, path, body=None, headers=None):
+        """Sends a POST request, returns the response"""
+        return self.request('POST', path, body=body, headers=headers)
+
+    def request(self, method, path, body=None, headers=None):
+        """Sends a request, returns the response, with the status_code and status_message attributes
+        and the read() method returning the body
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Releases the transport, its connections are closed once no client uses it"""
+        with _TRANSPORTS_LOCK:
+            self.users -= 1
+            if self.users > 0:
+                return
+            if _TRANSPORTS.get(self.key) is self:
+                del _TRANSPORTS[self.key]
+        self._close()
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class GeventTransport(Transport):
+    """Transport using geventhttpclient, the requests are interrupted by a gevent Timeout at the deadline.
+
+    The gevent connections can only be used by the thread which created them, as each thread runs its own
+    gevent hub, so each thread using the transport has its own geventhttpclient client.
+    """
+
+    cooperative = True
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, host, port, concurrency=1, connection_timeout=30, network_timeout=30):
+        super().__init__(host, port, concurrency, connection_timeout, network_timeout)
+        # only imported when used, as importing gevent is slow
+        from geventhttpclient import HTTPClient  # pylint: disable=import-outside-toplevel
+        self._client_class = HTTPClient
+        self._local = threading.local()
+        self._clients = []
+        self._lock = threading.Lock()
+
+    def request(self, method, path, body=None, headers=None):
+        return self._http_client().request(method, path, body=body, headers=headers)
+
+    def _http_client(self):
+        """Returns the geventhttpclient client of the current thread"""
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._client_class(
+                self.host,
+                self.port,
+                concurrency=self.concurrency,
+                connection_timeout=self.connection_timeout,
+                network_timeout=self.network_timeout,
+            )
+            self._local.client = client
+            with self._lock:
+                self._clients.append(client)
+        return client
+
+    def _close(self):
+        with self._lock:
+            clients, self._clients = self._clients, []
+        self._local = threading.local()
+        for client in clients:
+            client.close()
+
+
+class TransportResponse:  # pylint: disable=too-few-public-methods
+    """Response of a request sent by a StdlibTransport.
+
+    Keyword Arguments:
+        - status_code -- The HTTP status code
+        - status_message -- The HTTP status message
+        - body -- The body of the response
+    """
+
+    def __init__(self, status_code, status_message, body):
+        self.status_code = status_code
+        self.status_message = status_message
+        self._body = body
+
+    def read(self):
+        """Returns the body of the response"""
+        return self._body
+
+
+class StdlibTransport(Transport):
+    """Transport using http.client from the standard library, which does not require gevent.
+
+    The connection and read timeouts are capped to the time left until the deadline.
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, host, port, concurrency=1, connection_timeout=30, network_timeout=30):
+        super().__init__(host, port, concurrency, connection_timeout, network_timeout)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    def request(self, method, path, body=None, headers=None):
+        if not path.startswith('/'):
+            path = '/' + path
+        if isinstance(body, str):
+            # http.client would encode it as latin-1
+            body = body.encode('utf-8')
+        # pylint: disable=consider-using-with
+        if not self._slots.acquire(timeout=self._timeout(self.connection_timeout)):
+            raise socket.timeout("No connection available")
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is not None:
+                try:
+                    return self._request(connection, method, path, body, headers)
+                except ConnectionError:
+                    # the server closed the idle connection, retry on a new one
+                    pass
+            return self._request(self._connect(), method, path, body, headers)
+        finally:
+            self._slots.release()
+
+    def _request(self, connection, method, path, body, headers):  # pylint: disable=too-many-arguments
+        try:
+            if connection.sock is None:
+                connection.timeout = self._timeout(self.connection_timeout)
+                connection.connect()
+            connection.sock.settimeout(self._timeout(self.network_timeout))
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            data = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            with self._lock:
+                self._idle.append(connection)
+        return TransportResponse(response.status, response.reason, data)
+
+    def _connect(self):
+        return http.client.HTTPConnection(self.host, self.port)
+
+    @staticmethod
+    def _timeout(timeout):
+        budget = remaining_time()
+        return timeout if budget is None else max(min(timeout, budget), 0.001)
+
+    def _close(self):
+        with self._lock:
+            connections, self._idle = self._idle, []
+        for connection in connections:
+            connection.close()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection to a server listening on a Unix domain socket.
+
+    Keyword Arguments:
+        - socket_path -- The path of the Unix domain socket
+    """
+
+    def __init__(self, socket_path, **kwargs):
+        super().__init__('localhost', **kwargs)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        except BaseException:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class UnixSocketTransport(StdlibTransport):
+    """Transport using http.client over a Unix domain socket, for servers running on the same host.
+    The host is the path of the socket, the port is ignored.
+    """
+
+    def _connect(self):
+        return UnixHTTPConnection(self.host)
+
+
+TRANSPORTS = {
+    'gevent': GeventTransport,
+    'http': StdlibTransport,
+    'unix': UnixSocketTransport,
+}
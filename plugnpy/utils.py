@@ -3,7 +3,9 @@ Helpful utility functions.
 Copyright (C) 2003-2025 ITRS Group Limited. All rights reserved
 """
 
+import contextlib
 import hashlib
+import os
 
 SECONDS_IN_MINUTE = 60
 SECONDS_IN_HOUR = 3600
@@ -15,6 +17,20 @@ def hash_string(string):
     return hashlib.sha256(string.encode('utf-8')).hexdigest()
 
 
+@contextlib.contextmanager
+def locked_file(path):
+    """Context manager opening the file for update, created if it does not exist,
+    while holding an exclusive flock() on it, so it can be updated by many processes."""
+    import fcntl  # pylint: disable=import-outside-toplevel
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd, 'r+', encoding='utf-8') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield file
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
 def convert_seconds(count_seconds):
     """Convert a number in seconds into a human readable format"""
     days = count_seconds // SECONDS_IN_DAY
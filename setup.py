@@ -70,6 +70,14 @@ setup(
             'pylint',
             'pyflakes',
             'wheel',
+            'numpy',
+            'orjson',
+        ],
+        'numpy': [
+            'numpy',
+        ],
+        'orjson': [
+            'orjson',
         ],
         'examples': [
             'psutil',
@@ -0,0 +1,270 @@
+"""
+Unit tests for PlugNPy asynccachemanager.py and asynctransport.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from plugnpy.asynccachemanager import AsyncCacheManagerClient, AsyncCacheManagerUtils
+from plugnpy.asyncstatemanager import AsyncStateManagerClient
+from plugnpy.asynctransport import AsyncTransport
+from plugnpy.cachemanager import CacheManagerUtils
+from plugnpy.deadline import deadline_scope
+from plugnpy.exception import DeadlineExceeded, ResultError
+from plugnpy.standin import StandInServer
+from plugnpy.utils import hash_string
+
+NAMESPACE = 'some-namespace'
+STATUS = {'entries': 0, 'locks': 0, 'state_entries': 0}
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as standin:
+        yield standin
+
+
+@pytest.fixture
+def unix_server(tmp_path):
+    with StandInServer(str(tmp_path / 'server.sock')) as standin:
+        yield standin
+
+
+@pytest.fixture
+def acmutils(mocker, server):
+    host, port = server.address
+    mocker.patch.object(AsyncCacheManagerUtils, 'host', host)
+    mocker.patch.object(AsyncCacheManagerUtils, 'port', port)
+    mocker.patch.object(AsyncCacheManagerUtils, 'namespace', NAMESPACE)
+    mocker.patch.object(AsyncCacheManagerUtils, 'client', None)
+    mocker.patch.object(CacheManagerUtils, 'local_cache', None)
+    yield AsyncCacheManagerUtils
+
+
+def _client(server, **kwargs):
+    host, port = server.address
+    return AsyncCacheManagerClient(host, port, NAMESPACE, **kwargs)
+
+
+def _stored(server, key):
+    """Returns the data stored by the cache manager utils under the key"""
+    response = server.handle('get_data', {'namespace': NAMESPACE, 'key': hash_string(key), 'max_wait_time': 0})[1]
+    return json.loads(response['data'])
+
+
+def test_async_transport_keep_alive(server):
+    async def run():
+        client = AsyncTransport(*server.address)
+        responses = [await client.get('status') for _ in range(3)]
+        await client.close()
+        return responses
+
+    responses = asyncio.run(run())
+    assert [json.loads(response.read()) for response in responses] == [STATUS] * 3
+    assert server.stats()['connections'] == 1
+
+
+def test_async_transport_chunked():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n')
+        for chunk in (b'{"chunked": ', b'true}'):
+            reader.feed_data(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        reader.feed_data(b'0\r\n\r\n')
+        return await AsyncTransport('127.0.0.1', 80)._read_response(reader)
+
+    status_code, _, _, data = asyncio.run(run())
+    assert (status_code, json.loads(data)) == (200, {'chunked': True})
+
+
+def test_async_transport_reconnects(server):
+    async def run():
+        client = AsyncTransport(*server.address)
+        server.keep_alive = False
+        assert (await client.get('status')).status_code == 200
+        assert not client._idle
+        server.keep_alive = True
+        server.idle_timeout = 0.05
+        assert (await client.get('status')).status_code == 200
+        assert len(client._idle) == 1
+        # the idle connection closed by the server is replaced
+        await asyncio.sleep(0.2)
+        assert (await client.get('status')).status_code == 200
+        assert (await client.get('status')).status_code == 200
+        await client.close()
+
+    asyncio.run(run())
+    assert server.stats()['connections'] == 3
+
+
+def test_async_transport_concurrency(server):
+    async def run():
+        client = AsyncTransport(*server.address, concurrency=4)
+        responses = await asyncio.gather(*(client.get('status') for _ in range(20)))
+        await client.close()
+        return responses
+
+    responses = asyncio.run(run())
+    assert [json.loads(response.read()) for response in responses] == [STATUS] * 20
+    assert server.stats()['requests'] == {'status': 20}
+    assert server.stats()['connections'] <= 4
+
+
+def test_async_client_lock(server):
+    async def run():
+        first, second = _client(server), _client(server)
+        assert await first.get_data('key', 5) == {'data': None, 'lock': True}
+        # the second caller waits for the lock holder to store the data
+        waiting = asyncio.ensure_future(second.get_data('key', 5))
+        await asyncio.sleep(0.1)
+        assert not waiting.done()
+        assert await first.set_data('key', 'data', 10) == {'success': True}
+        assert await waiting == {'data': 'data', 'lock': None, 'ttl': pytest.approx(10, abs=1)}
+        assert await first.status() == dict(STATUS, entries=1)
+        await first.close()
+        await second.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('batch', [True, False])
+def test_async_client_many(batch, server):
+    async def run():
+        client = _client(server)
+        assert await client.get_many(['a', 'b', 'a'], 5) == {
+            'a': {'data': None, 'lock': True},
+            'b': {'data': None, 'lock': True},
+        }
+        await client.set_many({'a': 'data a', 'b': 'data b'}, 10)
+        responses = await client.get_many(['a', 'b'], 5)
+        await client.close()
+        return responses
+
+    server.batch = batch
+    ttl = pytest.approx(10, abs=1)
+    assert asyncio.run(run()) == {
+        'a': {'data': 'data a', 'lock': None, 'ttl': ttl},
+        'b': {'data': 'data b', 'lock': None, 'ttl': ttl},
+    }
+    # the batch requests are no longer tried once the cache manager does not support them
+    expected = {'get_many': 2, 'set_many': 1} if batch else {'get_many': 1, 'get_data': 4, 'set_data': 2}
+    assert server.stats()['requests'] == expected
+
+
+def test_async_client_errors(server):
+    async def run():
+        client = _client(server)
+        server.latency = 0.5
+        with deadline_scope(0.1):
+            with pytest.raises(DeadlineExceeded) as ex:
+                await client.status()
+        assert 'Deadline exceeded while trying to call status' in str(ex.value)
+        server.latency = 0
+        with pytest.raises(DeadlineExceeded) as ex:
+            await client.status(deadline=-1)
+        assert 'No time left to call status' in str(ex.value)
+        with pytest.raises(ResultError) as ex:
+            await client._send('POST', 'get_data', {'key': 'value'})
+        assert '400: Bad Request' in str(ex.value)
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_async_clients_share_transport(unix_server):
+    async def run():
+        transport = AsyncTransport(unix_server.address[0], None)
+        cmclient = AsyncCacheManagerClient(None, None, 'cache', transport=transport)
+        smclient = AsyncStateManagerClient(None, None, 'state', transport=transport)
+        assert await cmclient.set_data('key', 'data') == {'success': True}
+        await smclient.store_data('key', 'state', 10)
+        assert await smclient.fetch_data('key') == 'state'
+        await cmclient.close()
+        await smclient.close()
+        # the transport is not closed by the clients it was given to
+        assert len(transport._idle) == 1
+        await transport.close()
+
+    asyncio.run(run())
+    assert unix_server.stats()['connections'] == 1
+
+
+def test_async_utils_get_via_cachemanager(acmutils, server):
+    calls = []
+
+    async def func(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return {'value': value}
+
+    async def run():
+        results = await asyncio.gather(*(acmutils.get_via_cachemanager(False, 'key', 10, func, 'a') for _ in range(5)))
+        await acmutils.client.close()
+        return results
+
+    assert asyncio.run(run()) == [{'value': 'a'}] * 5
+    # the data is computed once by the lock holder, the other callers wait for it
+    assert calls == ['a']
+    assert _stored(server, 'key') == {'value': 'a'}
+
+
+@pytest.mark.parametrize('no_cachemanager, host, raises, expected', [
+    pytest.param(True, None, None, 'sync a', id="not_required"),
+    pytest.param(False, None, ResultError, None, id="host_required"),
+    pytest.param(False, '127.0.0.1', None, 'sync a', id="sync_function"),
+])
+def test_async_utils_required(no_cachemanager, host, raises, expected, mocker, acmutils, server):
+    if host is None:
+        mocker.patch.object(AsyncCacheManagerUtils, 'host', None)
+
+    def func(value):
+        return f'sync {value}'
+
+    async def run():
+        return await acmutils.get_via_cachemanager(no_cachemanager, 'key', 10, func, 'a')
+
+    if raises:
+        with pytest.raises(raises):
+            asyncio.run(run())
+    else:
+        assert asyncio.run(run()) == expected
+
+
+def test_async_utils_error(acmutils, server):
+    async def func():
+        raise ValueError('boom')
+
+    async def run():
+        first = await acmutils.get_via_cachemanager(False, 'key', 10, func)
+        await acmutils.set_data('other', {'some': 'data'}, 10)
+        await acmutils.client.close()
+        return first
+
+    assert asyncio.run(run()) == {'error': 'boom'}
+    assert _stored(server, 'other') == {'some': 'data'}
+
+
+def test_async_utils_store_failure(mocker, acmutils, server):
+    mocker.patch.object(AsyncCacheManagerClient, 'set_data', mocker.AsyncMock(side_effect=ResultError("Failed")))
+
+    async def run():
+        data = await acmutils.get_via_cachemanager(False, 'key', 10, lambda: 'data')
+        await acmutils.client.close()
+        return data
+
+    # the data retrieved is returned when it cannot be stored
+    assert asyncio.run(run()) == 'data'
+
+
+def test_async_utils_connection_error(acmutils, server):
+    server.stop()
+
+    async def run():
+        await acmutils.get_via_cachemanager(False, 'key', 10, lambda: 'data')
+
+    with pytest.raises(ResultError) as ex:
+        asyncio.run(run())
+    assert 'Failed to connect to cache manager' in str(ex.value)
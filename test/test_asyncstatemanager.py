@@ -0,0 +1,153 @@
+"""
+Unit tests for PlugNPy asyncstatemanager.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import asyncio
+import json
+import pytest
+
+from socket import error as SocketError
+from plugnpy.asyncstatemanager import AsyncStateManagerUtils, AsyncStateManagerClient
+from plugnpy.deadline import remaining_time
+from plugnpy.exception import DeadlineExceeded, StateManagerStoreError
+
+
+HOST = 'a.host'
+PORT = 1234
+NAMESPACE = 'some-namespace'
+KEY = 'key'
+TTL = 99
+NOW = 123456789
+DATA = 'foodata' * 100
+BODY = json.dumps({'other': 'foo', 'data': DATA}).encode('utf-8')
+
+
+@pytest.fixture
+def asmutils(mocker):
+    mocker.patch.object(AsyncStateManagerUtils, 'host', HOST)
+    mocker.patch.object(AsyncStateManagerUtils, 'port', PORT)
+    mocker.patch.object(AsyncStateManagerUtils, 'namespace', NAMESPACE)
+    mocker.patch.object(AsyncStateManagerUtils, 'client', None)
+    yield AsyncStateManagerUtils
+
+
+@pytest.fixture
+def asmclient(mocker):
+    transport = mocker.AsyncMock()
+    client = AsyncStateManagerClient(HOST, PORT, NAMESPACE, transport=transport)
+    yield client
+
+
+def _response(mocker, status_code, status_message, body):
+    response = mocker.Mock(status_code=status_code, status_message=status_message)
+    response.read.return_value = body
+    return response
+
+
+@pytest.mark.parametrize('data, valid', [
+    pytest.param(DATA, True, id="str"),
+    pytest.param(b'bytes', False, id="bytes"),
+    pytest.param(123, False, id="int"),
+])
+def test_utils_store_data(data, valid, mocker, asmutils):
+    asmutils._initialise_client()
+    mocker.patch.object(asmutils.client, 'store_data')
+    if valid:
+        asyncio.run(asmutils.store_data(KEY, data, TTL))
+        assert asmutils.client.store_data.call_args == mocker.call(KEY, DATA, TTL, None)
+    else:
+        with pytest.raises(TypeError):
+            asyncio.run(asmutils.store_data(KEY, data, TTL))
+
+
+def test_utils_fetch_data(mocker, asmutils):
+    asmutils._initialise_client()
+
+    async def fetch_data(key):
+        return key, remaining_time()
+
+    mocker.patch.object(asmutils.client, 'fetch_data', side_effect=fetch_data)
+    key, budget = asyncio.run(asmutils.fetch_data(KEY, deadline=5))
+    assert key == KEY
+    assert 0 < budget <= 5
+
+
+@pytest.mark.parametrize('data, timestamp, send, status, exception, expected', [
+    pytest.param(DATA, None, None, (200, 'OK', 'ok'), None, None, id="success"),
+    pytest.param(DATA, NOW - 42, None, (200, 'OK', 'ok'), None, None, id="success_with_timestamp"),
+    pytest.param(99, None, None, None, TypeError, 'Data must be a str', id="data_is_int"),
+    pytest.param(DATA, None, SocketError('down'), None, StateManagerStoreError, 'Failed to connect', id="socket_error"),
+    pytest.param(DATA, None, Exception('bar'), None, StateManagerStoreError, 'bar', id="other_error"),
+    pytest.param(
+        DATA, None, None, (500, 'Server Error', 'fail'),
+        StateManagerStoreError, '500: Server Error - fail',
+        id="server_error"),
+])
+def test_async_state_manager_client_store_data(data, timestamp, send, status, exception, expected, mocker, asmclient):
+    mocker.patch('plugnpy.protocol.time.time', return_value=NOW)
+    post = asmclient._http_client.post
+    post.return_value = _response(mocker, *status) if status else None
+    post.side_effect = send
+    if not exception:
+        asyncio.run(asmclient.store_data(KEY, data, TTL, timestamp))
+        assert post.call_args == mocker.call('store_data', body=json.dumps({
+            'namespace': NAMESPACE,
+            'key': KEY,
+            'data': DATA,
+            'ttl': TTL,
+            'timestamp': timestamp or NOW,
+        }), headers=asmclient._headers)
+    else:
+        with pytest.raises(exception) as ex:
+            asyncio.run(asmclient.store_data(KEY, data, TTL, timestamp))
+        assert expected in str(ex)
+
+
+@pytest.mark.parametrize('send, status, exception, expected', [
+    pytest.param(None, (200, 'OK', BODY), None, DATA, id="success"),
+    pytest.param(None, (404, 'Not Found', None), None, None, id="not_found"),
+    pytest.param(Exception('bar'), None, StateManagerStoreError, 'bar', id="other_error"),
+    pytest.param(
+        None, (500, 'Server Error', 'fail'),
+        StateManagerStoreError, '500: Server Error - fail',
+        id="server_error"),
+    pytest.param(None, (200, 'OK', b'fubar'), StateManagerStoreError, 'Unable to process response', id="bad_data"),
+])
+def test_async_state_manager_client_fetch_data(send, status, exception, expected, mocker, asmclient):
+    post = asmclient._http_client.post
+    post.return_value = _response(mocker, *status) if status else None
+    post.side_effect = send
+    if not exception:
+        assert asyncio.run(asmclient.fetch_data(KEY)) == expected
+        assert post.call_args == mocker.call(
+            'fetch_data', body=json.dumps({'namespace': NAMESPACE, 'key': KEY}), headers=asmclient._headers)
+    else:
+        with pytest.raises(exception) as ex:
+            asyncio.run(asmclient.fetch_data(KEY))
+        assert expected in str(ex)
+
+
+@pytest.mark.parametrize('method, args', [
+    pytest.param('store_data', (KEY, DATA, TTL), id="store_data"),
+    pytest.param('fetch_data', (KEY,), id="fetch_data"),
+])
+def test_async_state_manager_client_deadline_exceeded(method, args, asmclient):
+    async def post(*args, **kwargs):
+        await asyncio.sleep(1)
+
+    asmclient._http_client.post.side_effect = post
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(getattr(asmclient, method)(*args, deadline=0.05))
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(getattr(asmclient, method)(*args, deadline=-1))
+
+
+@pytest.mark.parametrize('owned', [True, False])
+def test_async_state_manager_client_close(owned, mocker, asmclient):
+    transport = asmclient._http_client
+    asmclient._owns_transport = owned
+    asyncio.run(asmclient.close())
+    asyncio.run(asmclient.close())
+    assert asmclient._http_client is None
+    assert transport.close.await_count == (1 if owned else 0)
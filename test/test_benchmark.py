@@ -0,0 +1,83 @@
+"""
+Benchmarks for PlugNPy
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import sys
+import tracemalloc
+
+import pytest
+
+from plugnpy.check import Check
+from plugnpy.metric import Metric, Threshold
+
+THRESHOLDS = ('10M:', '@1KB:2KB', '~:95')
+VALUES = [i * 1024 for i in range(1000)]
+
+
+def _evaluate_uncached(value, warning_threshold, critical_threshold):
+    """Evaluates the thresholds parsing them for each value, as Metric.evaluate did before Threshold"""
+    status = Metric.STATUS_OK
+    if Metric._check_range(value, *Metric._parse_threshold(warning_threshold, False)):
+        status = Metric.STATUS_WARNING
+    if Metric._check_range(value, *Metric._parse_threshold(critical_threshold, False)):
+        status = Metric.STATUS_CRITICAL
+    return status
+
+
+def _evaluate_all(evaluate):
+    return [evaluate(value, THRESHOLDS[i % 2], THRESHOLDS[2]) for i, value in enumerate(VALUES)]
+
+
+@pytest.mark.benchmark(group='evaluate')
+def test_benchmark_evaluate_uncached(benchmark):
+    assert benchmark(_evaluate_all, _evaluate_uncached) == _evaluate_all(Metric.evaluate)
+
+
+@pytest.mark.benchmark(group='evaluate')
+def test_benchmark_evaluate_cached(benchmark):
+    Threshold.cache_clear()
+    benchmark(_evaluate_all, Metric.evaluate)
+
+
+@pytest.mark.benchmark(group='evaluate')
+def test_benchmark_evaluate_many(benchmark):
+    benchmark(Metric.evaluate_many, VALUES, THRESHOLDS[0], THRESHOLDS[2])
+
+
+def _create_metrics(count):
+    return [Metric(f'metric_{i}', i, 'B', '10M:', '~:95', display_in_perf=False) for i in range(count)]
+
+
+@pytest.mark.benchmark(group='metric')
+def test_benchmark_metric_create(benchmark):
+    benchmark(_create_metrics, 1000)
+
+
+class _DictMetric:  # pylint: disable=too-few-public-methods
+    """A Metric with the same attributes in a __dict__, as before __slots__"""
+
+    def __init__(self, metric):
+        for name in Metric.__slots__:
+            setattr(self, name, getattr(metric, name))
+
+
+def _traced_bytes_per_metric(count):
+    names = [f'metric_{i}' for i in range(count)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        metrics = [Metric(name, i, 'B', '10M:', '~:95') for i, name in enumerate(names)]
+        return (tracemalloc.get_traced_memory()[0] - before) / count, metrics
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark(group='metric')
+def test_benchmark_metric_memory(benchmark):
+    bytes_per_metric, metrics = benchmark.pedantic(_traced_bytes_per_metric, args=(10000,), rounds=1, iterations=1)
+    benchmark.extra_info['bytes_per_metric'] = bytes_per_metric
+    metric = metrics[0]
+    with_dict = _DictMetric(metric)
+    assert not hasattr(metric, '__dict__')
+    assert sys.getsizeof(metric) < sys.getsizeof(with_dict) + sys.getsizeof(vars(with_dict))
@@ -4,12 +4,25 @@ Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
 """
 
 import functools
+import threading
+import time
 import json
 import pytest
 
+from concurrent.futures import ThreadPoolExecutor
 from socket import error as SocketError
-from plugnpy.cachemanager import CacheManagerUtils, CacheManagerClient
-from plugnpy.exception import ResultError
+from plugnpy.cachemanager import CacheManagerUtils, CacheManagerClient, CachedError, SoftTTL
+from plugnpy.cachestats import CacheStats
+from plugnpy.circuitbreaker import CircuitBreaker
+from plugnpy.deadline import remaining_time
+from plugnpy.exception import CircuitOpenError, DeadlineExceeded, ResultError
+from plugnpy.filecache import LocalFileCache
+from plugnpy.localcache import LocalCache
+from plugnpy.payload import PayloadCodec
+from plugnpy.retry import RetryPolicy
+from plugnpy.singleflight import SingleFlight
+from plugnpy.standin import StandInServer
+from plugnpy.utils import hash_string
 from .test_base import raise_or_assert
 
 
@@ -34,9 +47,15 @@ def cmutils(mocker):
     yield utils
 
 
+@pytest.fixture
+def local_cmutils(mocker, cmutils):
+    mocker.patch.object(CacheManagerUtils, 'local_cache', LocalCache())
+    yield cmutils
+
+
 @pytest.fixture
 def cmclient(mocker):
-    mock_http_client = mocker.patch('plugnpy.cachemanager.HTTPClient')
+    mock_http_client = mocker.patch('plugnpy.cachemanager.get_transport')
     client = CacheManagerClient(HOST, PORT, NAMESPACE)
     yield client
 
@@ -123,7 +142,7 @@ def test_cache_manager_utils_generate_key(arg1, arg2, arg3, expected, cmutils):
 
 
 def test_cache_manager_client_init(mocker):
-    mock_http_client = mocker.patch('plugnpy.cachemanager.HTTPClient')
+    mock_http_client = mocker.patch('plugnpy.cachemanager.get_transport')
     client = CacheManagerClient(HOST, PORT, NAMESPACE)
     assert client._namespace == NAMESPACE
     assert client._headers == {
@@ -132,7 +151,7 @@ def test_cache_manager_client_init(mocker):
     }
     mock_http_client.assert_called()
     assert mock_http_client.call_args == mocker.call(
-        HOST, PORT, concurrency=1, connection_timeout=30, network_timeout=30)
+        HOST, PORT, None, concurrency=1, connection_timeout=30, network_timeout=30)
 
 
 def test_cache_manager_client_get_data(mocker, cmclient):
@@ -209,3 +228,766 @@ def test_cache_manager_client_check_for_error(status, msg, raw, exception, mocke
         with pytest.raises(ResultError) as ex:
             cmclient._check_for_error(mock_resp)
         assert f'{status}: {msg} - {raw}' in str(ex)
+
+
+@pytest.mark.parametrize('deadline, expected', [
+    pytest.param(None, MAX_WAIT, id="no_deadline"),
+    pytest.param(100, MAX_WAIT, id="later_deadline"),
+    pytest.param(10.5, 10, id="earlier_deadline"),
+    pytest.param(0.2, 1, id="less_than_a_second"),
+])
+def test_cache_manager_client_get_data_deadline(deadline, expected, mocker, cmclient):
+    mocker.patch.object(cmclient, '_post', return_value=DATA)
+    assert cmclient.get_data(KEY, MAX_WAIT, deadline=deadline) == DATA
+    assert cmclient._post.call_args[0][1]['max_wait_time'] == expected
+
+
+def test_cache_manager_client_send_deadline_exceeded(mocker, cmclient):
+    gevent = pytest.importorskip('gevent')
+    cmclient._http_client.get.side_effect = lambda *args, **kwargs: gevent.sleep(1)
+    with pytest.raises(DeadlineExceeded) as ex:
+        cmclient.status(deadline=0.05)
+    assert 'call status on the cache manager' in str(ex.value)
+    with pytest.raises(DeadlineExceeded):
+        cmclient.set_data(KEY, DATA, TTL, deadline=-1)
+
+
+def test_cache_manager_utils_set_data_deadline(mocker, cmutils):
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, '_post', side_effect=lambda *args: remaining_time())
+    assert 0 < cmutils.set_data(KEY, {'some': DATA}, 900, deadline=5) <= 5
+
+
+def test_cache_manager_utils_get_via_cachemanager_local_cache(mocker, local_cmutils):
+    def func(x): return {'value': x}
+
+    local_cmutils._initialise_client()
+    mocker.patch.object(local_cmutils.client, 'get_data', return_value={'data': None, 'lock': True})
+    mocker.patch.object(local_cmutils.client, 'set_data')
+    assert local_cmutils.get_via_cachemanager(False, KEY, 900, func, 1) == {'value': 1}
+    assert local_cmutils.get_via_cachemanager(False, KEY, 900, func, 2) == {'value': 1}
+    assert local_cmutils.client.get_data.call_count == 1
+    assert local_cmutils.local_cache.stats()['hits'] == 1
+
+    local_cmutils.set_data(KEY, {'value': 3}, 900)
+    assert local_cmutils.get_via_cachemanager(False, KEY, 900, func, 4) == {'value': 3}
+    assert local_cmutils.client.get_data.call_count == 1
+
+
+@pytest.mark.parametrize('response, expected', [
+    pytest.param({'data': '"data"', 'lock': None, 'ttl': 30}, 30, id="remaining_ttl"),
+    pytest.param({'data': '"data"', 'lock': None, 'ttl': 3600}, 900, id="longer_remaining_ttl"),
+    # the time the data was stored is unknown, so it is kept for the local max age
+    pytest.param({'data': '"data"', 'lock': None}, 30, id="unknown_remaining_ttl"),
+    pytest.param({'data': '"data"', 'lock': None, 'ttl': 0}, None, id="expiring"),
+])
+def test_cache_manager_utils_local_cache_remaining_ttl(response, expected, mocker, local_cmutils):
+    local_cmutils._initialise_client()
+    mocker.patch.object(local_cmutils.client, 'get_data', return_value=response)
+    monotonic = mocker.patch('plugnpy.localcache.time.monotonic', return_value=0.0)
+    assert local_cmutils.get_via_cachemanager(False, KEY, 900, str) == 'data'
+    if expected is None:
+        assert len(local_cmutils.local_cache) == 0
+        return
+    monotonic.return_value = expected - 0.1
+    assert local_cmutils.local_cache.get(hash_string(KEY)) == 'data'
+    monotonic.return_value = expected
+    assert local_cmutils.local_cache.get(hash_string(KEY)) is None
+
+
+def test_cache_manager_utils_max_lease_wait(mocker, cmutils):
+    mocker.patch.object(CacheManagerUtils, 'max_lease_wait', 5)
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'get_data', return_value={'data': '"data"', 'lock': None})
+    assert cmutils.get_via_cachemanager(False, KEY, 900, str) == 'data'
+    # the first request does not wait longer than the max lease wait either
+    assert cmutils.client.get_data.call_args[0][1] == 5
+
+
+def test_cache_manager_utils_get_via_cachemanager_no_local_cache(mocker, cmutils):
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'get_data', return_value={'data': '"data"', 'lock': None})
+    assert cmutils.get_via_cachemanager(False, KEY, 900, str) == 'data'
+    assert cmutils.get_via_cachemanager(False, KEY, 900, str) == 'data'
+    assert cmutils.client.get_data.call_count == 2
+
+
+def test_cache_manager_utils_backend(mocker, cmutils, tmp_path):
+    def func(x): return {'value': x}
+
+    backend = LocalFileCache(str(tmp_path / 'cache.db'), NAMESPACE)
+    mocker.patch.object(CacheManagerUtils, 'backend', backend)
+    mocker.patch.object(CacheManagerUtils, 'client', None)
+    assert cmutils.get_via_cachemanager(False, KEY, 900, func, 1) == {'value': 1}
+    assert cmutils.get_via_cachemanager(False, KEY, 900, func, 2) == {'value': 1}
+    assert CacheManagerUtils.client is None
+    backend.close()
+
+
+@pytest.mark.parametrize('host, get_data_side_effect', [
+    pytest.param(HOST, SocketError, id="unreachable"),
+    pytest.param('', None, id="no_host"),
+])
+def test_cache_manager_utils_fallback(host, get_data_side_effect, mocker, cmutils, tmp_path):
+    def func(x): return {'value': x}
+
+    cmutils._initialise_client()
+    mocker.patch.object(CacheManagerUtils, 'host', host)
+    mocker.patch.object(cmutils.client, 'get_data', side_effect=get_data_side_effect)
+    mocker.patch.object(cmutils.client, 'set_data', side_effect=get_data_side_effect)
+    fallback = LocalFileCache(str(tmp_path / 'cache.db'), NAMESPACE)
+    mocker.patch.object(CacheManagerUtils, 'fallback', fallback)
+    assert cmutils.get_via_cachemanager(False, KEY, 900, func, 1) == {'value': 1}
+    cmutils.set_data(KEY, {'value': 3}, 900)
+    assert cmutils.get_via_cachemanager(False, KEY, 900, func, 2) == {'value': 3}
+    fallback.close()
+
+
+def _mock_response(mocker, status, body=None):
+    mock_resp = mocker.Mock(status_code=status, status_message='')
+    mock_resp.read.return_value = json.dumps(body) if body is not None else None
+    return mock_resp
+
+
+def test_cache_manager_client_get_many(mocker, cmclient):
+    responses = {'a': {'data': VALUE, 'lock': None}, 'b': {'data': None, 'lock': True}}
+    cmclient._http_client.post.return_value = _mock_response(mocker, 200, responses)
+    assert cmclient.get_many(['a', 'b', 'c', 'a'], MAX_WAIT) == dict(responses, c={'data': None, 'lock': None})
+    assert cmclient._http_client.post.call_count == 1
+    args, kwargs = cmclient._http_client.post.call_args
+    assert args == ('get_many',)
+    assert json.loads(kwargs['body']) == {'namespace': NAMESPACE, 'keys': ['a', 'b', 'c'], 'max_wait_time': MAX_WAIT}
+
+
+def test_cache_manager_client_get_many_unsupported(mocker, cmclient):
+    cmclient._http_client.post.return_value = _mock_response(mocker, 404)
+    mock_batch_client = mocker.patch('plugnpy.cachemanager.get_transport').return_value
+    mock_batch_client.post.side_effect = lambda path, body, headers: _mock_response(
+        mocker, 200, {'data': json.loads(body)['key'] * 2, 'lock': None})
+    expected = {'a': {'data': 'aa', 'lock': None}, 'b': {'data': 'bb', 'lock': None}}
+    assert cmclient.get_many(['a', 'b'], MAX_WAIT) == expected
+    assert cmclient.get_many(['a', 'b'], MAX_WAIT) == expected
+    # the batch request is not tried again once the cache manager has rejected it
+    assert cmclient._http_client.post.call_count == 1
+    assert mock_batch_client.post.call_count == 4
+    assert {json.loads(call[1]['body'])['max_wait_time'] for call in mock_batch_client.post.call_args_list} == {
+        MAX_WAIT}
+
+
+def test_cache_manager_client_set_many(mocker, cmclient):
+    cmclient._http_client.post.return_value = _mock_response(mocker, 200, {'ok': 2})
+    assert cmclient.set_many({'a': DATA, 'b': VALUE}, TTL) == {'ok': 2}
+    args, kwargs = cmclient._http_client.post.call_args
+    assert args == ('set_many',)
+    assert json.loads(kwargs['body']) == {'namespace': NAMESPACE, 'items': {'a': DATA, 'b': VALUE}, 'ttl': TTL}
+
+
+def test_cache_manager_client_set_many_unsupported(mocker, cmclient):
+    cmclient._http_client.post.return_value = _mock_response(mocker, 501)
+    mock_batch_client = mocker.patch('plugnpy.cachemanager.get_transport').return_value
+    mock_batch_client.post.return_value = _mock_response(mocker, 200)
+    assert cmclient.set_many({'a': DATA, 'b': VALUE}, TTL) == [None, None]
+    bodies = sorted((json.loads(call[1]['body']) for call in mock_batch_client.post.call_args_list),
+                    key=lambda body: body['key'])
+    assert bodies == [
+        {'namespace': NAMESPACE, 'key': 'a', 'data': DATA, 'ttl': TTL},
+        {'namespace': NAMESPACE, 'key': 'b', 'data': VALUE, 'ttl': TTL},
+    ]
+
+
+def test_cache_manager_client_get_many_unsupported_deadline(mocker, cmclient):
+    cmclient._http_client.post.return_value = _mock_response(mocker, 404)
+    mock_batch_client = mocker.patch('plugnpy.cachemanager.get_transport').return_value
+    budgets = []
+    mock_batch_client.post.side_effect = lambda *args, **kwargs: (
+        budgets.append(remaining_time()) or _mock_response(mocker, 200, {'data': None, 'lock': True}))
+    cmclient.get_many(['a', 'b'], MAX_WAIT, deadline=5)
+    assert len(budgets) == 2
+    assert all(0 < budget <= 5 for budget in budgets)
+
+
+def test_cache_manager_client_get_many_error(mocker, cmclient):
+    cmclient._http_client.post.return_value = _mock_response(mocker, 500)
+    with pytest.raises(ResultError):
+        cmclient.get_many(['a'])
+
+
+def test_cache_manager_utils_get_many_via_cachemanager(mocker, local_cmutils):
+    def func(keys, prefix):
+        return {key: f'{prefix}{key}' for key in keys}
+
+    local_cmutils._initialise_client()
+    hashed = {key: hash_string(key) for key in ('a', 'b', 'c')}
+    mocker.patch.object(local_cmutils.client, 'get_many', return_value={
+        hashed['a']: {'data': '"cached"', 'lock': None, 'ttl': 60},
+        hashed['b']: {'data': None, 'lock': True},
+        hashed['c']: {'data': None, 'lock': True},
+    })
+    mocker.patch.object(local_cmutils.client, 'set_many')
+    mock_func = mocker.Mock(side_effect=func)
+    assert local_cmutils.get_many_via_cachemanager(False, ['c', 'a', 'b'], 900, mock_func, 'x') == {
+        'c': 'xc', 'a': 'cached', 'b': 'xb'}
+    assert mock_func.call_args == mocker.call(['c', 'b'], 'x')
+    assert local_cmutils.client.set_many.call_args == mocker.call({hashed['c']: '"xc"', hashed['b']: '"xb"'}, 900)
+
+    # all the keys are now in the in-process cache
+    assert local_cmutils.get_many_via_cachemanager(False, ['a', 'b'], 900, mock_func, 'y') == {'a': 'cached', 'b': 'xb'}
+    assert local_cmutils.client.get_many.call_count == 1
+
+
+@pytest.mark.parametrize('response, raises, expected', [
+    pytest.param({'data': None, 'lock': True}, None, {'a': {'error': 'failed'}}, id="func_error"),
+    pytest.param({'data': None, 'lock': None}, ResultError, None, id="no_data_no_lock"),
+])
+def test_cache_manager_utils_get_many_via_cachemanager_errors(response, raises, expected, mocker, cmutils):
+    def func(keys):
+        raise ValueError('failed')
+
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'get_many', return_value={hash_string('a'): response})
+    mocker.patch.object(cmutils.client, 'set_many')
+    raise_or_assert(
+        functools.partial(cmutils.get_many_via_cachemanager, False, ['a'], 900, func),
+        raises,
+        expected
+    )
+
+
+def test_cache_manager_utils_get_many_via_cachemanager_not_required(mocker, cmutils):
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'get_many')
+    assert cmutils.get_many_via_cachemanager(True, ['a', 'b'], 900, lambda keys: {'a': 1}) == {'a': 1, 'b': None}
+    assert not cmutils.client.get_many.called
+
+
+def test_cache_manager_utils_get_many_via_file_cache(mocker, cmutils, tmp_path):
+    backend = LocalFileCache(str(tmp_path / 'cache.db'), NAMESPACE)
+    mocker.patch.object(CacheManagerUtils, 'backend', backend)
+    mock_func = mocker.Mock(side_effect=lambda keys: {key: key.upper() for key in keys})
+    assert cmutils.get_many_via_cachemanager(False, ['a', 'b'], 900, mock_func) == {'a': 'A', 'b': 'B'}
+    assert cmutils.get_many_via_cachemanager(False, ['b', 'c'], 900, mock_func) == {'b': 'B', 'c': 'C'}
+    assert mock_func.call_args_list == [mocker.call(['a', 'b']), mocker.call(['c'])]
+    backend.close()
+
+
+@pytest.fixture
+def inline_cmclient(mocker):
+    mocker.patch('plugnpy.cachemanager.get_transport')
+    client = CacheManagerClient(HOST, PORT, NAMESPACE, inline_data=True)
+    yield client
+
+
+def test_cache_manager_client_inline_set_data(mocker, inline_cmclient):
+    inline_cmclient._http_client.post.return_value = _mock_response(mocker, 200)
+    inline_cmclient.set_data(KEY, VALUE, TTL)
+    inline_cmclient.set_data(KEY, 'z:abc', TTL)
+    bodies = [json.loads(call[1]['body']) for call in inline_cmclient._http_client.post.call_args_list]
+    assert bodies == [
+        {'namespace': NAMESPACE, 'key': KEY, 'ttl': TTL, 'data': {'value': json.loads(VALUE)}},
+        {'namespace': NAMESPACE, 'key': KEY, 'ttl': TTL, 'data': 'z:abc'},
+    ]
+
+
+def test_cache_manager_client_inline_set_many(mocker, inline_cmclient):
+    inline_cmclient._http_client.post.return_value = _mock_response(mocker, 200, {'ok': 2})
+    assert inline_cmclient.set_many({'a': VALUE, 'b': '"text"'}, TTL) == {'ok': 2}
+    assert json.loads(inline_cmclient._http_client.post.call_args[1]['body']) == {
+        'namespace': NAMESPACE, 'ttl': TTL, 'items': {'a': {'value': json.loads(VALUE)}, 'b': {'value': 'text'}},
+    }
+
+
+def test_cache_manager_client_inline_get_data(mocker, inline_cmclient):
+    body = {'data': {'value': [1, 2]}, 'lock': None}
+    inline_cmclient._http_client.post.return_value = _mock_response(mocker, 200, body)
+    response = inline_cmclient.get_data(KEY)
+    assert response == dict(body, size=len(json.dumps(body)))
+    inline_cmclient._http_client.post.return_value = _mock_response(mocker, 200, {'data': None, 'lock': True})
+    assert inline_cmclient.get_data(KEY) == {'data': None, 'lock': True}
+
+
+def test_cache_manager_utils_inline_data(mocker, local_cmutils):
+    mocker.patch.object(CacheManagerUtils, 'inline_data', True)
+    mocker.patch.object(CacheManagerUtils, 'client', None)
+    local_cmutils._initialise_client()
+    mocker.patch.object(
+        local_cmutils.client, '_post', return_value=({'data': {'value': {'a': 1}}, 'lock': None, 'ttl': 60}, 42))
+    assert local_cmutils.get_via_cachemanager(False, KEY, 900, lambda: None) == {'a': 1}
+    assert local_cmutils.local_cache.stats()['size'] == 42
+
+
+@pytest.mark.parametrize('stored', [
+    pytest.param('{"a": [1, 2]}', id="older_client"),
+    pytest.param(PayloadCodec(compress_threshold=0).dumps({'a': [1, 2]}), id="compressed"),
+])
+def test_cache_manager_utils_reads_encodings(stored, mocker, cmutils):
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'get_data', return_value={'data': stored, 'lock': None})
+    assert cmutils.get_via_cachemanager(False, KEY, 900, lambda: None) == {'a': [1, 2]}
+
+
+def test_cache_manager_utils_compression(mocker, cmutils):
+    mocker.patch.object(CacheManagerUtils, 'codec', PayloadCodec(compress_threshold=100))
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'set_data')
+    cmutils.set_data(KEY, {'small': 1}, 900)
+    cmutils.set_data(KEY, {'large': DATA}, 900)
+    small, large = [call[0][1] for call in cmutils.client.set_data.call_args_list]
+    assert json.loads(small) == {'small': 1}
+    assert large.startswith('z:')
+    assert CacheManagerUtils.codec.loads(large) == {'large': DATA}
+
+
+@pytest.fixture
+def soft_cmutils(mocker, cmutils, tmp_path):
+    backend = LocalFileCache(str(tmp_path / 'cache.db'), NAMESPACE)
+    mocker.patch.object(CacheManagerUtils, 'backend', backend)
+    # each call behaves as a separate plugin process
+    mocker.patch.object(CacheManagerUtils, 'local_cache', None)
+    mocker.patch('plugnpy.cachemanager.time.time', return_value=1000.0)
+    yield cmutils
+    backend.close()
+
+
+def test_cache_manager_utils_soft_ttl(mocker, soft_cmutils):
+    soft_ttl = SoftTTL(60, 30)
+    func = mocker.Mock(side_effect=['v1', 'v2'])
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v1'
+    time.time.return_value = 1059.9
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v1'
+    assert func.call_count == 1
+
+    # stale: the first caller refreshes the data, the callers during the refresh get the stale data
+    def refresh():
+        assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v1'
+        return func()
+
+    time.time.return_value = 1060.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, refresh) == 'v2'
+    assert func.call_count == 2
+    time.time.return_value = 1119.9
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v2'
+    assert func.call_count == 2
+
+
+def test_cache_manager_utils_soft_ttl_refresh_failure(mocker, soft_cmutils):
+    soft_ttl = SoftTTL(60, 30, retry_interval=5)
+    soft_cmutils.set_data(KEY, 'v1', soft_ttl)
+    func = mocker.Mock(side_effect=ValueError('API down'))
+    time.time.return_value = 1070.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v1'
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v1'
+    assert func.call_count == 1
+    time.time.return_value = 1075.0
+    func.side_effect = None
+    func.return_value = 'v2'
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v2'
+    assert func.call_count == 2
+
+
+def test_cache_manager_utils_soft_ttl_expired(mocker, soft_cmutils):
+    soft_ttl = SoftTTL(60, 30)
+    soft_cmutils.set_data(KEY, 'v1', soft_ttl)
+    time.time.return_value = 1090.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, lambda: {'v': 2}) == {'v': 2}
+    # data stored with a soft TTL can be read with a plain TTL, and conversely
+    assert soft_cmutils.get_via_cachemanager(False, KEY, 900, lambda: None) == {'v': 2}
+    soft_cmutils.set_data('other', 'plain', 900)
+    assert soft_cmutils.get_via_cachemanager(False, 'other', soft_ttl, lambda: None) == 'plain'
+
+
+def test_cache_manager_utils_soft_ttl_local_cache(mocker, soft_cmutils):
+    mocker.patch.object(CacheManagerUtils, 'local_cache', LocalCache())
+    soft_ttl = SoftTTL(60, 30)
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, lambda: 'v1') == 'v1'
+    assert soft_cmutils.local_cache.get(hash_string(KEY)) == 'v1'
+    soft_cmutils.local_cache.clear()
+    time.time.return_value = 1061.0
+    with_lock = LocalFileCache(CacheManagerUtils.backend._path, NAMESPACE)
+    assert with_lock.get_data(hash_string(f'{hash_string(KEY)}#refresh'), 0)['lock']
+    # stale data is not kept in-process
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, lambda: 'v2') == 'v1'
+    assert len(soft_cmutils.local_cache) == 0
+    with_lock.close()
+
+
+def test_cache_manager_utils_soft_ttl_early_refresh(mocker, soft_cmutils):
+    soft_ttl = SoftTTL(60, 30, early_refresh=1, retry_interval=5)
+    monotonic = mocker.patch('plugnpy.cachemanager.time.monotonic', return_value=0.0)
+    # the data is refreshed up to 2 * -log(0.001) = 13.8s before it becomes stale
+    mocker.patch('plugnpy.cachemanager.random.random', return_value=0.999)
+    values = iter(['v1', 'v2', 'v3'])
+
+    def func():
+        # each retrieval takes 2s
+        monotonic.return_value += 2
+        return next(values)
+
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v1'
+    time.time.return_value = 1046.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v1'
+    time.time.return_value = 1047.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v2'
+    # the refreshed data can be refreshed early again, the refresh lock is only kept for the retry interval
+    time.time.return_value = 1094.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, func) == 'v3'
+
+
+@pytest.mark.parametrize('failing', ['get_data', 'set_data'])
+def test_cache_manager_utils_soft_ttl_refresh_lock_failure(failing, mocker, soft_cmutils):
+    soft_ttl = SoftTTL(60, 30)
+    soft_cmutils.set_data(KEY, 'v1', soft_ttl)
+    backend = CacheManagerUtils.backend
+    method = getattr(backend, failing)
+    refresh_key = hash_string(f'{hash_string(KEY)}#refresh')
+
+    def fail_refresh_lock(key, *args, **kwargs):
+        if key == refresh_key:
+            raise ResultError("Failed to set data")
+        return method(key, *args, **kwargs)
+
+    mocker.patch.object(backend, failing, side_effect=fail_refresh_lock)
+    time.time.return_value = 1061.0
+    # the stale data, or the refreshed data, is returned rather than the error of the cache manager
+    expected = 'v1' if failing == 'get_data' else 'v2'
+    assert soft_cmutils.get_via_cachemanager(False, KEY, soft_ttl, lambda: 'v2') == expected
+
+
+def test_cache_manager_utils_get_many_soft_ttl(cmutils):
+    with pytest.raises(ValueError):
+        cmutils.get_many_via_cachemanager(False, ['a'], SoftTTL(60, 30), lambda keys: {})
+
+
+@pytest.mark.parametrize('now, delta, random_value, early_refresh, expected', [
+    pytest.param(1059, 0, 0.5, 1, False, id="fresh"),
+    pytest.param(1060, 0, 0.5, 0, True, id="stale"),
+    pytest.param(1059, 2, 0.5, 0, False, id="no_early_refresh"),
+    pytest.param(1059, 2, 0.5, 1, True, id="early_refresh"),
+    pytest.param(1050, 2, 0.5, 1, False, id="too_early"),
+    pytest.param(1050, 2, 0.999999, 1, True, id="unlikely_early_refresh"),
+])
+def test_soft_ttl_should_refresh(now, delta, random_value, early_refresh, expected, mocker):
+    mocker.patch('plugnpy.cachemanager.time.time', return_value=now)
+    mocker.patch('plugnpy.cachemanager.random.random', return_value=random_value)
+    assert SoftTTL(60, 30, early_refresh=early_refresh).should_refresh(1060, delta) == expected
+
+
+def test_soft_ttl_wrap(mocker):
+    mocker.patch('plugnpy.cachemanager.time.time', return_value=1000.0)
+    soft_ttl = SoftTTL(60, 30)
+    assert soft_ttl.hard_ttl == 90
+    assert SoftTTL.unwrap(soft_ttl.wrap([1], 0.5)) == ([1], 1060.0, 0.5)
+    assert SoftTTL.unwrap({'value': 1}) == ({'value': 1}, None, 0)
+
+
+def _failing(*errors):
+    def func():
+        error = errors[func.calls] if func.calls < len(errors) else None
+        func.calls += 1
+        if error:
+            raise error
+        return 'data'
+    func.calls = 0
+    return func
+
+
+def test_cache_manager_utils_cached_error(mocker, soft_cmutils):
+    func = _failing(ValueError('API down'))
+    data = soft_cmutils.get_via_cachemanager(False, KEY, 900, func)
+    assert isinstance(data, CachedError)
+    assert data == {'error': 'API down'}
+    assert (data.message, data.failures, data.error_type, data.retry_at) == ('API down', 1, 'ValueError', None)
+    # without an error TTL, the error is kept for the TTL
+    time.time.return_value = 1899.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, 900, func) == {'error': 'API down'}
+    assert func.calls == 1
+    stored = CacheManagerUtils.backend.get_data(hash_string(KEY), 0)['data']
+    assert json.loads(stored) == {
+        'error': 'API down', 'plugnpy_error': {'failures': 1, 'type': 'ValueError', 'retry_at': None}}
+    assert not isinstance(CachedError.from_data({'error': 'API down'}), CachedError)
+
+
+def test_cache_manager_utils_error_ttl(mocker, soft_cmutils):
+    mocker.patch.object(CacheManagerUtils, 'error_ttl', 10)
+    func = _failing(ValueError('API down'), ValueError('still down'))
+    assert soft_cmutils.get_via_cachemanager(False, KEY, 900, func).retry_at == 1010.0
+    time.time.return_value = 1009.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, 900, func).failures == 1
+
+    # a single caller retries, the others get the cached error
+    def retry():
+        assert soft_cmutils.get_via_cachemanager(False, KEY, 900, func) == {'error': 'API down'}
+        return func()
+
+    time.time.return_value = 1010.0
+    data = soft_cmutils.get_via_cachemanager(False, KEY, 900, retry)
+    assert (data, data.failures, data.retry_at) == ({'error': 'still down'}, 2, 1020.0)
+    time.time.return_value = 1020.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, 900, func) == 'data'
+    assert func.calls == 3
+    time.time.return_value = 1899.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, 900, func) == 'data'
+    assert func.calls == 3
+
+
+def test_cache_manager_utils_max_error_retries(mocker, soft_cmutils):
+    mocker.patch.object(CacheManagerUtils, 'error_ttl', 10)
+    mocker.patch.object(CacheManagerUtils, 'max_error_retries', 2)
+    func = _failing(*[ValueError('API down')] * 5)
+    for now in (1000.0, 1010.0, 1020.0, 1030.0, 1899.0):
+        time.time.return_value = now
+        data = soft_cmutils.get_via_cachemanager(False, KEY, 900, func)
+    assert (data.failures, data.retry_at) == (3, None)
+    assert func.calls == 3
+    time.time.return_value = 1920.0
+    assert soft_cmutils.get_via_cachemanager(False, KEY, 900, func).failures == 1
+
+
+def test_cache_manager_utils_error_ttl_local_cache(mocker, soft_cmutils):
+    mocker.patch.object(CacheManagerUtils, 'local_cache', LocalCache())
+    mocker.patch.object(CacheManagerUtils, 'error_ttl', 10)
+    soft_cmutils.get_via_cachemanager(False, KEY, 900, _failing(ValueError('API down')))
+    # the error is not kept in-process, so it is retried by the first call after its retry time
+    assert soft_cmutils.local_cache.get(hash_string(KEY)) is None
+
+
+def test_cache_manager_utils_get_many_error_ttl(mocker, cmutils):
+    def func(keys):
+        raise ValueError('API down')
+
+    mocker.patch.object(CacheManagerUtils, 'error_ttl', 10)
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'get_many', return_value={hash_string('a'): {'data': None, 'lock': True}})
+    mocker.patch.object(cmutils.client, 'set_many')
+    data = cmutils.get_many_via_cachemanager(False, ['a'], 900, func)['a']
+    assert isinstance(data, CachedError)
+    assert cmutils.client.set_many.call_args[0][1] == 10
+
+
+def test_cache_manager_utils_get_many_error_ttl_failed_keys(mocker, local_cmutils):
+    def func(keys):
+        raise ValueError('API down')
+
+    mocker.patch.object(CacheManagerUtils, 'error_ttl', 10)
+    monotonic = mocker.patch('plugnpy.localcache.time.monotonic', return_value=0.0)
+    local_cmutils._initialise_client()
+    mocker.patch.object(local_cmutils.client, 'get_many', return_value={
+        hash_string('a'): {'data': '"cached"', 'lock': None, 'ttl': 900},
+        hash_string('b'): {'data': None, 'lock': True},
+    })
+    mocker.patch.object(local_cmutils.client, 'set_many')
+    data = local_cmutils.get_many_via_cachemanager(False, ['a', 'b'], 900, func)
+    assert data['a'] == 'cached' and isinstance(data['b'], CachedError)
+    assert local_cmutils.client.set_many.call_args == mocker.call({hash_string('b'): mocker.ANY}, 10)
+    # the data which did not fail is kept in-process for its TTL
+    monotonic.return_value = 899.0
+    assert local_cmutils.local_cache.get(hash_string('a')) == 'cached'
+
+
+@pytest.mark.parametrize('path, error, calls, raises', [
+    pytest.param('set_data', ConnectionResetError, 2, None, id="idempotent"),
+    pytest.param('get_data', ConnectionResetError, 1, ConnectionResetError, id="locking"),
+    pytest.param('get_data', ConnectionRefusedError, 2, None, id="locking_refused"),
+])
+def test_cache_manager_client_retry(path, error, calls, raises, mocker, tmp_path):
+    mocker.patch('plugnpy.cachemanager.get_transport')
+    mocker.patch('plugnpy.retry.time.sleep')
+    breaker = CircuitBreaker(str(tmp_path / 'circuit'), failure_threshold=1)
+    client = CacheManagerClient(HOST, PORT, NAMESPACE, retry=RetryPolicy(attempts=2), circuit_breaker=breaker)
+    client._http_client.post.side_effect = [error(), _mock_response(mocker, 200, {'success': True})]
+    raise_or_assert(lambda: client._post(path, {'key': KEY}), raises, {'success': True})
+    assert client._http_client.post.call_count == calls
+    # the failure of the call opens the circuit, a call retried successfully does not
+    assert breaker.is_open() == bool(raises)
+    if raises:
+        with pytest.raises(CircuitOpenError):
+            client._post(path, {'key': KEY})
+        assert client._http_client.post.call_count == calls
+
+
+@pytest.mark.parametrize('bypass, fallback', [
+    pytest.param(False, False, id="fail_fast"),
+    pytest.param(True, False, id="bypass"),
+    pytest.param(False, True, id="fallback"),
+])
+def test_cache_manager_utils_circuit_open(bypass, fallback, mocker, cmutils, tmp_path):
+    def func(x): return {'value': x}
+
+    def many(keys): return {key: key for key in keys}
+
+    breaker = CircuitBreaker(str(tmp_path / 'circuit'), bypass=bypass)
+    mocker.patch.object(breaker, 'allow', return_value=False)
+    mocker.patch.object(CacheManagerUtils, 'circuit_breaker', breaker)
+    mocker.patch.object(CacheManagerUtils, 'client', None)
+    mocker.patch('plugnpy.cachemanager.get_transport')
+    cmutils._initialise_client()
+    if fallback:
+        mocker.patch.object(CacheManagerUtils, 'fallback', LocalFileCache(str(tmp_path / 'cache.db'), NAMESPACE))
+    if not bypass and not fallback:
+        with pytest.raises(CircuitOpenError):
+            cmutils.get_via_cachemanager(False, KEY, 900, func, 1)
+        with pytest.raises(CircuitOpenError):
+            cmutils.get_many_via_cachemanager(False, ['a'], 900, many)
+    else:
+        assert cmutils.get_via_cachemanager(False, KEY, 900, func, 1) == {'value': 1}
+        assert cmutils.get_many_via_cachemanager(False, ['a', 'b'], 900, many) == {'a': 'a', 'b': 'b'}
+    assert not cmutils.client._http_client.post.called
+    if fallback:
+        CacheManagerUtils.fallback.close()
+
+
+@pytest.mark.parametrize('error', [
+    pytest.param(CircuitOpenError("Circuit open"), id="circuit_open"),
+    pytest.param(ResultError("Failed to set data"), id="result_error"),
+    pytest.param(SocketError("Connection reset"), id="socket_error"),
+])
+def test_cache_manager_utils_store_failure(error, mocker, cmutils):
+    cmutils._initialise_client()
+    mocker.patch.object(cmutils.client, 'get_data', return_value={'data': None, 'lock': True})
+    mocker.patch.object(cmutils.client, 'set_data', side_effect=error)
+    mocker.patch.object(cmutils.client, 'get_many', return_value={hash_string('a'): {'data': None, 'lock': True}})
+    mocker.patch.object(cmutils.client, 'set_many', side_effect=error)
+    # the data retrieved is returned when it cannot be stored
+    assert cmutils.get_via_cachemanager(False, KEY, 900, lambda: {'value': 1}) == {'value': 1}
+    assert cmutils.get_many_via_cachemanager(False, ['a'], 900, lambda keys: {'a': 2}) == {'a': 2}
+
+
+def test_cache_manager_utils_stats(mocker, local_cmutils):
+    def func(x):
+        if x == 'error':
+            raise ValueError(x)
+        return {'value': x}
+
+    stats = CacheStats()
+    mocker.patch.object(CacheManagerUtils, 'stats', stats)
+    mocker.patch.object(CacheManagerUtils, 'client', None)
+    mocker.patch('plugnpy.cachemanager.get_transport')
+    local_cmutils._initialise_client()
+    post = local_cmutils.client._http_client.post
+    post.side_effect = [
+        _mock_response(mocker, 200, {'data': None, 'lock': True}),
+        _mock_response(mocker, 200, {'success': True}),
+        _mock_response(mocker, 200, {'data': '"data"', 'lock': None}),
+        _mock_response(mocker, 200, {'data': None, 'lock': True}),
+        _mock_response(mocker, 500),
+    ]
+    assert local_cmutils.get_via_cachemanager(False, KEY, 900, func, 1) == {'value': 1}
+    assert local_cmutils.get_via_cachemanager(False, KEY, 900, func, 2) == {'value': 1}
+    assert local_cmutils.get_via_cachemanager(False, 'other', 900, func, 3) == 'data'
+    # the error is returned even though it cannot be stored
+    assert local_cmutils.get_via_cachemanager(False, 'failing', 900, func, 'error') == {'error': 'error'}
+    counters = stats.as_dict()['counters']
+    assert {name: counters[name] for name in ('local_hits', 'hits', 'locks', 'fetches', 'fetch_errors')} == {
+        'local_hits': 1, 'hits': 1, 'locks': 2, 'fetches': 2, 'fetch_errors': 1,
+    }
+    calls = stats.as_dict()['calls']
+    assert {method: (call['count'], call['errors']) for method, call in calls.items()} == {
+        'get_data': (3, 0), 'set_data': (2, 1),
+    }
+    assert calls['set_data']['bytes_sent'] > 0
+
+
+
+@pytest.mark.parametrize('single_flight, expected_calls', [
+    pytest.param(True, 1, id="coalesced"),
+    pytest.param(False, 4, id="not_coalesced"),
+])
+def test_cache_manager_utils_single_flight(single_flight, expected_calls, mocker, cmutils):
+    if single_flight:
+        mocker.patch.object(CacheManagerUtils, 'single_flight', SingleFlight())
+    mocker.patch.object(CacheManagerUtils, 'client', None)
+    mocker.patch('plugnpy.cachemanager.get_transport')
+    cmutils._initialise_client()
+    calls = []
+
+    def func():
+        calls.append(1)
+        time.sleep(0.2)
+        return DATA
+
+    def post(path, **kwargs):
+        if path == 'get_data':
+            return _mock_response(mocker, 200, {'data': None, 'lock': True})
+        return _mock_response(mocker, 200, {'success': True})
+
+    cmutils.client._http_client.post.side_effect = post
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cmutils.get_via_cachemanager, False, KEY, TTL, func) for _ in range(4)]
+        assert [future.result() for future in futures] == [DATA] * 4
+    assert len(calls) == expected_calls
+    get_data_calls = [call for call in cmutils.client._http_client.post.call_args_list if call[0][0] == 'get_data']
+    assert len(get_data_calls) == expected_calls
+
+
+@pytest.mark.parametrize('transport', ['gevent', 'http'])
+def test_cache_manager_utils_threads(transport, mocker, cmutils):
+    results = {}
+
+    def lookups(thread):
+        for index in range(5):
+            key = f'{KEY}-{thread}-{index}'
+            results[key] = cmutils.get_via_cachemanager(False, key, TTL, lambda: {'key': key})
+
+    with StandInServer() as standin:
+        host, port = standin.address
+        mocker.patch.object(CacheManagerUtils, 'host', host)
+        mocker.patch.object(CacheManagerUtils, 'port', port)
+        mocker.patch.object(CacheManagerUtils, 'transport', transport)
+        mocker.patch.object(CacheManagerUtils, 'client', None)
+        # the client is shared by the threads
+        threads = [threading.Thread(target=lookups, args=(thread,), daemon=True) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert not any(thread.is_alive() for thread in threads)
+        cmutils.client.close()
+    assert len(results) == 40
+    assert all(value == {'key': key} for key, value in results.items())
+
+
+INVENTORY = {'interfaces': [{'name': f'eth{index}', 'counters': list(range(100))} for index in range(50)], 'uptime': 7}
+VIEWS = {
+    'interfaces': lambda data: [interface['name'] for interface in data['interfaces']],
+    'uptime': lambda data: data['uptime'],
+}
+
+
+@pytest.mark.parametrize('ttl', [TTL, SoftTTL(60, 30)])
+def test_cache_manager_utils_get_view(ttl, mocker, soft_cmutils):
+    func = mocker.Mock(return_value=INVENTORY)
+    assert soft_cmutils.get_view_via_cachemanager(False, KEY, 'uptime', VIEWS, ttl, func, 'arg', option=1) == 7
+    func.assert_called_once_with('arg', option=1)
+    # the other views are stored from the same call
+    names = soft_cmutils.get_view_via_cachemanager(False, KEY, 'interfaces', VIEWS, ttl, func, 'arg', option=1)
+    assert names == [f'eth{index}' for index in range(50)]
+    assert func.call_count == 1
+    # only the views are stored, each under its own key
+    backend = CacheManagerUtils.backend
+    assert backend.get_data(hash_string(KEY), 0)['lock']
+    stored = backend.get_data(hash_string(CacheManagerUtils.view_key(KEY, 'interfaces')), 0)['data']
+    assert len(stored) < len(json.dumps(INVENTORY)) / 20
+
+
+def test_cache_manager_utils_get_view_single(mocker, soft_cmutils):
+    func = mocker.Mock(return_value=INVENTORY)
+    views = {'uptime': VIEWS['uptime']}
+    assert soft_cmutils.get_view_via_cachemanager(False, KEY, 'uptime', views, TTL, func) == 7
+    assert soft_cmutils.get_view_via_cachemanager(False, KEY, 'uptime', views, TTL, func) == 7
+    assert func.call_count == 1
+    with pytest.raises(ValueError):
+        soft_cmutils.get_view_via_cachemanager(False, KEY, 'disks', views, TTL, func)
+
+
+def test_cache_manager_utils_get_view_no_cachemanager(mocker):
+    mocker.patch.object(CacheManagerUtils, 'host', None)
+    func = mocker.Mock(return_value=INVENTORY)
+    assert CacheManagerUtils.get_view_via_cachemanager(True, KEY, 'uptime', VIEWS, TTL, func) == 7
+
+
+def test_cache_manager_utils_get_view_store_failure(mocker, soft_cmutils):
+    mocker.patch.object(CacheManagerUtils.backend, 'set_many', side_effect=ResultError('Failed'))
+    func = mocker.Mock(return_value=INVENTORY)
+    # the views stored for the next checks are an optimisation, failing to store them does not fail the check
+    assert soft_cmutils.get_view_via_cachemanager(False, KEY, 'uptime', VIEWS, TTL, func) == 7
+    assert soft_cmutils.get_view_via_cachemanager(False, KEY, 'interfaces', VIEWS, TTL, func)[0] == 'eth0'
+    assert func.call_count == 2
@@ -0,0 +1,85 @@
+"""
+Unit tests for PlugNPy cachestats.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import json
+import os
+
+import pytest
+
+from plugnpy.cachestats import CacheStats
+from plugnpy.check import Check
+
+
+@pytest.mark.parametrize('response, seconds, counters', [
+    pytest.param({'data': '"data"', 'lock': None}, 0.01, {'hits': 1}, id="hit"),
+    pytest.param({'data': None, 'lock': True}, 0.01, {'locks': 1}, id="lock"),
+    pytest.param({'data': '"data"', 'lock': None}, 2.0, {'lock_waits': 1, 'lock_wait_time': 2.0}, id="lock_wait"),
+    pytest.param({'data': None, 'lock': None}, 30.0, {'lock_timeouts': 1, 'lock_wait_time': 30.0}, id="timeout"),
+])
+def test_cache_stats_record_lookup(response, seconds, counters):
+    stats = CacheStats()
+    stats.record_lookup(response, seconds)
+    assert {name: value for name, value in stats.counters.items() if value} == counters
+
+
+def test_cache_stats_record_call():
+    stats = CacheStats()
+    assert stats.hit_ratio() is None
+    stats.record_call('get_data', 0.5, 10, 100)
+    stats.record_call('get_data', 1.5, 10, 0, error=True)
+    stats.record_fetch(3.0)
+    stats.record_fetch(1.0, error=True)
+    stats.increment('local_hits', 3)
+    stats.increment('locks')
+    assert stats.as_dict()['calls'] == {
+        'get_data': {'count': 2, 'errors': 1, 'time': 2.0, 'max_time': 1.5, 'bytes_sent': 20, 'bytes_received': 100},
+    }
+    assert stats.counters['fetches'] == 2
+    assert stats.counters['fetch_time'] == 4.0
+    assert stats.counters['fetch_errors'] == 1
+    assert stats.hit_ratio() == 75.0
+
+
+def test_cache_stats_attach(capsys):
+    stats = CacheStats(prefix='cm_')
+    stats.record_call('get_data', 0.25, 10, 100)
+    stats.record_lookup({'data': '"data"', 'lock': None}, 0.01)
+    check = Check()
+    check.add_metric('CPU', 7, '%')
+    stats.attach(check)
+    # the counters recorded until the output is written are included
+    stats.increment('local_hits')
+    with pytest.raises(SystemExit) as ex:
+        check.final()
+    assert ex.value.code == 0
+    summary, perf_data = capsys.readouterr().out.rstrip(os.linesep).split(' | ')
+    assert summary == 'METRIC OK - CPU is 7.00%'
+    assert perf_data.split(' ') == [
+        'CPU=7.00%', 'cm_local_hits=1', 'cm_hits=1', 'cm_lock_waits=0', 'cm_lock_wait_time=0.000s', 'cm_locks=0',
+        'cm_lock_timeouts=0', 'cm_fetches=0', 'cm_fetch_time=0.000s', 'cm_fetch_errors=0', 'cm_hit_ratio=100.000%',
+        'cm_get_data_calls=1', 'cm_get_data_errors=0', 'cm_get_data_time=0.250s', 'cm_get_data_max_time=0.250s',
+        'cm_bytes_sent=10B', 'cm_bytes_received=100B',
+    ]
+
+
+def test_cache_stats_dump(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    first, second = CacheStats(), CacheStats()
+    first.record_call('get_data', 0.5, 10, 100)
+    first.record_lookup({'data': None, 'lock': True}, 0.5)
+    second.record_call('get_data', 1.5, 10, 200)
+    second.record_call('set_data', 0.1, 300, 20)
+    second.record_lookup({'data': '"data"', 'lock': None}, 1.5)
+    first.dump(path)
+    total = second.dump(path)
+    with open(path, encoding='utf-8') as stats_file:
+        assert json.load(stats_file) == total
+    assert total['checks'] == 2
+    assert total['counters']['locks'] == 1
+    assert total['counters']['lock_waits'] == 1
+    assert total['calls'] == {
+        'get_data': {'count': 2, 'errors': 0, 'time': 2.0, 'max_time': 1.5, 'bytes_sent': 20, 'bytes_received': 300},
+        'set_data': {'count': 1, 'errors': 0, 'time': 0.1, 'max_time': 0.1, 'bytes_sent': 300, 'bytes_received': 20},
+    }
@@ -4,9 +4,12 @@ Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
 """
 
 import os
+import threading
+import time
 import pytest
 
 from plugnpy.check import Check
+from plugnpy.deadline import remaining_time, reset_deadline, set_deadline
 from plugnpy.metric import Metric
 from plugnpy.exception import InvalidMetricName
 
@@ -107,3 +110,215 @@ def test_final_per_second_UOM(capsys):
             os.linesep
         )
     )
+
+
+def test_add_metrics(capsys):
+    check = Check()
+    check.add_metric('CPU', 7, '%', '20:', '50:')
+    check.add_metrics(['eth0', 'eth1'], [512, 4500000], 'B', '1MB', '4MB', summary_precision=1)
+    check.add_message('eth1 is busy')
+    assert len(check.metrics) == 2
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 2
+    assert capsys.readouterr().out == (
+        'METRIC CRITICAL - CPU is 7.00%, eth0 is 512.0B, eth1 is busy | '
+        'CPU=7.00%;20:;50: eth0=512.00B;1MB;4MB eth1=4500000.00B;1MB;4MB{0}'.format(os.linesep)
+    )
+
+
+def test_final_max_output_bytes(capsys):
+    check = Check(max_output_bytes=110)
+    check.add_metric('CPU', 7, '%', '20', '50')
+    check.add_metrics(['eth0', 'eth1', 'eth2'], [512, 4500000, 1024], 'B', '1MB', '4MB')
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 2
+    output = capsys.readouterr().out
+    assert output == (
+        'METRIC CRITICAL - CPU is 7.00%, eth0 is 512.00B, eth1 is 4.29MB, eth2 is 1.00KB | '
+        'eth1=4500000.00B;1MB;4MB{0}'.format(os.linesep)
+    )
+
+
+def test_state_tracking():
+    check = Check()
+    assert check.state == 0
+    assert check.state_counts == {0: 0, 1: 0, 2: 0, 3: 0}
+    check.add_metric('CPU', 7, '%', '20', '50')
+    assert check.state == 0
+    check.add_metrics(['eth0', 'eth1', 'eth2'], [5, 25, 30], '', '10', '20')
+    assert check.state == 2
+    check.add_metric_obj(Metric('Memory', 15, '%', '10', '20'))
+    assert check.state == 2
+    assert check.state_counts == {0: 2, 1: 1, 2: 2, 3: 0}
+
+
+def test_state_of_metrics_changed_directly(capsys):
+    check = Check()
+    check.add_metric('CPU', 7, '%', '20', '50')
+    # metrics appended to the list directly are tracked too
+    check.metrics.append(Metric('Memory', 15, '%', '10', '20'))
+    assert check.state == 1
+    assert check.state_counts == {0: 1, 1: 1, 2: 0, 3: 0}
+    check.add_metric('Disk', 1, '%', '20', '50')
+    assert check.state_counts == {0: 2, 1: 1, 2: 0, 3: 0}
+    # as are the states changed after the metrics were added
+    check.metrics[0].state = Metric.STATUS_CRITICAL
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 2
+    assert capsys.readouterr().out.startswith('METRIC CRITICAL - ')
+
+
+def test_final_uses_tracked_states(mocker, capsys):
+    check = Check()
+    check.add_metrics(['eth0', 'eth1'], [5, 25], '', '10', '20')
+    check.add_metric('CPU', 7, '%', '20', '50')
+    check.add_unknown('Disk', 'Disk failed')
+    track_all = mocker.spy(check, '_track_all')
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 3
+    assert not track_all.called
+    assert capsys.readouterr().out.startswith('METRIC UNKNOWN - ')
+
+
+def test_collect_invalid_metric_names(capsys):
+    def fail():
+        raise Exception('timeout')
+
+    check = Check()
+    assert check.collect({"disk='/'": fail, 'a"b': fail}) == {}
+    assert [metric.name for metric in check.metrics] == ["disk__/_", 'a_b']
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 3
+    assert capsys.readouterr().out == (
+        'METRIC UNKNOWN - disk=\'/\' collector failed: timeout, a"b collector failed: timeout{0}'.format(os.linesep)
+    )
+
+
+def test_final_empty(capsys):
+    with pytest.raises(SystemExit) as e:
+        Check().final()
+    assert e.value.code == 0
+    assert capsys.readouterr().out == 'METRIC OK - {0}'.format(os.linesep)
+
+
+def test_collect(capsys):
+    def fail():
+        raise Exception('connection refused')
+
+    check = Check()
+    results = check.collect({'stats': lambda: 42, 'alarms': fail})
+    assert results == {'stats': 42}
+    check.add_metric('Stats', results['stats'], '')
+    assert check.state == 3
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 3
+    assert capsys.readouterr().out == (
+        'METRIC UNKNOWN - alarms collector failed: connection refused, Stats is 42.00 | Stats=42.00{0}'.format(
+            os.linesep)
+    )
+
+
+@pytest.fixture
+def no_deadline():
+    token = set_deadline(None)
+    yield
+    reset_deadline(token)
+
+
+def test_deadline_partial_results(capsys, mocker, no_deadline):
+    exited = threading.Event()
+    mock_exit = mocker.patch('plugnpy.check.os._exit', side_effect=lambda code: exited.set())
+    check = Check(deadline=0.1)
+    check.add_metric('CPU', 7, '%', '20', '50')
+    # the output is written from the timer thread, a little before the deadline
+    assert exited.wait(5)
+    assert remaining_time() > 0
+    mock_exit.assert_called_once_with(3)
+    assert capsys.readouterr().out == (
+        'METRIC UNKNOWN - Partial results, check did not complete within 0.1s, CPU is 7.00% | CPU=7.00%;20;50{0}'.format(
+            os.linesep)
+    )
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 3
+    assert capsys.readouterr().out == ''
+    assert remaining_time() is None
+
+
+def test_deadline_partial_results_signal(capsys, no_deadline):
+    check = Check(deadline=0.1, deadline_signal=True)
+    check.add_metric('CPU', 7, '%', '20', '50')
+    with pytest.raises(SystemExit) as e:
+        time.sleep(5)
+    assert e.value.code == 3
+    assert capsys.readouterr().out.startswith('METRIC UNKNOWN - Partial results, check did not complete within 0.1s')
+    assert remaining_time() is None
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 3
+    assert capsys.readouterr().out == ''
+
+
+def test_deadline_not_reached(capsys, no_deadline):
+    check = Check(deadline=0.2)
+    check.add_metric('CPU', 7, '%', '20', '50')
+    assert 0 < remaining_time() <= 0.2
+    with pytest.raises(SystemExit) as e:
+        check.final()
+    assert e.value.code == 0
+    assert remaining_time() is None
+    time.sleep(0.3)
+    assert capsys.readouterr().out == 'METRIC OK - CPU is 7.00% | CPU=7.00%;20;50{0}'.format(os.linesep)
+
+
+@pytest.mark.parametrize('deadline, fires_at', [
+    pytest.param(1, 0.9, id="short"),
+    pytest.param(30, 29.5, id="long"),
+])
+def test_deadline_output_margin(deadline, fires_at, no_deadline):
+    check = Check(deadline=deadline)
+    assert check._watchdog.seconds == pytest.approx(fires_at)
+    check._watchdog.cancel()
+
+
+def test_exit_twice_without_deadline(capsys):
+    check = Check()
+    for _ in range(2):
+        with pytest.raises(SystemExit) as e:
+            check.exit_warning('something')
+        assert e.value.code == 1
+        assert capsys.readouterr().out == 'METRIC WARNING - something{0}'.format(os.linesep)
+    check.add_metric('CPU', 7, '%', '20', '50')
+    for _ in range(2):
+        with pytest.raises(SystemExit) as e:
+            check.final()
+        assert e.value.code == 0
+        assert capsys.readouterr().out == 'METRIC OK - CPU is 7.00% | CPU=7.00%;20;50{0}'.format(os.linesep)
+
+
+def test_deadline_from_thread(capsys, mocker):
+    mock_exit = mocker.patch('plugnpy.check.os._exit')
+    checks = []
+    thread = threading.Thread(target=lambda: checks.append(Check(deadline=0.05)))
+    thread.start()
+    thread.join()
+    time.sleep(0.3)
+    mock_exit.assert_called_once_with(3)
+    assert capsys.readouterr().out.startswith('METRIC UNKNOWN - Partial results')
+
+
+def test_collect_deadline(no_deadline):
+    check = Check(deadline=5)
+    check.deadline.expires_at = time.monotonic() + 0.1
+    hang = threading.Event()
+    results = check.collect({'slow': hang.wait, 'remaining': lambda: remaining_time()}, max_workers=1)
+    hang.set()
+    check._watchdog.cancel()
+    assert results == {}
+    assert check.state_counts[3] == 2
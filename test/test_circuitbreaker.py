@@ -0,0 +1,109 @@
+"""
+Unit tests for PlugNPy circuitbreaker.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import json
+
+import pytest
+
+from socket import error as SocketError
+from plugnpy.circuitbreaker import CircuitBreaker, circuit_guard
+from plugnpy.exception import CircuitOpenError
+
+
+@pytest.fixture
+def now(mocker):
+    now = mocker.patch('plugnpy.circuitbreaker.time.time', return_value=1000.0)
+    yield now
+
+
+@pytest.fixture
+def breaker(tmp_path, now):
+    yield CircuitBreaker(str(tmp_path / 'cachemanager.circuit'), failure_threshold=3, cool_off=30, probe_timeout=10)
+
+
+def test_circuit_breaker_opens(breaker, tmp_path):
+    assert breaker.allow()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    # a success resets the failures in a row
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.is_open()
+    # the state is shared with the other processes through the file
+    other = CircuitBreaker(breaker.path)
+    assert not other.allow()
+    assert json.loads((tmp_path / 'cachemanager.circuit').read_text()) == {'failures': 3, 'open_until': 1030.0}
+
+
+def test_circuit_breaker_probe(breaker, now):
+    for _ in range(3):
+        breaker.record_failure()
+    now.return_value = 1030.0
+    # a single probe is let through after the cool-off
+    assert breaker.allow()
+    assert not breaker.allow()
+    # the probe failed, the circuit opens again straight away
+    breaker.record_failure()
+    now.return_value = 1059.0
+    assert not breaker.allow()
+    now.return_value = 1060.0
+    assert breaker.allow()
+    # another probe is let through if the first one does not report its result in time
+    now.return_value = 1070.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.allow()
+    assert not breaker.is_open()
+
+
+@pytest.mark.parametrize('content', ['', 'not json', '{"failures": 1}'])
+def test_circuit_breaker_corrupt_state(content, breaker, tmp_path):
+    (tmp_path / 'cachemanager.circuit').write_text(content)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert json.loads((tmp_path / 'cachemanager.circuit').read_text()) == {'failures': 1, 'open_until': 0}
+    breaker.reset()
+    assert json.loads((tmp_path / 'cachemanager.circuit').read_text()) == {'failures': 0, 'open_until': 0}
+
+
+@pytest.mark.parametrize('error, recorded', [
+    pytest.param(None, 'record_success', id="success"),
+    pytest.param(SocketError, 'record_failure', id="socket_error"),
+    pytest.param(ValueError, None, id="other_error"),
+])
+def test_circuit_guard(error, recorded, mocker):
+    breaker = mocker.Mock()
+    breaker.allow.return_value = True
+    if error:
+        with pytest.raises(error), circuit_guard(breaker, 'cache manager'):
+            raise error()
+    else:
+        with circuit_guard(breaker, 'cache manager'):
+            pass
+    assert breaker.record_success.called == (recorded == 'record_success')
+    assert breaker.record_failure.called == (recorded == 'record_failure')
+    breaker.allow.return_value = False
+    with pytest.raises(CircuitOpenError) as ex, circuit_guard(breaker, 'cache manager'):
+        pytest.fail("The call must not be made")
+    assert 'Not calling the cache manager, its circuit breaker is open' in str(ex.value)
+    with circuit_guard(None, 'cache manager'):
+        pass
+
+
+def test_circuit_breaker_for_server(breaker):
+    node_a = breaker.for_server('node-a:8181')
+    node_b = breaker.for_server('node-b:8181')
+    assert node_a.path != node_b.path and node_a.path.startswith(breaker.path)
+    assert node_a.path == breaker.for_server('node-a:8181').path
+    assert (node_a.failure_threshold, node_a.cool_off, node_a.probe_timeout) == (3, 30, 10)
+    for _ in range(3):
+        node_a.record_failure()
+    assert node_a.is_open()
+    assert not node_b.is_open() and not breaker.is_open()
@@ -0,0 +1,75 @@
+"""
+Unit tests for PlugNPy collector.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import threading
+import time
+
+from plugnpy.collector import CollectorPool
+from plugnpy.exception import CollectorTimeout
+
+
+def _fail():
+    raise ValueError('no route to host')
+
+
+def test_collector_pool():
+    results, errors = CollectorPool({'stats': lambda: 1, 'inventory': lambda: [2], 'alarms': _fail}).run()
+    assert results == {'stats': 1, 'inventory': [2]}
+    assert list(errors) == ['alarms']
+    assert isinstance(errors['alarms'], ValueError)
+
+
+def test_collector_pool_concurrent():
+    barrier = threading.Barrier(3, timeout=5)
+    start = time.monotonic()
+    results, errors = CollectorPool({name: barrier.wait for name in ('a', 'b', 'c')}, max_workers=3).run()
+    assert sorted(results.values()) == [0, 1, 2]
+    assert not errors
+    assert time.monotonic() - start < 5
+
+
+def test_collector_pool_timeout():
+    hang = threading.Event()
+    start = time.monotonic()
+    results, errors = CollectorPool(
+        {'slow': hang.wait, 'fast': lambda: 'ok', 'queued': lambda: 'done'},
+        timeout={'slow': 0.1}, max_workers=1).run()
+    hang.set()
+    assert time.monotonic() - start < 5
+    assert results == {'fast': 'ok', 'queued': 'done'}
+    assert isinstance(errors['slow'], CollectorTimeout)
+    assert str(errors['slow']) == 'timed out after 0.1s'
+
+
+def test_collector_pool_abandoned_worker():
+    lock = threading.Lock()
+    running = []
+    most = []
+
+    def collector(seconds):
+        def run():
+            with lock:
+                running.append(seconds)
+                most.append(len(running))
+            time.sleep(seconds)
+            with lock:
+                running.remove(seconds)
+            return seconds
+        return run
+
+    # the worker of the collector timing out must not take another collector once it returns
+    results, errors = CollectorPool(
+        {'slow': collector(0.3), 'long': collector(0.4), 'next': collector(0.01), 'last': collector(0.01)},
+        timeout={'slow': 0.1}, max_workers=1).run()
+    time.sleep(0.1)
+    assert results == {'long': 0.4, 'next': 0.01, 'last': 0.01}
+    assert isinstance(errors['slow'], CollectorTimeout)
+    assert max(most) == 2
+    # only the abandoned collector ran next to the others
+    assert most.count(2) == 1
+
+
+def test_collector_pool_empty():
+    assert CollectorPool({}).run() == ({}, {})
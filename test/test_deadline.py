@@ -0,0 +1,126 @@
+"""
+Unit tests for PlugNPy deadline.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import signal
+import threading
+import time
+
+import pytest
+
+from plugnpy.deadline import (
+    Deadline, Watchdog, deadline_scope, deadline_timeout, get_deadline, remaining_time, reset_deadline, set_deadline,
+)
+from plugnpy.exception import DeadlineExceeded
+
+
+def test_deadline(mocker):
+    mock_time = mocker.patch('plugnpy.deadline.time.monotonic', return_value=100.0)
+    deadline = Deadline(10)
+    assert deadline.remaining() == 10.0
+    assert not deadline.expired()
+    mock_time.return_value = 111.0
+    assert deadline.remaining() == 0.0
+    assert deadline.expired()
+
+
+def test_remaining_time():
+    assert get_deadline() is None
+    assert remaining_time() is None
+    assert remaining_time(30) == 30
+    deadline = Deadline(10)
+    token = set_deadline(deadline)
+    try:
+        assert get_deadline() is deadline
+        assert 9 < remaining_time(30) <= 10
+    finally:
+        reset_deadline(token)
+    assert get_deadline() is None
+
+
+def test_watchdog_signal():
+    calls = []
+    watchdog = Watchdog(0.05, calls.append, use_signal=True)
+    watchdog.start()
+    time.sleep(0.5)
+    watchdog.cancel()
+    assert calls == [True]
+    assert signal.getsignal(signal.SIGALRM) is signal.SIG_DFL
+
+
+@pytest.mark.parametrize('use_signal', [True, False])
+def test_watchdog_cancel(use_signal):
+    calls = []
+    watchdog = Watchdog(0.05, calls.append, use_signal=use_signal)
+    watchdog.start()
+    watchdog.cancel()
+    time.sleep(0.2)
+    assert calls == []
+
+
+def test_watchdog_keeps_alarm():
+    alarms = []
+    previous = signal.signal(signal.SIGALRM, lambda signum, frame: alarms.append(signum))
+    try:
+        # by default the watchdog does not take over SIGALRM, so the alarm of the plugin still fires
+        signal.setitimer(signal.ITIMER_REAL, 0.1)
+        called = threading.Event()
+        watchdog = Watchdog(0.05, lambda in_main_thread: called.set())
+        watchdog.start()
+        assert called.wait(5)
+        time.sleep(0.2)
+        assert alarms == [signal.SIGALRM]
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def test_watchdog_thread():
+    called = threading.Event()
+    calls = []
+
+    def callback(in_main_thread):
+        calls.append(in_main_thread)
+        called.set()
+
+    watchdog = Watchdog(0.05, callback)
+    thread = threading.Thread(target=watchdog.start)
+    thread.start()
+    thread.join()
+    assert called.wait(5)
+    assert calls == [False]
+
+
+@pytest.mark.parametrize('current, deadline, expected', [
+    pytest.param(None, None, None, id="no_deadline"),
+    pytest.param(None, 5, 5, id="call_deadline"),
+    pytest.param(10, None, 10, id="context_deadline"),
+    pytest.param(10, 5, 5, id="call_deadline_earlier"),
+    pytest.param(5, 10, 5, id="context_deadline_earlier"),
+])
+def test_deadline_scope(current, deadline, expected):
+    token = set_deadline(Deadline(current) if current else None)
+    try:
+        with deadline_scope(deadline) as scoped:
+            assert (scoped.seconds if scoped else None) == expected
+            assert get_deadline() is scoped
+        assert (get_deadline().seconds if get_deadline() else None) == current
+    finally:
+        reset_deadline(token)
+
+
+def test_deadline_timeout():
+    gevent = pytest.importorskip('gevent')
+    with deadline_timeout('sleep'):
+        gevent.sleep(0)
+    with deadline_scope(0.05):
+        with pytest.raises(DeadlineExceeded) as ex:
+            with deadline_timeout('sleep'):
+                gevent.sleep(1)
+        assert 'Deadline exceeded while trying to sleep' in str(ex.value)
+    with deadline_scope(Deadline(-1)):
+        with pytest.raises(DeadlineExceeded) as ex:
+            with deadline_timeout('sleep'):
+                pass
+        assert 'No time left to sleep' in str(ex.value)
@@ -0,0 +1,111 @@
+"""
+Unit tests for PlugNPy filecache.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import threading
+
+import pytest
+
+from plugnpy.filecache import LocalFileCache
+
+NAMESPACE = 'some-namespace'
+KEY = 'key'
+DATA = '{"value": 2112}'
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    yield str(tmp_path / 'cache.db')
+
+
+@pytest.fixture
+def filecache(db_path):
+    cache = LocalFileCache(db_path, NAMESPACE)
+    yield cache
+    cache.close()
+
+
+def test_file_cache_lock_and_set(db_path, filecache):
+    other = LocalFileCache(db_path, NAMESPACE)
+    try:
+        assert filecache.get_data(KEY) == {'data': None, 'lock': True}
+        assert other.get_data(KEY, max_wait_time=0.1) == {'data': None, 'lock': None}
+        filecache.set_data(KEY, DATA, 900)
+        assert other.get_data(KEY, max_wait_time=0.1) == {'data': DATA, 'lock': None, 'ttl': pytest.approx(900, abs=1)}
+        assert filecache.status() == {'path': db_path, 'entries': 1}
+    finally:
+        other.close()
+
+
+def test_file_cache_waits_for_lock_holder(db_path, filecache):
+    other = LocalFileCache(db_path, NAMESPACE)
+    responses = []
+    try:
+        assert filecache.get_data(KEY) == {'data': None, 'lock': True}
+        waiter = threading.Thread(target=lambda: responses.append(other.get_data(KEY, max_wait_time=5)))
+        waiter.start()
+        filecache.set_data(KEY, DATA, 900)
+        waiter.join(5)
+        assert responses == [{'data': DATA, 'lock': None, 'ttl': pytest.approx(900, abs=1)}]
+    finally:
+        other.close()
+
+
+def test_file_cache_lock_released_on_close(db_path, filecache):
+    other = LocalFileCache(db_path, NAMESPACE)
+    assert other.get_data(KEY) == {'data': None, 'lock': True}
+    other.close()
+    assert filecache.get_data(KEY, max_wait_time=0.1) == {'data': None, 'lock': True}
+
+
+def test_file_cache_namespaces(db_path, filecache):
+    other = LocalFileCache(db_path, 'other-namespace')
+    try:
+        filecache.get_data(KEY)
+        filecache.set_data(KEY, DATA, 900)
+        assert other.get_data(KEY, max_wait_time=0.1) == {'data': None, 'lock': True}
+    finally:
+        other.close()
+
+
+def test_file_cache_ttl(mocker, filecache):
+    mock_time = mocker.patch('plugnpy.filecache.time.time', return_value=1000.0)
+    filecache.get_data(KEY)
+    filecache.set_data(KEY, DATA, 10)
+    mock_time.return_value = 1009.9
+    assert filecache.get_data(KEY, max_wait_time=0) == {'data': DATA, 'lock': None, 'ttl': pytest.approx(0.1)}
+    assert filecache.status()['entries'] == 1
+    mock_time.return_value = 1010.0
+    assert filecache.status()['entries'] == 0
+    assert filecache.get_data(KEY, max_wait_time=0) == {'data': None, 'lock': True}
+
+
+def test_file_cache_deadline(filecache, db_path):
+    other = LocalFileCache(db_path, NAMESPACE)
+    try:
+        filecache.get_data(KEY)
+        assert other.get_data(KEY, max_wait_time=30, deadline=0.1) == {'data': None, 'lock': None}
+    finally:
+        other.close()
+
+
+def test_file_cache_get_set_many(db_path, filecache):
+    other = LocalFileCache(db_path, NAMESPACE)
+    try:
+        filecache.get_data('a')
+        filecache.set_data('a', DATA, 900)
+        other.get_data('c')
+        assert filecache.get_many(['a', 'b', 'c'], max_wait_time=0.1) == {
+            'a': {'data': DATA, 'lock': None, 'ttl': pytest.approx(900, abs=1)},
+            'b': {'data': None, 'lock': True},
+            'c': {'data': None, 'lock': None},
+        }
+        filecache.set_many({'b': '1', 'd': '2'}, 900)
+        assert other.get_many(['b', 'd'], max_wait_time=0) == {
+            'b': {'data': '1', 'lock': None, 'ttl': pytest.approx(900, abs=1)},
+            'd': {'data': '2', 'lock': None, 'ttl': pytest.approx(900, abs=1)},
+        }
+        assert filecache.status()['entries'] == 3
+    finally:
+        other.close()
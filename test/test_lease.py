@@ -0,0 +1,202 @@
+"""
+Unit tests for PlugNPy lease.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import asyncio
+import json
+import time
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from plugnpy.asynccachemanager import AsyncCacheManagerUtils
+from plugnpy.cachemanager import CacheManagerUtils, CacheManagerClient
+from plugnpy.exception import ResultError
+from plugnpy.filecache import LocalFileCache
+from plugnpy.lease import LockLease
+from plugnpy.standin import StandInServer
+from .test_asynccachemanager import _client
+
+NAMESPACE = 'some-namespace'
+
+
+@pytest.fixture
+def server():
+    # the locks without a lease expire quickly
+    with StandInServer(lock_timeout=0.3) as standin:
+        yield standin
+
+
+@pytest.fixture
+def utils(mocker, server):
+    host, port = server.address
+    for cls in (CacheManagerUtils, AsyncCacheManagerUtils):
+        mocker.patch.object(cls, 'host', host)
+        mocker.patch.object(cls, 'port', port)
+        mocker.patch.object(cls, 'namespace', NAMESPACE)
+        mocker.patch.object(cls, 'client', None)
+    # each call behaves as a separate plugin process, with its own connection
+    client = CacheManagerClient(host, port, NAMESPACE, concurrency=4, transport='http')
+    mocker.patch.object(CacheManagerUtils, '_get_backend', return_value=client)
+    mocker.patch.object(CacheManagerUtils, 'local_cache', None)
+    mocker.patch.object(CacheManagerUtils, 'single_flight', None)
+    yield CacheManagerUtils
+    client.close()
+
+
+def test_lock_lease_renewals(mocker):
+    client = mocker.Mock()
+    client.renew_lock.side_effect = lambda key, lease: key == 'a'
+    with LockLease(client, ['a', 'b'], lease=0.15) as lease:
+        time.sleep(0.3)
+    assert lease.renewals >= 2
+    assert lease.keys == ['a']
+    assert client.renew_lock.call_args_list[:3] == [
+        mocker.call('a', 0.15), mocker.call('b', 0.15), mocker.call('a', 0.15),
+    ]
+
+
+def test_lock_lease_stops_when_lost(mocker):
+    client = mocker.Mock()
+    client.renew_lock.side_effect = [ConnectionRefusedError('down'), False]
+    with LockLease(client, ['a'], interval=0.02) as lease:
+        time.sleep(0.2)
+    assert lease.renewals == 1
+    assert lease.keys == []
+    assert client.renew_lock.call_count == 2
+
+
+@pytest.mark.parametrize('status, body, expected, sent', [
+    pytest.param(200, {'success': True}, True, 2, id="renewed"),
+    pytest.param(200, {'success': False}, False, 2, id="lost"),
+    pytest.param(404, None, False, 1, id="unsupported"),
+])
+def test_cache_manager_client_renew_lock(status, body, expected, sent, mocker):
+    mocker.patch('plugnpy.cachemanager.get_transport')
+    client = CacheManagerClient('a.host', 1234, NAMESPACE, transport='http')
+    client._http_client.cooperative = False
+    response = mocker.Mock(status_code=status, status_message='')
+    response.read.return_value = body and '{"success": %s}' % str(body['success']).lower()
+    client._http_client.post.return_value = response
+    assert client.renew_lock('key', 10) is expected
+    assert client.renew_lock('key', 10) is expected
+    assert client._http_client.post.call_count == sent
+    args, kwargs = client._http_client.post.call_args
+    assert args == ('renew_lock',)
+    assert json.loads(kwargs['body']) == {'namespace': NAMESPACE, 'key': 'key', 'lease': 10}
+
+
+def test_local_file_cache_renew_lock(tmp_path):
+    cache = LocalFileCache(str(tmp_path / 'cache.db'), NAMESPACE)
+    assert cache.get_data('key', 0)['lock']
+    assert cache.renew_lock('key')
+    cache.set_data('key', 'data')
+    assert not cache.renew_lock('key')
+    cache.close()
+
+
+@pytest.mark.parametrize('lock_lease, calls', [
+    pytest.param(0.3, 1, id="lease"),
+    pytest.param(None, 2, id="no_lease"),
+])
+def test_get_via_cachemanager_lock_lease(lock_lease, calls, mocker, utils):
+    mocker.patch.object(CacheManagerUtils, 'lock_lease', lock_lease)
+    computed = []
+
+    def func():
+        computed.append(1)
+        time.sleep(0.8)
+        return 'data'
+
+    def get(delay):
+        time.sleep(delay)
+        return utils.get_via_cachemanager(False, 'key', 60, func)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(get, [0, 0.1]))
+    assert results == ['data', 'data']
+    # without a lease, the lock runs out while the data is retrieved, and the waiter retrieves it too
+    assert len(computed) == calls
+
+
+def test_get_many_via_cachemanager_lock_lease(mocker, utils):
+    mocker.patch.object(CacheManagerUtils, 'lock_lease', 0.3)
+    computed = []
+
+    def func(keys):
+        computed.append(keys)
+        time.sleep(0.8)
+        return {key: key.upper() for key in keys}
+
+    def get(delay):
+        time.sleep(delay)
+        return utils.get_many_via_cachemanager(False, ['a', 'b'], 60, func)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(get, [0, 0.1]))
+    assert results == [{'a': 'A', 'b': 'B'}] * 2
+    assert computed == [['a', 'b']]
+
+
+@pytest.mark.parametrize('many', [False, True])
+def test_get_via_cachemanager_max_lease_wait(many, mocker, utils):
+    mocker.patch.object(CacheManagerUtils, 'lock_lease', 0.3)
+    mocker.patch.object(CacheManagerUtils, 'max_lease_wait', 1)
+
+    def func(*args):
+        time.sleep(2.5)
+        return {'a': 'A'} if many else 'A'
+
+    def get(delay):
+        time.sleep(delay)
+        if many:
+            return utils.get_many_via_cachemanager(False, ['a'], 60, func)['a']
+        return utils.get_via_cachemanager(False, 'a', 60, func)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        holder = executor.submit(get, 0)
+        waiter = executor.submit(get, 0.1)
+        # the waiter gives up although the lock holder keeps renewing its lease
+        with pytest.raises(ResultError):
+            waiter.result(timeout=2.2)
+        assert holder.result() == 'A'
+
+
+def test_async_get_via_cachemanager_lock_lease(mocker, utils, server):
+    mocker.patch.object(CacheManagerUtils, 'lock_lease', 0.3)
+    computed = []
+
+    async def func():
+        computed.append(1)
+        await asyncio.sleep(0.8)
+        return 'data'
+
+    async def get(delay):
+        await asyncio.sleep(delay)
+        return await AsyncCacheManagerUtils.get_via_cachemanager(False, 'key', 60, func)
+
+    async def run():
+        try:
+            return await asyncio.gather(get(0), get(0.1))
+        finally:
+            await AsyncCacheManagerUtils.client.close()
+
+    assert asyncio.run(run()) == ['data', 'data']
+    assert computed == [1]
+    assert server.stats()['lease_renewals'] > 0
+
+
+def test_lease_waiters_take_over_dead_holder(server):
+    async def run():
+        holder, waiter = _client(server), _client(server)
+        assert (await holder.get_data('key'))['lock']
+        assert await holder.renew_lock('key', 0.3)
+        response = await waiter.get_data('key', 0.2)
+        assert response['lock'] is None and 0 < response['lease'] <= 0.3
+        # the holder stops renewing its lease, as if it died, so a waiter gets the lock
+        await asyncio.sleep(0.2)
+        assert (await waiter.get_data('key'))['lock']
+        await holder.close()
+        await waiter.close()
+
+    asyncio.run(run())
@@ -0,0 +1,128 @@
+"""
+Unit tests for PlugNPy loadtest.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import json
+import multiprocessing
+import os
+import time
+import pytest
+
+from plugnpy.loadtest import LoadTestConfig, format_report, main, make_report, run_load_test
+from plugnpy.standin import StandInServer
+
+
+def _call(seconds, fetched=False, error=None):
+    return {'key': 'key-0', 'seconds': seconds, 'fetched': fetched, 'error': error}
+
+
+def _fetch(key, start, end):
+    return {'key': key, 'start': start, 'end': end}
+
+
+def test_make_report():
+    config = LoadTestConfig('host', 1234, processes=2, fetch_time=1)
+    results = [
+        {
+            'started': 100, 'finished': 102,
+            'calls': [_call(1.1, fetched=True), _call(0.01)],
+            'fetches': [_fetch('key-0', 100, 101.1)],
+        },
+        {
+            'started': 100, 'finished': 104,
+            'calls': [_call(1.05), _call(3, fetched=True, error='ResultError: down')],
+            # a fetch of key-1 overlapping the one of key-0 is not part of a herd, the second one of key-1 is
+            'fetches': [_fetch('key-1', 100.5, 103), _fetch('key-1', 101, 103.5), _fetch('key-0', 102, 103)],
+        },
+    ]
+    report = make_report(config, results)
+    assert report['calls'] == 4
+    assert report['errors'] == 1
+    assert report['errors_by_type'] == {'ResultError: down': 1}
+    assert report['duration'] == 4
+    assert report['throughput'] == 1
+    assert report['latency'] == {'p50': 1.05, 'p90': 3, 'p99': 3, 'max': 3}
+    assert report['fetches'] == 4
+    assert report['herd_fetches'] == 1
+    assert report['max_concurrent_fetches'] == 2
+    assert report['lock_waits']['count'] == 1
+    assert report['lock_waits']['histogram']['<=5s'] == 1
+    assert 'server' not in report
+
+    report = make_report(config, results, {
+        'requests': {'get_data': 4}, 'injected_errors': 0, 'dropped': 0, 'locks': {'a': 3},
+        'lock_waits': [0.001, 0.2, 40], 'lock_timeouts': 1, 'lease_renewals': 0,
+    })
+    assert report['lock_waits']['count'] == 3
+    assert report['lock_waits']['histogram']['<=0.01s'] == 1
+    assert report['lock_waits']['histogram']['>30s'] == 1
+    assert report['server']['lock_waits'] == 3
+    text = format_report(report)
+    assert 'herd fetches: 1' in text
+    assert 'error: ResultError: down x1' in text
+    assert 'locks=3 lock_timeouts=1' in text
+
+
+def test_make_report_without_calls():
+    report = make_report(LoadTestConfig('host', 1234), [{'started': 1, 'finished': 1, 'calls': [], 'fetches': []}])
+    assert report['latency'] == {'p50': None, 'p90': None, 'p99': None, 'max': None}
+    assert 'p50=-' in format_report(report)
+    report = make_report(LoadTestConfig('host', 1234), [{'index': 0, 'error': 'Process exited with code 1'}])
+    assert (report['calls'], report['failed_processes']) == (0, 1)
+
+
+def test_run_load_test():
+    with StandInServer() as server:
+        host, port = server.address
+        config = LoadTestConfig(host, port, processes=3, iterations=2, fetch_time=0.3, state_manager=True)
+        report = run_load_test(config, server)
+    assert report['calls'] == 6
+    assert report['errors'] == 0
+    # the processes start together, a single one fetches the data while the others wait for it
+    assert report['fetches'] == 1
+    assert report['herd_fetches'] == 0
+    assert sum(report['server']['locks'].values()) == 1
+    assert report['server']['requests']['store_data'] == 6
+
+
+def _fail_first_process(exit_process):
+    """Returns a side effect failing in the first process of the load test"""
+    def side_effect(*args, **kwargs):
+        if multiprocessing.current_process().name == 'plugnpy-loadtest-0':
+            if exit_process:
+                os._exit(1)
+            raise ValueError('Unknown transport')
+        return None
+    return side_effect
+
+
+@pytest.mark.parametrize('exit_process, error', [
+    pytest.param(False, 'ValueError: Unknown transport', id="raises"),
+    pytest.param(True, 'Process exited with code 1', id="dies"),
+])
+def test_run_load_test_process_failure(exit_process, error, mocker):
+    # the processes are forked, so they run with the patched state manager client
+    mocker.patch('plugnpy.loadtest.multiprocessing.get_context', return_value=multiprocessing.get_context('fork'))
+    mocker.patch('plugnpy.loadtest.StateManagerClient', side_effect=_fail_first_process(exit_process))
+    mocker.patch('plugnpy.loadtest.RESULT_POLL_INTERVAL', 0.1)
+    config = LoadTestConfig(None, None, processes=3, iterations=1, fetch_time=0, state_manager=True, start_timeout=1)
+    start = time.monotonic()
+    report = run_load_test(config)
+    # a process which raises does not make the others wait for it, one which dies makes them wait start_timeout
+    assert time.monotonic() - start < (2 if exit_process else 0.9)
+    assert report['failed_processes'] == 1
+    assert report['process_errors'] == {error: 1}
+    # without a cache manager host, the checks of the other processes fail
+    assert report['calls'] == 2
+    assert report['errors'] == 2
+    assert f'process error: {error} x1' in format_report(report)
+
+
+def test_main(mocker, capsys):
+    run = mocker.patch('plugnpy.loadtest.run_load_test', return_value={'calls': 1})
+    main(['--host', 'a.host', '--port', '1234', '--processes', '5', '--json'])
+    config = run.call_args[0][0]
+    assert (config.host, config.port, config.processes) == ('a.host', 1234, 5)
+    assert run.call_args[0][1] is None
+    assert json.loads(capsys.readouterr().out) == {'calls': 1}
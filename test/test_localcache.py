@@ -0,0 +1,69 @@
+"""
+Unit tests for PlugNPy localcache.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import pytest
+
+from plugnpy.localcache import LocalCache
+
+
+@pytest.fixture
+def mock_time(mocker):
+    yield mocker.patch('plugnpy.localcache.time.monotonic', return_value=100.0)
+
+
+def test_local_cache_get_set(mock_time):
+    cache = LocalCache()
+    assert cache.get('a') is None
+    cache.set('a', {'x': 1}, 10, 8)
+    assert cache.get('a') == {'x': 1}
+    cache.set('b', None, 10, 4)
+    assert cache.get('b', 'missing') is None
+    assert cache.stats() == {
+        'hits': 2, 'misses': 1, 'evictions': 0, 'expirations': 0, 'entries': 2, 'size': 12,
+        'max_bytes': cache.max_bytes,
+    }
+
+
+def test_local_cache_ttl(mock_time):
+    cache = LocalCache()
+    cache.set('a', 1, 10, 1)
+    cache.set('b', 2, 0, 1)
+    mock_time.return_value = 109.9
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    mock_time.return_value = 110.0
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_local_cache_lru_eviction(mock_time):
+    cache = LocalCache(max_bytes=10)
+    cache.set('a', 1, 10, 4)
+    cache.set('b', 2, 10, 4)
+    assert cache.get('a') == 1
+    cache.set('c', 3, 10, 4)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    cache.set('d', 4, 10, 11)
+    assert cache.get('d') is None
+    stats = cache.stats()
+    assert (stats['evictions'], stats['size']) == (1, 8)
+
+
+def test_local_cache_replace_delete_clear(mock_time):
+    cache = LocalCache()
+    cache.set('a', 1, 10, 4)
+    cache.set('a', 2, 10, 6)
+    assert cache.get('a') == 2
+    assert cache.stats()['size'] == 6
+    cache.delete('a')
+    cache.delete('missing')
+    assert cache.get('a') is None
+    cache.set('a', 1, 10, 4)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()['misses'] == 0
@@ -7,7 +7,7 @@ import functools
 import pytest
 
 from plugnpy.exception import InvalidMetricThreshold
-from plugnpy.metric import Metric
+from plugnpy.metric import Metric, Threshold
 from .test_base import raise_or_assert
 
 
@@ -181,3 +181,139 @@ def test_invalid_summary_precision(value, error_msg):
 def test_perf_data_type_conversion():
     metric = Metric('metric_name', '1', 'B')
     assert 'metric_name=1.00B' in str(metric.perf_data)
+
+
+@pytest.mark.parametrize('threshold, si_bytes_conversion, expected', [
+    pytest.param('@1:3', False, (1.0, 3.0, False), id="inside_range"),
+    pytest.param('10', False, (0.0, 10.0, True), id="zero_start"),
+    pytest.param('~:5', False, (Metric.N_INF, 5.0, True), id="normal_range"),
+    pytest.param('1KB:2KB', False, (1024.0, 2048.0, True), id="iec_conversion"),
+    pytest.param('1KB:2KB', True, (1000.0, 2000.0, True), id="si_conversion"),
+])
+def test_threshold(threshold, si_bytes_conversion, expected):
+    parsed = Threshold(threshold, si_bytes_conversion)
+    assert (parsed.start, parsed.end, parsed.check_outside_range) == expected
+
+
+def test_threshold_invalid():
+    with pytest.raises(InvalidMetricThreshold):
+        Threshold('bad')
+
+
+@pytest.mark.parametrize('threshold, value, expected', [
+    pytest.param('10', 5, False, id="inside_ok"),
+    pytest.param('10', 11, True, id="outside_ko"),
+    pytest.param('@1:3', 2, True, id="inside_ko"),
+    pytest.param('@1:3', '4', False, id="str_value"),
+])
+def test_threshold_check(threshold, value, expected):
+    assert Threshold(threshold).check(value) == expected
+
+
+def test_threshold_parse_cached():
+    Threshold.cache_clear()
+    first = Threshold.parse('10:20', False)
+    assert Threshold.parse('10:20', False) is first
+    assert Threshold.parse('10:20', True) is not first
+    info = Threshold.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+EVALUATE_MANY_VALUES = [-5, 0, 0.5, 1, 2, 3, 10, 999, 1000, 1024, 1500, 2048, 4096, 1e6, float('inf')]
+
+
+@pytest.mark.parametrize('use_numpy', [
+    pytest.param(True, id="numpy"),
+    pytest.param(False, id="pure_python"),
+])
+@pytest.mark.parametrize('warning_threshold, critical_threshold, si_bytes_conversion', [
+    pytest.param('10', '1000', False, id="upper_limits"),
+    pytest.param('1:', '~:0', False, id="lower_limits"),
+    pytest.param('@1:3', '@2:2', False, id="inside_range"),
+    pytest.param('1KB:2KB', '@4KB:~', False, id="iec_units"),
+    pytest.param('1KB:2KB', '1m:1M', True, id="si_units"),
+    pytest.param('', '10', False, id="no_warning"),
+    pytest.param(None, None, False, id="no_thresholds"),
+])
+def test_evaluate_many(use_numpy, warning_threshold, critical_threshold, si_bytes_conversion, mocker):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        mocker.patch('plugnpy.metric.numpy', None)
+    expected = [
+        Metric.evaluate(value, warning_threshold, critical_threshold, si_bytes_conversion)
+        for value in EVALUATE_MANY_VALUES
+    ]
+    states = Metric.evaluate_many(EVALUATE_MANY_VALUES, warning_threshold, critical_threshold, si_bytes_conversion)
+    assert list(states) == expected
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_evaluate_many_invalid(use_numpy, mocker):
+    if not use_numpy:
+        mocker.patch('plugnpy.metric.numpy', None)
+    with pytest.raises(InvalidMetricThreshold):
+        Metric.evaluate_many([1, 2], 'bad', '10')
+    with pytest.raises(ValueError):
+        Metric.evaluate_many(['GREEN'], '5', '10')
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_evaluate_many_non_numeric_without_thresholds(use_numpy, mocker):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    else:
+        mocker.patch('plugnpy.metric.numpy', None)
+    values = ['GREEN', None, 5]
+    expected = [Metric.evaluate(value, None, None) for value in values]
+    assert list(Metric.evaluate_many(values, None, '')) == expected == [Metric.STATUS_OK] * 3
+
+
+def _convert_value_reference(value, unit, si_bytes_conversion):
+    """The prefix lookup used by Metric.convert_value before the conversion tables were introduced"""
+    value = float(value)
+    if unit in Metric.CONVERTIBLE_UNITS:
+        conversion_factor = Metric._get_conversion_factor(unit, si_bytes_conversion)
+        keys = []
+        if value < 1 and unit in Metric.CONVERTIBLE_UNITS_N:
+            keys = Metric.UNIT_PREFIXES_N
+        elif value > 1 and unit in Metric.CONVERTIBLE_UNITS_P:
+            keys = Metric.UNIT_PREFIXES_P
+        elif unit == Metric.UNIT_SECONDS:
+            return Metric.convert_value(value, unit)
+        for key in keys:
+            multiplication_factor = Metric.DISPLAY_UNIT_FACTORS[key](conversion_factor)
+            if 1.0 / multiplication_factor <= value:
+                return value * multiplication_factor, f'{key}{unit}'
+    return value, unit
+
+
+CONVERT_VALUES = [
+    -1e6, -1, 0, 1e-15, 1e-12, 0.999e-9, 1e-9, 1e-6, 1e-3, 0.5, 1, 1.5, 999, 1000, 1023, 1024, 1025,
+    1024 ** 2 - 1, 1024 ** 2, 1e6, 1e9, 1024 ** 4, 1e15, 1024 ** 6, 1e18, 1e21, 1e24, float('inf'),
+]
+
+
+@pytest.mark.parametrize('unit', ['B', 'b', 'bps', 'Bps', 'B/s', 'B/min', 'W', 'Hz', 's', 'c', '%', ''])
+@pytest.mark.parametrize('si_bytes_conversion', [False, True])
+def test_convert_values(unit, si_bytes_conversion):
+    expected = [_convert_value_reference(value, unit, si_bytes_conversion) for value in CONVERT_VALUES]
+    assert [Metric.convert_value(value, unit, si_bytes_conversion) for value in CONVERT_VALUES] == expected
+    assert Metric.convert_values(CONVERT_VALUES, unit, si_bytes_conversion) == expected
+
+
+def test_convert_values_invalid():
+    with pytest.raises(Exception) as ex:
+        Metric.convert_values([1, 'a'], 'B')
+    assert "Invalid value for value 'a'" in str(ex.value)
+
+
+def test_perf_data_setter():
+    metric = Metric('metric_name', 1, 'B', '10', '20')
+    assert metric.perf_data == 'metric_name=1.00B;10;20'
+    metric.perf_data = 'custom=1'
+    assert metric.perf_data == 'custom=1'
+    # None formats the perf data from the metric again
+    metric.perf_data = None
+    metric.value = 2.0
+    assert metric.perf_data == 'metric_name=2.00B;10;20'
@@ -0,0 +1,76 @@
+"""
+Unit tests for PlugNPy metricbatch.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import pytest
+
+from plugnpy.exception import InvalidMetricName, InvalidMetricThreshold
+from plugnpy.metric import Metric
+from plugnpy.metricbatch import MetricBatch
+
+NAMES = ['eth0', 'eth1', 'eth 2']
+VALUES = [512, 4500000, 2048]
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'pure_python'])
+def use_numpy(request, mocker):
+    if request.param:
+        pytest.importorskip('numpy')
+    else:
+        mocker.patch('plugnpy.metric.numpy', None)
+        mocker.patch('plugnpy.metricbatch.numpy', None)
+    yield request.param
+
+
+@pytest.mark.parametrize('options', [
+    pytest.param({}, id="defaults"),
+    pytest.param({'convert_metric': False, 'summary_precision': 0, 'perf_data_precision': 3}, id="precision"),
+    pytest.param({'si_bytes_conversion': True, 'display_format': '{name}: {value} {unit}'}, id="si_format"),
+])
+def test_metric_batch_matches_metrics(options, use_numpy):
+    batch = MetricBatch(NAMES, VALUES, 'B', '1KB', '4MB', **options)
+    metrics = [Metric(name, value, 'B', '1KB', '4MB', **options) for name, value in zip(NAMES, VALUES)]
+    assert len(batch) == len(NAMES)
+    assert list(batch.summaries()) == [str(metric) for metric in metrics]
+    assert list(batch.perf_data()) == [metric.perf_data for metric in metrics]
+    assert list(batch.states) == [metric.state for metric in metrics]
+    assert batch.state == Metric.STATUS_CRITICAL
+
+
+def test_metric_batch_display_options(use_numpy):
+    batch = MetricBatch(
+        NAMES, VALUES, '%', display_names=['A', 'B', 'C'], display_in_perf=False, display_format='{name}={value}')
+    batch.messages[1] = 'B is fine'
+    assert list(batch.summaries()) == ['A=512.00', 'B is fine', 'C=2048.00']
+    assert list(batch.perf_data()) == []
+    batch.display_in_summary = False
+    assert list(batch.summaries()) == []
+
+
+def test_metric_batch_empty(use_numpy):
+    batch = MetricBatch([], [], 'B', '10', '20')
+    assert len(batch) == 0
+    assert batch.state == Metric.STATUS_OK
+
+
+@pytest.mark.parametrize('names, values, options, raises', [
+    pytest.param(["in'valid"], [1], {}, InvalidMetricName, id="invalid_name"),
+    pytest.param(['a', 'b'], [1], {}, ValueError, id="missing_values"),
+    pytest.param(['a'], [1], {'display_names': ['a', 'b']}, ValueError, id="extra_display_names"),
+    pytest.param(['a'], ['GREEN'], {}, ValueError, id="non_numeric_value"),
+    pytest.param(['a'], [1], {'warning_threshold': 'bad'}, InvalidMetricThreshold, id="invalid_threshold"),
+    pytest.param(['a'], [1], {'summary_precision': 'abc'}, Exception, id="invalid_precision"),
+])
+def test_metric_batch_invalid(names, values, options, raises, use_numpy):
+    with pytest.raises(raises):
+        MetricBatch(names, values, **options)
+
+
+@pytest.mark.parametrize('values, expected', [
+    pytest.param([], {}, id="empty"),
+    pytest.param([1, 15, 25, 30], {0: 1, 1: 1, 2: 2}, id="mixed"),
+])
+def test_metric_batch_state_counts(values, expected, use_numpy):
+    batch = MetricBatch([f'm{i}' for i in range(len(values))], values, '', '10', '20')
+    assert {state: count for state, count in batch.state_counts.items() if count} == expected
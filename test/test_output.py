@@ -0,0 +1,53 @@
+"""
+Unit tests for PlugNPy output.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import io
+import os
+import pytest
+
+from plugnpy.output import OutputWriter
+
+HEADER = 'METRIC CRITICAL - '
+SUMMARIES = ['a is 1', 'b is 2', 'c is 3']
+PERF_DATA = [(0, 'a=1'), (2, 'b=2'), (1, 'c=3')]
+
+
+class BinaryStream(io.StringIO):
+    """Text stream exposing a binary buffer, like sys.stdout"""
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = io.BytesIO()
+
+
+@pytest.mark.parametrize('max_bytes, expected', [
+    pytest.param(None, 'METRIC CRITICAL - a is 1, b is 2, c is 3 | a=1 b=2 c=3', id="no_limit"),
+    pytest.param(1000, 'METRIC CRITICAL - a is 1, b is 2, c is 3 | a=1 b=2 c=3', id="fits"),
+    pytest.param(53, 'METRIC CRITICAL - a is 1, b is 2, c is 3 | b=2 c=3', id="drop_ok_perf"),
+    pytest.param(49, 'METRIC CRITICAL - a is 1, b is 2, c is 3 | b=2', id="keep_worst_perf"),
+    pytest.param(39, 'METRIC CRITICAL - a is 1, b is 2, ...', id="truncate_summary"),
+    pytest.param(26, 'METRIC CRITICAL - ...', id="no_whole_summary"),
+])
+def test_output_writer(max_bytes, expected):
+    stream = BinaryStream()
+    OutputWriter(max_bytes=max_bytes, stream=stream).write(HEADER, SUMMARIES, ', ', PERF_DATA)
+    output = stream.buffer.getvalue()
+    assert output.decode('utf-8') == expected + os.linesep
+    if max_bytes:
+        assert len(output) <= max_bytes
+
+
+def test_output_writer_chunks(mocker):
+    stream = BinaryStream()
+    mocker.spy(stream.buffer, 'write')
+    OutputWriter(chunk_size=8, stream=stream).write(HEADER, SUMMARIES, ', ', PERF_DATA)
+    assert stream.buffer.write.call_count > 1
+    assert stream.buffer.getvalue() == f'{HEADER}a is 1, b is 2, c is 3 | a=1 b=2 c=3{os.linesep}'.encode('utf-8')
+
+
+def test_output_writer_text_stream():
+    stream = io.StringIO()
+    OutputWriter(stream=stream).write(HEADER, ['caf\u00e9'], ', ', [])
+    assert stream.getvalue() == f'{HEADER}caf\u00e9{os.linesep}'
@@ -0,0 +1,72 @@
+"""
+Unit tests for PlugNPy payload.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import json
+
+import pytest
+
+from plugnpy import payload
+from plugnpy.payload import COMPRESSED_PREFIX, PayloadCodec
+
+VALUE = {'datastores': [{'name': f'ds{i}', 'capacity': i * 1024, 'free': None} for i in range(50)], 'ok': True}
+BACKENDS = ['json', pytest.param('orjson', marks=pytest.mark.skipif(payload.orjson is None, reason="no orjson"))]
+
+
+@pytest.mark.parametrize('json_backend', BACKENDS)
+@pytest.mark.parametrize('compress_threshold', [None, 1, 10 ** 6])
+def test_payload_codec_round_trip(json_backend, compress_threshold):
+    codec = PayloadCodec(compress_threshold=compress_threshold, json_backend=json_backend)
+    data = codec.dumps(VALUE)
+    assert isinstance(data, str)
+    assert data.startswith(COMPRESSED_PREFIX) == (compress_threshold == 1)
+    assert PayloadCodec.is_json(data) == (compress_threshold != 1)
+    assert codec.loads(data) == VALUE
+
+
+@pytest.mark.parametrize('json_backend', BACKENDS)
+def test_payload_codec_reads_other_encodings(json_backend):
+    codec = PayloadCodec(json_backend=json_backend)
+    # data written by older clients, by clients compressing it and received inline
+    assert codec.loads(json.dumps(VALUE)) == VALUE
+    assert codec.loads(PayloadCodec(compress_threshold=0).dumps(VALUE)) == VALUE
+    assert codec.loads({'value': VALUE}) == VALUE
+    assert codec.loads({'value': 'text'}) == 'text'
+    # plain JSON text is readable by older clients
+    assert json.loads(codec.dumps(VALUE)) == VALUE
+
+
+def test_payload_codec_compression_size():
+    codec = PayloadCodec(compress_threshold=1024)
+    assert len(codec.dumps(VALUE)) < len(json.dumps(VALUE)) / 2
+
+
+@pytest.mark.parametrize('json_backend', BACKENDS)
+def test_payload_codec_json_compatibility(json_backend):
+    codec = PayloadCodec(json_backend=json_backend)
+    assert codec.loads(codec.dumps({1: 'a'})) == {'1': 'a'}
+    assert codec.loads(codec.dumps(2 ** 70)) == 2 ** 70
+    with pytest.raises(TypeError):
+        codec.dumps({'a': object()})
+
+
+@pytest.mark.parametrize('json_backend', BACKENDS)
+def test_payload_codec_non_finite_floats(json_backend):
+    codec = PayloadCodec(json_backend=json_backend)
+    value = {'a': [float('inf'), None], 'b': float('-inf')}
+    data = codec.dumps(value)
+    assert data == json.dumps(value)
+    assert codec.loads(data) == value
+    assert codec.loads(codec.dumps([None, 1.5])) == [None, 1.5]
+    nan = codec.loads(codec.dumps({'nan': float('nan')}))['nan']
+    assert nan != nan
+
+
+def test_payload_codec_default_backend(mocker):
+    assert PayloadCodec().json_backend == 'json'
+    mocker.patch.object(payload, 'orjson', None)
+    with pytest.raises(ValueError):
+        PayloadCodec(json_backend='orjson')
+    with pytest.raises(ValueError):
+        PayloadCodec(json_backend='simplejson')
@@ -0,0 +1,75 @@
+"""
+Unit tests for PlugNPy retry.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import asyncio
+
+import pytest
+
+from plugnpy.deadline import deadline_scope
+from plugnpy.retry import RetryPolicy
+
+
+def _failing(*errors):
+    def func(*args, **kwargs):
+        func.calls.append((args, kwargs))
+        if len(func.calls) <= len(errors):
+            raise errors[len(func.calls) - 1]
+        return 'data'
+    func.calls = []
+    return func
+
+
+@pytest.fixture
+def sleeps(mocker):
+    sleeps = []
+    mocker.patch('plugnpy.retry.time.sleep', side_effect=sleeps.append)
+    mocker.patch('plugnpy.retry.random.uniform', side_effect=lambda low, high: high)
+    yield sleeps
+
+
+@pytest.mark.parametrize('errors, idempotent, raises, calls, delays', [
+    pytest.param((), True, None, 1, [], id="success"),
+    pytest.param((ConnectionResetError(),) * 2, True, None, 3, [0.1, 0.2], id="retried"),
+    pytest.param((ConnectionResetError(),) * 3, True, ConnectionResetError, 3, [0.1, 0.2], id="too_many_failures"),
+    pytest.param((ConnectionResetError(),), False, ConnectionResetError, 1, [], id="not_idempotent"),
+    pytest.param((ConnectionRefusedError(),), False, None, 2, [0.1], id="not_idempotent_refused"),
+    pytest.param((ValueError(),), True, ValueError, 1, [], id="not_socket_error"),
+])
+def test_retry_call(errors, idempotent, raises, calls, delays, sleeps):
+    func = _failing(*errors)
+    policy = RetryPolicy(attempts=3, base_delay=0.1, max_delay=2)
+    if raises:
+        with pytest.raises(raises):
+            policy.call(func, 'path', idempotent=idempotent, body='body')
+    else:
+        assert policy.call(func, 'path', idempotent=idempotent, body='body') == 'data'
+    assert func.calls == [(('path',), {'body': 'body'})] * calls
+    assert sleeps == delays
+
+
+def test_retry_delay(mocker):
+    mocker.patch('plugnpy.retry.random.uniform', side_effect=lambda low, high: (low, high))
+    policy = RetryPolicy(base_delay=0.5, max_delay=3, multiplier=3)
+    assert [policy.delay(retry) for retry in range(4)] == [(0, 0.5), (0, 1.5), (0, 3), (0, 3)]
+    with pytest.raises(ValueError):
+        RetryPolicy(attempts=0)
+
+
+def test_retry_deadline(sleeps):
+    func = _failing(ConnectionResetError())
+    with deadline_scope(0.05), pytest.raises(ConnectionResetError):
+        RetryPolicy(base_delay=1).call(func)
+    assert not sleeps
+
+
+def test_retry_call_async(mocker):
+    mocker.patch('plugnpy.retry.random.uniform', return_value=0)
+    errors = _failing(ConnectionRefusedError(), ConnectionRefusedError())
+
+    async def func(*args, **kwargs):
+        return errors(*args, **kwargs)
+
+    assert asyncio.run(RetryPolicy().call_async(func, 'path', idempotent=False)) == 'data'
+    assert len(errors.calls) == 3
@@ -0,0 +1,212 @@
+"""
+Unit tests for PlugNPy sharding.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+
+from socket import error as SocketError
+from plugnpy.cachemanager import CacheManagerUtils
+from plugnpy.exception import CircuitOpenError
+from plugnpy.sharding import HashRing, ShardedCacheManagerClient, parse_endpoints
+from plugnpy.standin import StandInServer
+from plugnpy.utils import hash_string
+
+NAMESPACE = 'some-namespace'
+KEYS = [hash_string(str(index)) for index in range(3000)]
+
+
+@pytest.mark.parametrize('endpoints, expected', [
+    pytest.param('host-a:8181, host-b:8182,', [('host-a', '8181'), ('host-b', '8182')], id="string"),
+    pytest.param('/run/cachemanager.sock,[::1]:8181', [('/run/cachemanager.sock', None), ('::1', '8181')],
+                 id="unix_ipv6"),
+    pytest.param([['host-a', 8181], ('host-b', 8182)], [('host-a', 8181), ('host-b', 8182)], id="list"),
+    # the endpoints without a port use the default port
+    pytest.param('cm1', [('cm1', '8080')], id="no_port"),
+    pytest.param('cm1:', [('cm1', '8080')], id="empty_port"),
+    pytest.param('[::1]', [('::1', '8080')], id="ipv6_no_port"),
+])
+def test_parse_endpoints(endpoints, expected):
+    assert parse_endpoints(endpoints, default_port='8080') == expected
+
+
+@pytest.mark.parametrize('endpoints', [
+    pytest.param('cm1', id="no_port"),
+    pytest.param('cm1:', id="empty_port"),
+    pytest.param('[::1]', id="ipv6_no_port"),
+    pytest.param(':8181', id="no_host"),
+    pytest.param('::1', id="ipv6_no_brackets"),
+    pytest.param('fe80::1:8181', id="ipv6_port_no_brackets"),
+    pytest.param('[::1]8181', id="ipv6_no_colon"),
+])
+def test_parse_endpoints_invalid(endpoints):
+    with pytest.raises(ValueError):
+        parse_endpoints(endpoints)
+
+
+def test_hash_ring_position():
+    # the keys hashed by generate_key are not hashed again
+    assert HashRing.position(KEYS[0]) == int(KEYS[0][:16], 16)
+    assert HashRing.position('short key') == HashRing.position(hash_string('short key'))
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_hash_ring_balance():
+    ring = HashRing(['a', 'b', 'c'])
+    counts = {}
+    for key in KEYS:
+        counts[ring.get_node(key)] = counts.get(ring.get_node(key), 0) + 1
+    assert all(0.25 < count / len(KEYS) < 0.42 for count in counts.values())
+    # the ring only depends on the names of the nodes
+    reordered = HashRing(['c', 'a', 'b'])
+    assert [reordered.get_node(key) for key in KEYS] == [ring.get_node(key) for key in KEYS]
+
+
+def test_hash_ring_minimal_disruption():
+    ring = HashRing(['a', 'b', 'c', 'd'])
+    without_d = HashRing(['a', 'b', 'c'])
+    moved = {}
+    for key in KEYS:
+        nodes = ring.get_nodes(key)
+        assert sorted(nodes) == ['a', 'b', 'c', 'd'] and nodes[0] == ring.get_node(key)
+        if nodes[0] != 'd':
+            # only the keys of the removed node move
+            assert without_d.get_node(key) == nodes[0]
+        else:
+            # to the next node of the ring
+            assert without_d.get_node(key) == nodes[1]
+            moved[nodes[1]] = moved.get(nodes[1], 0) + 1
+    # spread over the remaining nodes
+    assert sorted(moved) == ['a', 'b', 'c']
+
+
+@pytest.fixture
+def sharded(mocker):
+    clients = {name: mocker.Mock(name=name) for name in ('a', 'b', 'c')}
+    for name, client in clients.items():
+        client.get_data.return_value = {'data': name, 'lock': None}
+        client.get_many.side_effect = lambda keys, *args, name=name, **kwargs: {key: name for key in keys}
+        client.set_many.side_effect = lambda items, *args, name=name, **kwargs: sorted(items)
+    yield ShardedCacheManagerClient(clients, down_time=30)
+
+
+def _key_of(sharded, node):
+    return next(key for key in KEYS if sharded.ring.get_node(key) == node)
+
+
+def test_sharded_client_routes_keys(sharded):
+    for node in ('a', 'b', 'c'):
+        key = _key_of(sharded, node)
+        assert sharded.get_data(key, 5, deadline=1) == {'data': node, 'lock': None}
+        sharded.clients[node].get_data.assert_called_with(key, 5, deadline=1)
+        sharded.set_data(key, 'data', 60)
+        sharded.clients[node].set_data.assert_called_with(key, 'data', 60)
+        sharded.renew_lock(key, 30)
+        sharded.clients[node].renew_lock.assert_called_with(key, 30)
+    keys = KEYS[:30]
+    assert sharded.get_many(keys, 0) == {key: sharded.ring.get_node(key) for key in keys}
+    # a single request per node
+    assert all(client.get_many.call_count == 1 for client in sharded.clients.values())
+    responses = sharded.set_many({key: 'data' for key in keys}, 60)
+    assert sorted(key for response in responses for key in response) == sorted(keys)
+
+
+@pytest.mark.parametrize('error', [SocketError('refused'), CircuitOpenError('open')])
+def test_sharded_client_failover(error, sharded, mocker):
+    monotonic = mocker.patch('plugnpy.sharding.time.monotonic', return_value=100)
+    key = _key_of(sharded, 'a')
+    next_node = sharded.ring.get_nodes(key)[1]
+    sharded.clients['a'].get_data.side_effect = error
+    assert sharded.get_data(key) == {'data': next_node, 'lock': None}
+    assert sharded.is_down('a')
+    # the node which is down is skipped, its keys go to the next node of the ring
+    assert sharded.get_data(key)['data'] == next_node
+    assert sharded.clients['a'].get_data.call_count == 1
+    other_key = _key_of(sharded, next_node)
+    assert sharded.get_data(other_key)['data'] == next_node
+    # and tried again after down_time
+    monotonic.return_value = 131
+    sharded.clients['a'].get_data.side_effect = None
+    assert sharded.get_data(key)['data'] == 'a'
+
+
+def test_sharded_client_get_many_failover(sharded):
+    sharded.clients['b'].get_many.side_effect = SocketError('refused')
+    keys = KEYS[:30]
+    responses = sharded.get_many(keys, 0)
+    assert 'b' not in responses.values()
+    for key in keys:
+        nodes = [node for node in sharded.ring.get_nodes(key) if node != 'b']
+        assert responses[key] == nodes[0]
+
+
+def test_sharded_client_all_down(sharded):
+    for client in sharded.clients.values():
+        client.get_data.side_effect = SocketError('refused')
+        client.get_many.side_effect = SocketError('refused')
+    with pytest.raises(SocketError):
+        sharded.get_data(KEYS[0])
+    # the nodes marked down are still tried, as they may be back
+    assert all(client.get_data.call_count == 1 for client in sharded.clients.values())
+    with pytest.raises(SocketError):
+        sharded.get_many(KEYS[:10])
+
+
+def test_sharded_client_status(sharded):
+    sharded.clients['a'].status.return_value = {'entries': 1}
+    sharded.clients['b'].status.side_effect = SocketError('refused')
+    sharded.clients['c'].status.return_value = {'entries': 2}
+    assert sharded.status() == {'a': {'entries': 1}, 'b': {'error': 'refused'}, 'c': {'entries': 2}}
+    assert sharded.is_down('b')
+    sharded.close()
+    assert all(client.close.call_count == 1 for client in sharded.clients.values())
+
+
+def test_cache_manager_utils_endpoints(mocker):
+    with StandInServer() as server_a, StandInServer() as server_b:
+        endpoints = ','.join('%s:%s' % server.address for server in (server_a, server_b))
+        mocker.patch.object(CacheManagerUtils, 'host', None)
+        mocker.patch.object(CacheManagerUtils, 'endpoints', endpoints)
+        mocker.patch.object(CacheManagerUtils, 'namespace', NAMESPACE)
+        mocker.patch.object(CacheManagerUtils, 'transport', 'http')
+        mocker.patch.object(CacheManagerUtils, 'client', None)
+        mocker.patch.object(CacheManagerUtils, 'local_cache', None)
+        func = mocker.Mock(side_effect=lambda key: f'data {key}')
+        keys = [f'key {index}' for index in range(20)]
+        assert [CacheManagerUtils.get_via_cachemanager(False, key, 60, func, key) for key in keys] == [
+            f'data {key}' for key in keys]
+        assert [CacheManagerUtils.get_via_cachemanager(False, key, 60, func, key) for key in keys] == [
+            f'data {key}' for key in keys]
+        assert func.call_count == 20
+        entries = [server.stats()['requests']['set_data'] for server in (server_a, server_b)]
+        assert sum(entries) == 20 and min(entries) > 0
+        # the keys of a node which is down move to the other node
+        server_b.stop()
+        assert [CacheManagerUtils.get_via_cachemanager(False, key, 60, func, key) for key in keys] == [
+            f'data {key}' for key in keys]
+        assert func.call_count == 20 + entries[1]
+        CacheManagerUtils.client.close()
+
+
+def test_cache_manager_utils_endpoints_default_port(mocker):
+    mocker.patch.object(CacheManagerUtils, 'endpoints', 'cm1,cm2:8282')
+    mocker.patch.object(CacheManagerUtils, 'port', '8181')
+    mocker.patch.object(CacheManagerUtils, 'client', None)
+    mocker.patch('plugnpy.cachemanager.get_transport')
+    CacheManagerUtils._initialise_client()
+    assert sorted(CacheManagerUtils.client.clients) == ['cm1:8181', 'cm2:8282']
+
+
+def test_cache_manager_utils_endpoints_environment():
+    env = dict(os.environ, OPSVIEW_CACHE_MANAGER_ENDPOINTS='cachemanager-1:8181,cachemanager-2:8181')
+    env.pop('OPSVIEW_CACHE_MANAGER_HOST', None)
+    code = (
+        "from plugnpy.cachemanager import CacheManagerUtils; "
+        "print(CacheManagerUtils.endpoints, CacheManagerUtils._cachemanager_available())"
+    )
+    output = subprocess.run([sys.executable, '-c', code], check=True, env=env, capture_output=True, text=True).stdout
+    assert output.split() == ['cachemanager-1:8181,cachemanager-2:8181', 'True']
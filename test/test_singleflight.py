@@ -0,0 +1,107 @@
+"""
+Unit tests for PlugNPy singleflight.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import threading
+import time
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+from plugnpy.deadline import deadline_scope
+from plugnpy.exception import DeadlineExceeded
+from plugnpy.singleflight import SingleFlight
+
+
+def _slow(calls, result=None, error=None, seconds=0.2):
+    def func(*args):
+        calls.append(args)
+        time.sleep(seconds)
+        if error:
+            raise error
+        return result
+    return func
+
+
+def _run_in_threads(single_flight, count, key, func, *args):
+    def call():
+        try:
+            return single_flight.do(key, func, *args)
+        except Exception as ex:
+            return ex
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(call) for _ in range(count)]
+        return [future.result() for future in futures]
+
+
+@pytest.mark.parametrize('error', [
+    pytest.param(None, id="result"),
+    pytest.param(ValueError('API down'), id="error"),
+])
+def test_single_flight_threads(error):
+    single_flight = SingleFlight()
+    calls = []
+    results = _run_in_threads(single_flight, 8, 'key', _slow(calls, 'data', error), 'arg')
+    assert calls == [('arg',)]
+    assert results == [error or 'data'] * 8
+    assert single_flight.in_flight() == 0
+    # the next call is not coalesced with a finished one
+    assert _run_in_threads(single_flight, 1, 'key', _slow(calls, 'new', seconds=0)) == ['new']
+    assert len(calls) == 2
+
+
+def test_single_flight_different_keys():
+    single_flight = SingleFlight()
+    calls = []
+    func = _slow(calls, 'data', seconds=0.1)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda key: single_flight.do(key, func, key), ['a', 'b', 'a', 'b']))
+    assert results == ['data'] * 4
+    assert sorted(calls) == [('a',), ('b',)]
+
+
+def test_single_flight_greenlets():
+    gevent = pytest.importorskip('gevent')
+    single_flight = SingleFlight()
+    calls = []
+
+    def func():
+        calls.append(1)
+        gevent.sleep(0.1)
+        return 'data'
+
+    greenlets = [gevent.spawn(single_flight.do, 'key', func) for _ in range(8)]
+    gevent.joinall(greenlets)
+    assert [greenlet.value for greenlet in greenlets] == ['data'] * 8
+    assert calls == [1]
+
+
+def test_single_flight_reentrant():
+    single_flight = SingleFlight()
+
+    def func(depth):
+        if depth:
+            return single_flight.do('key', func, depth - 1) + 1
+        return 0
+
+    assert single_flight.do('key', func, 3) == 3
+    assert single_flight.in_flight() == 0
+
+
+def test_single_flight_deadline():
+    single_flight = SingleFlight()
+    started = threading.Event()
+
+    def func():
+        started.set()
+        time.sleep(0.5)
+        return 'data'
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(single_flight.do, 'key', func)
+        started.wait()
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceeded):
+                single_flight.do('key', func)
+        assert future.result() == 'data'
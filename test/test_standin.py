@@ -0,0 +1,185 @@
+"""
+Unit tests for PlugNPy standin.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import threading
+import time
+import pytest
+
+from socket import error as SocketError
+from plugnpy.cachemanager import CacheManagerClient
+from plugnpy.exception import ResultError, StateManagerStoreError
+from plugnpy.standin import StandInServer, main
+from plugnpy.statemanager import StateManagerClient
+
+NAMESPACE = 'some-namespace'
+
+
+@pytest.fixture
+def standin():
+    with StandInServer(lock_timeout=0.3) as server:
+        yield server
+
+
+def _clients(standin, **kwargs):
+    host, port = standin.address
+    return (
+        CacheManagerClient(host, port, NAMESPACE, concurrency=4, transport=kwargs.pop('transport', 'http'), **kwargs),
+        StateManagerClient(host, port, NAMESPACE, transport='http' if port else 'unix'),
+    )
+
+
+def test_standin_lock_protocol(standin):
+    client, _ = _clients(standin)
+    assert client.get_data('key', 0) == {'data': None, 'lock': True}
+    waiter = {}
+    thread = threading.Thread(target=lambda: waiter.update(client.get_data('key', 5)))
+    thread.start()
+    time.sleep(0.1)
+    client.set_data('key', 'data', 60)
+    thread.join()
+    assert waiter == {'data': 'data', 'lock': None, 'ttl': pytest.approx(60, abs=1)}
+    assert client.status() == {'entries': 1, 'locks': 0, 'state_entries': 0}
+    stats = standin.stats()
+    assert stats['requests'] == {'get_data': 2, 'set_data': 1, 'status': 1}
+    assert stats['locks'] == {f'{NAMESPACE}#key': 1}
+    assert len(stats['lock_waits']) == 1 and 0.05 < stats['lock_waits'][0] < 1
+    client.close()
+
+
+def test_standin_lock_timeout_and_lease(standin):
+    client, _ = _clients(standin)
+    assert client.get_data('key', 0)['lock']
+    response = client.get_data('key', 0)
+    assert response['lock'] is None and 0 < response['lease'] <= 0.3
+    assert client.renew_lock('key', 1)
+    assert client.get_data('key', 0)['lease'] > 0.5
+    assert standin.stats()['lease_renewals'] == 1
+    # a lock which is not renewed runs out, and is handed out again
+    assert client.renew_lock('key', 0.1)
+    time.sleep(0.15)
+    assert client.get_data('key', 1)['lock']
+    assert not client.renew_lock('other', 1)
+    assert standin.stats()['locks'] == {f'{NAMESPACE}#key': 2}
+    assert standin.stats()['lock_timeouts'] == 2
+    client.close()
+
+
+def test_standin_data_expires(standin):
+    client, _ = _clients(standin)
+    client.set_data('key', 'data', 0.1)
+    assert client.get_data('key', 0)['data'] == 'data'
+    time.sleep(0.15)
+    assert client.get_data('key', 0)['lock']
+    client.close()
+
+
+@pytest.mark.parametrize('batch, expected', [
+    pytest.param(True, {'set_data': 1, 'get_many': 2, 'set_many': 1}, id="batch"),
+    # the client falls back to single requests after the first 404
+    pytest.param(False, {'set_data': 2, 'get_many': 1, 'get_data': 3}, id="no batch"),
+])
+def test_standin_batch(batch, expected, standin):
+    standin.batch = batch
+    client, _ = _clients(standin)
+    client.set_data('a', 'data a', 60)
+    remaining = pytest.approx(60, abs=1)
+    assert client.get_many(['a', 'b'], 0) == {
+        'a': {'data': 'data a', 'lock': None, 'ttl': remaining}, 'b': {'data': None, 'lock': True}}
+    client.set_many({'b': 'data b'}, 60)
+    assert client.get_many(['b'], 0) == {'b': {'data': 'data b', 'lock': None, 'ttl': remaining}}
+    assert standin.stats()['requests'] == expected
+    client.close()
+
+
+def test_standin_state_manager(standin):
+    _, client = _clients(standin)
+    assert client.fetch_data('key') is None
+    client.store_data('key', 'state', 60)
+    assert client.fetch_data('key') == 'state'
+    client.close()
+
+
+def test_standin_unix_socket(tmp_path):
+    path = str(tmp_path / 'standin.sock')
+    with StandInServer(path) as server:
+        assert server.address == (path, None)
+        client, state_client = _clients(server, transport='unix')
+        client.set_data('key', 'data', 60)
+        assert client.get_data('key', 0)['data'] == 'data'
+        state_client.store_data('key', 'state', 60)
+        assert state_client.fetch_data('key') == 'state'
+        client.close()
+        state_client.close()
+
+
+@pytest.mark.parametrize('settings, exception', [
+    pytest.param({'error_rate': 1}, ResultError, id="error"),
+    pytest.param({'drop_rate': 1}, SocketError, id="drop"),
+])
+def test_standin_failure_injection(settings, exception, standin):
+    for name, value in settings.items():
+        setattr(standin, name, value)
+    client, state_client = _clients(standin)
+    with pytest.raises(exception):
+        client.get_data('key', 0)
+    with pytest.raises(StateManagerStoreError):
+        state_client.fetch_data('key')
+    stats = standin.stats()
+    assert stats['injected_errors' if 'error_rate' in settings else 'dropped'] == 2
+    client.close()
+    state_client.close()
+
+
+def test_standin_latency(standin):
+    standin.latency = 0.1
+    standin.jitter = 0.05
+    client, _ = _clients(standin)
+    start = time.monotonic()
+    client.status()
+    assert 0.1 <= time.monotonic() - start < 1
+    client.close()
+
+
+def test_standin_invalid_requests(standin):
+    assert standin.handle('unknown', {})[0] == 404
+    assert standin.handle('get_data', {'key': 'key'})[0] == 400
+    standin.batch = False
+    assert standin.handle('get_many', {'namespace': NAMESPACE, 'keys': []})[0] == 404
+
+
+def test_standin_connections(standin):
+    client, _ = _clients(standin)
+    for _ in range(3):
+        client.status()
+    assert standin.stats()['connections'] == 1
+    standin.keep_alive = False
+    client.status()
+    client.status()
+    assert standin.stats()['connections'] == 2
+    # the idle connection closed by the server is replaced
+    standin.keep_alive = True
+    standin.idle_timeout = 0.05
+    client.status()
+    time.sleep(0.2)
+    client.status()
+    assert standin.stats()['connections'] == 4
+    client.close()
+
+
+def test_standin_reset(standin):
+    client, _ = _clients(standin)
+    client.set_data('key', 'data', 60)
+    standin.reset()
+    assert standin.stats()['requests'] == {}
+    assert client.get_data('key', 0)['lock']
+    client.close()
+
+
+def test_standin_main(mocker):
+    serve_forever = mocker.patch.object(StandInServer, 'serve_forever')
+    init = mocker.spy(StandInServer, '__init__')
+    main(['--port', '0', '--latency', '0.01', '--error-rate', '0.5', '--no-batch', '--idle-timeout', '5'])
+    assert serve_forever.call_count == 1
+    assert init.call_args == mocker.call(mocker.ANY, '127.0.0.1', 0, 0.01, 0, 0.5, 0, 60, False, True, 5)
@@ -9,7 +9,10 @@ import pytest
 
 from socket import error as SocketError
 from plugnpy.statemanager import StateManagerUtils, StateManagerClient
-from plugnpy.exception import StateManagerStoreError
+from plugnpy.deadline import remaining_time
+from plugnpy.circuitbreaker import CircuitBreaker
+from plugnpy.exception import CircuitOpenError, DeadlineExceeded, StateManagerStoreError
+from plugnpy.retry import RetryPolicy
 
 
 HOST = 'a.host'
@@ -34,7 +37,7 @@ def smutils(mocker):
 
 @pytest.fixture
 def smclient(mocker):
-    mock_http_client = mocker.patch('plugnpy.statemanager.HTTPClient')
+    mock_http_client = mocker.patch('plugnpy.statemanager.get_transport')
     client = StateManagerClient(HOST, PORT, NAMESPACE)
     yield client
 
@@ -66,7 +69,7 @@ def test_utils_fetch_data(mocker, smutils):
 
 
 def test_state_manager_client_init(mocker):
-    mock_http_client = mocker.patch('plugnpy.statemanager.HTTPClient')
+    mock_http_client = mocker.patch('plugnpy.statemanager.get_transport')
     client = StateManagerClient(HOST, PORT, NAMESPACE)
     assert client._namespace == NAMESPACE
     assert client._headers == {
@@ -75,7 +78,7 @@ def test_state_manager_client_init(mocker):
     }
     mock_http_client.assert_called()
     assert mock_http_client.call_args == mocker.call(
-        HOST, PORT, concurrency=1, connection_timeout=30, network_timeout=30)
+        HOST, PORT, None, concurrency=1, connection_timeout=30, network_timeout=30)
 
 
 @pytest.mark.parametrize('data, timestamp, send, status, exception, expected', [
@@ -91,7 +94,7 @@ def test_state_manager_client_init(mocker):
         id="server_error"),
 ])
 def test_state_manager_client_store_data(data, timestamp, send, status, exception, expected, mocker, smclient):
-    mocker.patch('plugnpy.statemanager.time.time', return_value=NOW)
+    mocker.patch('plugnpy.protocol.time.time', return_value=NOW)
     if status:
         mock_resp = mocker.Mock(status_code=status[0], status_message=status[1])
         mock_resp.read.return_value = status[2]
@@ -173,3 +176,42 @@ def test_state_manager_client_send_persistent(error, mocker, smclient):
             smclient._send_persistent(mock_method, PATH, DATA)
         assert 'Failed to connect to state manager' in str(ex)
     assert mock_method.call_args == mocker.call(PATH, body=json.dumps(DATA), headers=smclient._headers)
+
+
+@pytest.mark.parametrize('method, args', [
+    pytest.param('store_data', (KEY, DATA, TTL), id="store_data"),
+    pytest.param('fetch_data', (KEY,), id="fetch_data"),
+])
+def test_state_manager_client_deadline_exceeded(method, args, mocker, smclient):
+    gevent = pytest.importorskip('gevent')
+    smclient._http_client.post.side_effect = lambda *args, **kwargs: gevent.sleep(1)
+    with pytest.raises(DeadlineExceeded):
+        getattr(smclient, method)(*args, deadline=0.05)
+    with pytest.raises(DeadlineExceeded):
+        getattr(smclient, method)(*args, deadline=-1)
+
+
+def test_utils_deadline(mocker, smutils):
+    smutils._initialise_client()
+    mocker.patch.object(smutils.client, 'fetch_data', side_effect=lambda key: remaining_time())
+    assert 0 < smutils.fetch_data(KEY, deadline=5) <= 5
+    assert remaining_time() is None
+
+
+def test_state_manager_client_retry_and_circuit_breaker(mocker, tmp_path):
+    mocker.patch('plugnpy.statemanager.get_transport')
+    mocker.patch('plugnpy.retry.time.sleep')
+    breaker = CircuitBreaker(str(tmp_path / 'circuit'), failure_threshold=1)
+    client = StateManagerClient(HOST, PORT, NAMESPACE, retry=RetryPolicy(attempts=2), circuit_breaker=breaker)
+    response = mocker.Mock(status_code=200, status_message='OK')
+    response.read.return_value = BODY
+    client._http_client.post.side_effect = [ConnectionResetError(), response]
+    assert client.fetch_data(KEY) == DATA
+    client._http_client.post.side_effect = ConnectionResetError()
+    with pytest.raises(StateManagerStoreError) as ex:
+        client.store_data(KEY, DATA, TTL)
+    assert 'Failed to connect to state manager' in str(ex)
+    with pytest.raises(CircuitOpenError):
+        client.fetch_data(KEY)
+    assert client._http_client.post.call_count == 4
+
@@ -0,0 +1,161 @@
+"""
+Unit tests for PlugNPy transport.py
+Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
+"""
+
+import json
+import time
+
+import pytest
+
+from plugnpy import transport
+from plugnpy.cachemanager import CacheManagerClient
+from plugnpy.deadline import deadline_scope, deadline_timeout
+from plugnpy.exception import DeadlineExceeded
+from plugnpy.standin import StandInServer
+from plugnpy.statemanager import StateManagerClient
+from plugnpy.transport import GeventTransport, StdlibTransport, UnixSocketTransport, get_transport
+
+HEADERS = {'Content-Type': 'application/json'}
+
+
+@pytest.fixture(autouse=True)
+def clear_transports():
+    transport._TRANSPORTS.clear()
+    yield
+    transport._TRANSPORTS.clear()
+
+
+@pytest.fixture
+def server():
+    with StandInServer() as standin:
+        yield standin
+
+
+@pytest.fixture
+def unix_server(tmp_path):
+    with StandInServer(str(tmp_path / 'server.sock')) as standin:
+        yield standin
+
+
+def test_get_transport_shared(server):
+    host, port = server.address
+    first = get_transport(host, port, 'http')
+    assert get_transport(host, port, 'http') is first
+    assert get_transport(host, port, 'http', concurrency=2) is not first
+    assert isinstance(get_transport(host, port), GeventTransport)
+    assert isinstance(get_transport('/run/cache.sock', None), UnixSocketTransport)
+    first.get('status')
+    first.close()
+    assert first.users == 1
+    assert len(first._idle) == 1
+    first.close()
+    assert not first._idle
+    assert get_transport(host, port, 'http') is not first
+    with pytest.raises(ValueError):
+        get_transport(host, port, 'carrier-pigeon')
+
+
+@pytest.mark.parametrize('kind', ['http', 'gevent'])
+def test_transport_keep_alive(kind, server):
+    host, port = server.address
+    client = get_transport(host, port, kind)
+    for i in range(3):
+        body = json.dumps({'namespace': 'cache', 'key': f'key {i}', 'data': i, 'ttl': 10})
+        response = client.post('set_data', body=body, headers=HEADERS)
+        assert (response.status_code, json.loads(response.read())) == (200, {'success': True})
+    assert json.loads(client.get('status').read()) == {'entries': 3, 'locks': 0, 'state_entries': 0}
+    assert server.stats()['connections'] == 1
+    client.close()
+
+
+def test_stdlib_transport_reconnects(server):
+    host, port = server.address
+    client = get_transport(host, port, 'http')
+    server.keep_alive = False
+    assert client.get('status').status_code == 200
+    assert client.get('status').status_code == 200
+    assert not client._idle
+    server.keep_alive = True
+    server.idle_timeout = 0.05
+    assert client.get('status').status_code == 200
+    assert len(client._idle) == 1
+    # the idle connection closed by the server is replaced
+    time.sleep(0.2)
+    assert client.get('status').status_code == 200
+    assert client.get('status').status_code == 200
+    assert server.stats()['connections'] == 4
+    client.close()
+
+
+def test_stdlib_transport_deadline(server):
+    host, port = server.address
+    client = get_transport(host, port, 'http')
+    server.latency = 0.5
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as ex:
+        with deadline_scope(0.1), deadline_timeout('call status', client.cooperative):
+            client.get('status')
+    assert 'Deadline exceeded while trying to call status' in str(ex.value)
+    assert time.monotonic() - start < 0.4
+    client.close()
+
+
+def test_stdlib_transport_concurrency(server):
+    host, port = server.address
+    client = StdlibTransport(host, port, concurrency=1)
+    client._slots.acquire()
+    with pytest.raises(DeadlineExceeded):
+        with deadline_scope(0.05), deadline_timeout('call status', client.cooperative):
+            client.get('status')
+    client._slots.release()
+
+
+def test_clients_share_transport(server):
+    host, port = server.address
+    cmclient = CacheManagerClient(host, port, 'cache', transport='http')
+    smclient = StateManagerClient(host, port, 'state', transport='http')
+    assert cmclient._http_client is smclient._http_client
+    assert cmclient.set_data('key', 'data', 10) == {'success': True}
+    smclient.store_data('key', 'state', 10)
+    assert smclient.fetch_data('key') == 'state'
+    assert server.stats()['connections'] == 1
+    cmclient.close()
+    smclient.close()
+
+
+def test_clients_unix_socket(mocker, unix_server):
+    path, _ = unix_server.address
+    cmclient = CacheManagerClient(path, None, 'cache')
+    smclient = StateManagerClient(path, None, 'state')
+    assert isinstance(cmclient._http_client, UnixSocketTransport)
+    assert cmclient.status() == {'entries': 0, 'locks': 0, 'state_entries': 0}
+    post = mocker.spy(cmclient._http_client, 'post')
+    assert cmclient.get_data('key', 10, deadline=5.5) == {'data': None, 'lock': True}
+    # the wait for a lock holder is capped to the time left until the deadline
+    assert json.loads(post.call_args[1]['body'])['max_wait_time'] == 5
+    assert smclient.fetch_data('key') is None
+    assert unix_server.stats()['requests'] == {'status': 1, 'get_data': 1, 'fetch_data': 1}
+    cmclient.close()
+    smclient.close()
+
+
+def test_cache_manager_client_batch_threads(server):
+    host, port = server.address
+    client = CacheManagerClient(host, port, 'cache', transport='http', batch_concurrency=4)
+    client._batch_supported = False
+    assert client.get_many(['a', 'b'], 10) == {'a': {'data': None, 'lock': True}, 'b': {'data': None, 'lock': True}}
+    assert server.stats()['requests'] == {'get_data': 2}
+    client.close()
+
+
+@pytest.mark.parametrize('kind', ['http', 'gevent'])
+def test_transport_non_ascii_body(kind, server):
+    host, port = server.address
+    client = get_transport(host, port, kind)
+    for data in ('café', 'é€'):
+        body = json.dumps({'namespace': 'cache', 'key': 'key', 'data': data, 'ttl': 10}, ensure_ascii=False)
+        assert client.post('set_data', body=body, headers=HEADERS).status_code == 200
+        body = json.dumps({'namespace': 'cache', 'key': 'key', 'max_wait_time': 0})
+        assert json.loads(client.post('get_data', body=body, headers=HEADERS).read())['data'] == data
+    client.close()
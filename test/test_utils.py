@@ -3,6 +3,9 @@ Unit tests for PlugNPy utils.py
 Copyright (C) 2003-2025 ITRS Group Ltd. All rights reserved
 """
 
+import subprocess
+import sys
+
 import pytest
 
 from plugnpy.utils import hash_string, dynamic_import, import_modules
@@ -45,3 +48,12 @@ def test_import_modules():
     expected = datetime.datetime(2020, 3, 17)
     actual = datetime.datetime.strptime('17 March 2020', '%d %B %Y')
     assert actual == expected
+
+
+def test_import_without_fcntl():
+    # fcntl is not available on Windows
+    code = (
+        "import sys; sys.modules['fcntl'] = None; "
+        "import plugnpy, plugnpy.cachemanager, plugnpy.circuitbreaker, plugnpy.filecache"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)